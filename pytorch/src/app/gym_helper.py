@@ -59,6 +59,11 @@ def get_her_goal_functions(env:gym.Env):
     return funcs[spec_id].values()
 
  
+def _sparse_reward(within_tol):
+    """Returns (reward, within_tol) for a sparse goal reward: 0 within tolerance, else -1."""
+    within_tol = np.asarray(within_tol)
+    return within_tol.astype(np.float32) - 1.0, within_tol.astype(np.int64)
+
 def car_racing_desired_goal(env):
     """Returns the desired goal for the CarRacing environment."""
     return np.array([len(env.get_wrapper_attr('track'))])
@@ -81,10 +86,7 @@ def car_racing_reward(env, action, state_achieved_goal, next_state_achieved_goal
     diff = desired_goal - next_state_achieved_goal
     # if diff <= tolerance:
         # print('within tolerance')
-    if diff <= tolerance:
-        return 0,1 
-    else:
-        return -1,0
+    return _sparse_reward(np.all(diff <= tolerance, axis=-1))
 
 def reacher_desired_goal(env):
     """Returns the desired goal for the Reacher Mujoco environment."""
@@ -100,13 +102,10 @@ def reacher_achieved_goal(env):
 #     return distance + reward_ctrl
 
 def reacher_reward(env, action, state_achieved_goal, next_state_achieved_goal, desired_goal, tolerance):
-    distance = np.linalg.norm(desired_goal - next_state_achieved_goal)
+    distance = np.linalg.norm(desired_goal - next_state_achieved_goal, axis=-1)
     # if distance <= tolerance:
         # print('within tolerance')
-    if distance <= tolerance:
-        return 0,1
-    else:
-        return -1,0
+    return _sparse_reward(distance <= tolerance)
 
 # def pusher_desired_goal(env):
 #     return env.get_wrapper_attr("get_body_com")("goal")
@@ -137,10 +136,7 @@ def fetch_reach_reward(env, action=None, state_achieved_goal=None, next_state_ac
     distance = np.linalg.norm(next_state_achieved_goal - desired_goal, axis=-1)
     reward = env.get_wrapper_attr("compute_reward")(next_state_achieved_goal, desired_goal, None)
 
-    if distance <= tolerance:
-        return reward, 1
-    else:
-        return reward, 0
+    return reward, (distance <= tolerance).astype(np.int64)
     
 def fetch_pick_place_desired_goal(env):
     return env.get_wrapper_attr("_get_obs")()['desired_goal']
@@ -153,10 +149,7 @@ def fetch_pick_place_reward(env, action=None, state_achieved_goal=None, next_sta
     distance = np.linalg.norm(next_state_achieved_goal - desired_goal, axis=-1)
     reward = env.get_wrapper_attr("compute_reward")(next_state_achieved_goal, desired_goal, None)
 
-    if distance <= tolerance:
-        return reward, 1
-    else:
-        return reward, 0
+    return reward, (distance <= tolerance).astype(np.int64)
 
 def fetch_push_desired_goal(env):
     return env.get_wrapper_attr("_get_obs")()['desired_goal']
@@ -170,10 +163,7 @@ def fetch_push_reward(env, action=None, state_achieved_goal=None, next_state_ach
     # print(f'distance: {distance}')
     reward = env.get_wrapper_attr("compute_reward")(next_state_achieved_goal, desired_goal, None)
 
-    if distance <= tolerance:
-        return reward, 1
-    else:
-        return reward, 0
+    return reward, (distance <= tolerance).astype(np.int64)
 
 def fetch_slide_desired_goal(env):
     return env.get_wrapper_attr("_get_obs")()['desired_goal']
@@ -192,7 +182,4 @@ def fetch_slide_reward(env, action=None, state_achieved_goal=None, next_state_ac
     # print(f'distance: {distance}')
     # print(f'reward: {reward}')
 
-    if distance <= tolerance:
-        return reward, 1
-    else:
-        return reward, 0
\ No newline at end of file
+    return reward, (distance <= tolerance).astype(np.int64)
\ No newline at end of file
@@ -4,8 +4,13 @@
 # from tensorflow import random
 import torch as T
 from torch import optim
+from torch._utils import _flatten_dense_tensors, _unflatten_dense_tensors
 from torch.distributions import uniform, normal
+import os
+import random
 import threading
+import queue
+from collections import deque
 from multiprocessing import shared_memory #Manager
 from mpi4py import MPI
 
@@ -213,62 +218,136 @@ class ReplayBuffer:
         else:
             self._obs_space_shape = self.env.observation_space.shape
 
-        self.states = T.zeros((buffer_size, *self._obs_space_shape), dtype=T.float32, device=self.device)
-        self.actions = T.zeros((buffer_size, *env.action_space.shape), dtype=T.float32, device=self.device)
-        self.rewards = T.zeros((buffer_size,), dtype=T.float32, device=self.device)
-        self.next_states = T.zeros((buffer_size, *self._obs_space_shape), dtype=T.float32, device=self.device)
-        self.dones = T.zeros((buffer_size,), dtype=T.int8, device=self.device)
+        self.states = self._allocate((buffer_size, *self._obs_space_shape), T.float32)
+        self.actions = self._allocate((buffer_size, *env.action_space.shape), T.float32)
+        self.rewards = self._allocate((buffer_size,), T.float32)
+        self.next_states = self._allocate((buffer_size, *self._obs_space_shape), T.float32)
+        self.dones = self._allocate((buffer_size,), T.int8)
         
         if self.goal_shape is not None:
-            self.desired_goals = T.zeros((buffer_size, *self.goal_shape), dtype=T.float32, device=self.device)
-            self.state_achieved_goals = T.zeros((buffer_size, *self.goal_shape), dtype=T.float32, device=self.device)
-            self.next_state_achieved_goals = T.zeros((buffer_size, *self.goal_shape), dtype=T.float32, device=self.device)
+            self.desired_goals = self._allocate((buffer_size, *self.goal_shape), T.float32)
+            self.state_achieved_goals = self._allocate((buffer_size, *self.goal_shape), T.float32)
+            self.next_state_achieved_goals = self._allocate((buffer_size, *self.goal_shape), T.float32)
         
         self.counter = 0
-        self.gen = np.random.default_rng()
+
+        # gather batches into pinned memory when the buffer lives on the host but
+        # a GPU is available, so learners can copy them over with non_blocking=True
+        self._pin_memory = T.device(self.device).type == 'cpu' and T.cuda.is_available()
+
+    def _allocate(self, shape, dtype):
+        """Allocates zeroed storage for one buffer field."""
+        return T.zeros(shape, dtype=dtype, device=self.device)
+
+    def _reserve(self, n):
+        """Claims the next n write slots, returning the counter value before the claim."""
+        start = self.counter
+        self.counter = start + n
+        return start
         
     def add(self, state: np.ndarray, action: np.ndarray, reward: float, next_state: np.ndarray, done: bool,
             state_achieved_goal: np.ndarray = None, next_state_achieved_goal: np.ndarray = None, desired_goal: np.ndarray = None):
         """Add a transition to the replay buffer."""
-        index = self.counter % self.buffer_size
-        self.states[index] = T.tensor(state, device=self.device)
-        self.actions[index] = T.tensor(action, device=self.device)
-        self.rewards[index] = T.tensor(reward, device=self.device)
-        self.next_states[index] = T.tensor(next_state, device=self.device)
-        self.dones[index] = T.tensor(done, device=self.device)
+        if self.goal_shape is not None and (desired_goal is None or state_achieved_goal is None or next_state_achieved_goal is None):
+            raise ValueError("Desired goal, state achieved goal, and next state achieved goal must be provided when use_goals is True.")
+        index = self._reserve(1) % self.buffer_size
+        # copy straight into the preallocated rows (as_tensor shares numpy memory, no temporary)
+        self.states[index].copy_(T.as_tensor(state))
+        self.actions[index].copy_(T.as_tensor(action))
+        self.rewards[index] = float(reward)
+        self.next_states[index].copy_(T.as_tensor(next_state))
+        self.dones[index] = int(done)
         
         if self.goal_shape is not None:
-            if desired_goal is None or state_achieved_goal is None or next_state_achieved_goal is None:
-                raise ValueError("Desired goal, state achieved goal, and next state achieved goal must be provided when use_goals is True.")
-            self.state_achieved_goals[index] = T.tensor(state_achieved_goal, device=self.device)
-            self.next_state_achieved_goals[index] = T.tensor(next_state_achieved_goal, device=self.device)
-            self.desired_goals[index] = T.tensor(desired_goal, device=self.device)
-        
-        self.counter = self.counter + 1
+            self.state_achieved_goals[index].copy_(T.as_tensor(state_achieved_goal))
+            self.next_state_achieved_goals[index].copy_(T.as_tensor(next_state_achieved_goal))
+            self.desired_goals[index].copy_(T.as_tensor(desired_goal))
         
-    def sample(self, batch_size: int):
+    def add_batch(self, states, actions, rewards, next_states, dones,
+                  state_achieved_goals=None, next_state_achieved_goals=None, desired_goals=None):
+        """Add a batch of transitions (first dimension N), wrapping around the end of the buffer."""
+        n = len(states)
+        if n == 0:
+            return
+        if self.goal_shape is not None and (desired_goals is None or state_achieved_goals is None or next_state_achieved_goals is None):
+            raise ValueError("Desired goals, state achieved goals, and next state achieved goals must be provided when use_goals is True.")
+        start = self._reserve(n) % self.buffer_size
+        if start + n <= self.buffer_size:
+            # contiguous rows: copy_ reads the (numpy-backed) batch directly, casting and
+            # transferring in one pass without an index tensor or device temporaries
+            rows = slice(start, start + n)
+            self.states[rows].copy_(T.as_tensor(states))
+            self.actions[rows].copy_(T.as_tensor(actions))
+            self.rewards[rows].copy_(T.as_tensor(rewards))
+            self.next_states[rows].copy_(T.as_tensor(next_states))
+            self.dones[rows].copy_(T.as_tensor(dones))
+
+            if self.goal_shape is not None:
+                self.state_achieved_goals[rows].copy_(T.as_tensor(state_achieved_goals))
+                self.next_state_achieved_goals[rows].copy_(T.as_tensor(next_state_achieved_goals))
+                self.desired_goals[rows].copy_(T.as_tensor(desired_goals))
+            return
+
+        indices = T.arange(start, start + n, device=self.device) % self.buffer_size
+        self.states[indices] = T.as_tensor(states, dtype=T.float32, device=self.device)
+        self.actions[indices] = T.as_tensor(actions, dtype=T.float32, device=self.device)
+        self.rewards[indices] = T.as_tensor(rewards, dtype=T.float32, device=self.device)
+        self.next_states[indices] = T.as_tensor(next_states, dtype=T.float32, device=self.device)
+        self.dones[indices] = T.as_tensor(dones, device=self.device).to(T.int8)
+
+        if self.goal_shape is not None:
+            self.state_achieved_goals[indices] = T.as_tensor(state_achieved_goals, dtype=T.float32, device=self.device)
+            self.next_state_achieved_goals[indices] = T.as_tensor(next_state_achieved_goals, dtype=T.float32, device=self.device)
+            self.desired_goals[indices] = T.as_tensor(desired_goals, dtype=T.float32, device=self.device)
+
+    def sample(self, batch_size: int, state_normalizer=None, goal_normalizer=None):
+        """Samples a batch of transitions.
+
+        If normalizers are passed, states, next states and desired goals are
+        normalized in place on the gathered batch.
+        """
         size = min(self.counter, self.buffer_size)
-        indices = self.gen.integers(0, size, (batch_size,))
+        # draw indices where the storage lives so gathering needs no index transfer
+        indices = T.randint(0, size, (batch_size,), device=self.device)
+
+        # gathering returns copies, so the batch can be normalized in place
+        states = self._gather(self.states, indices)
+        next_states = self._gather(self.next_states, indices)
+        if state_normalizer is not None:
+            state_normalizer.normalize_(states)
+            state_normalizer.normalize_(next_states)
         
         if self.goal_shape is not None:
+            desired_goals = self._gather(self.desired_goals, indices)
+            if goal_normalizer is not None:
+                goal_normalizer.normalize_(desired_goals)
             return (
-                self.states[indices],
-                self.actions[indices],
-                self.rewards[indices],
-                self.next_states[indices],
-                self.dones[indices],
-                self.state_achieved_goals[indices],
-                self.next_state_achieved_goals[indices],
-                self.desired_goals[indices],
+                states,
+                self._gather(self.actions, indices),
+                self._gather(self.rewards, indices),
+                next_states,
+                self._gather(self.dones, indices),
+                self._gather(self.state_achieved_goals, indices),
+                self._gather(self.next_state_achieved_goals, indices),
+                desired_goals,
             )
         else:
             return (
-                self.states[indices],
-                self.actions[indices],
-                self.rewards[indices],
-                self.next_states[indices],
-                self.dones[indices]
+                states,
+                self._gather(self.actions, indices),
+                self._gather(self.rewards, indices),
+                next_states,
+                self._gather(self.dones, indices)
             )
+
+    def _gather(self, source, indices):
+        """Gathers rows of source, into pinned memory if enabled."""
+        if not self._pin_memory:
+            return source[indices.to(source.device)]
+        # the caching host allocator won't hand this block out again until
+        # any pending non_blocking copy from it has finished
+        out = T.empty((len(indices), *source.shape[1:]), dtype=source.dtype, pin_memory=True)
+        return T.index_select(source, 0, indices, out=out)
     
     def get_config(self):
         return {
@@ -289,7 +368,142 @@ class ReplayBuffer:
             self.goal_shape,
             self.device
         )
-    
+
+class MPISharedReplayBuffer(ReplayBuffer):
+    """ReplayBuffer whose storage is shared by all MPI ranks on a node.
+
+    Each field lives in an MPI shared-memory window owned by node rank 0 and the
+    write cursor is claimed with an atomic fetch-and-add, so every rank's add()
+    lands in its own slot and every rank samples from the transitions collected
+    by all of them. Ranks on different nodes get one buffer per node.
+    Construction is collective over comm.
+    """
+    def __init__(self, env: gym.Env, buffer_size: int = 100000, goal_shape: tuple = None, device='cpu', comm=None):
+        self.comm = comm if comm is not None else MPI.COMM_WORLD
+        self._node_comm = self.comm.Split_type(MPI.COMM_TYPE_SHARED)
+        self._node_rank = self._node_comm.Get_rank()
+        self._windows = []
+        # int64 write cursor, only ever touched through MPI atomics after construction
+        self._cursor_win, self._cursor = self._allocate_window((1,), np.int64)
+        self._delta = np.zeros(1, dtype=np.int64)
+        self._fetched = np.zeros(1, dtype=np.int64)
+        # shared windows are host memory; sampled batches are pinned for the device copy
+        super().__init__(env, buffer_size, goal_shape, device='cpu')
+        # make sure rank 0 has zeroed the storage before anyone writes to it
+        self._node_comm.Barrier()
+
+    def _allocate_window(self, shape, dtype):
+        """Allocates a window on node rank 0 and maps it into this rank as an ndarray."""
+        dtype = np.dtype(dtype)
+        nbytes = int(np.prod(shape)) * dtype.itemsize if self._node_rank == 0 else 0
+        win = MPI.Win.Allocate_shared(nbytes, dtype.itemsize, comm=self._node_comm)
+        buf, _ = win.Shared_query(0)
+        array = np.ndarray(shape, dtype=dtype, buffer=buf)
+        if self._node_rank == 0:
+            array.fill(0)
+        self._windows.append(win)
+        return win, array
+
+    def _allocate(self, shape, dtype):
+        _, array = self._allocate_window(shape, T.empty(0, dtype=dtype).numpy().dtype)
+        return T.from_numpy(array)
+
+    def _fetch_and_add(self, n, op):
+        self._delta[0] = n
+        self._cursor_win.Lock(0, MPI.LOCK_SHARED)
+        self._cursor_win.Fetch_and_op([self._delta, MPI.INT64_T], [self._fetched, MPI.INT64_T], 0, 0, op)
+        self._cursor_win.Unlock(0)
+        return int(self._fetched[0])
+
+    @property
+    def counter(self):
+        return self._fetch_and_add(0, MPI.NO_OP)
+
+    @counter.setter
+    def counter(self, value):
+        # only set while constructing, ahead of the barrier
+        if self._node_rank == 0:
+            self._cursor[0] = value
+
+    def _reserve(self, n):
+        return self._fetch_and_add(n, MPI.SUM)
+
+    def clone(self):
+        env = gym.make(self.env.spec)
+        return MPISharedReplayBuffer(
+            env,
+            self.buffer_size,
+            self.goal_shape,
+            comm=self.comm
+        )
+
+    def close(self):
+        """Frees the shared windows. Collective over the node's ranks."""
+        for win in self._windows:
+            win.Free()
+        self._windows = []
+        self._node_comm.Free()
+
+
+class ReplayPrefetcher:
+    """Samples batches on a background thread so sampling overlaps learner compute.
+
+    sample_fn is called on a worker thread and its batch is copied to device
+    (on a dedicated CUDA stream when available) into a queue holding up to
+    num_prefetch batches. Batches may be a few learn steps stale, which is fine
+    for off-policy replay.
+    """
+
+    def __init__(self, sample_fn, device, num_prefetch: int = 2):
+        self.sample_fn = sample_fn
+        self.device = T.device(device)
+        self._stream = T.cuda.Stream(device=self.device) if self.device.type == 'cuda' else None
+        self._queue = queue.Queue(maxsize=num_prefetch)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._worker, daemon=True)
+        self._thread.start()
+
+    def _worker(self):
+        while not self._stop.is_set():
+            try:
+                batch = self.sample_fn()
+                event = None
+                if self._stream is not None:
+                    with T.cuda.stream(self._stream):
+                        batch = tuple(t.to(self.device, non_blocking=True) if t is not None else None for t in batch)
+                        event = T.cuda.Event()
+                        event.record(self._stream)
+                item = (batch, event, None)
+            except Exception as e:
+                item = (None, None, e)
+            # re-check stop while waiting for a free slot so close() can't hang
+            while not self._stop.is_set():
+                try:
+                    self._queue.put(item, timeout=0.1)
+                    break
+                except queue.Full:
+                    continue
+            if item[2] is not None:
+                return
+
+    def next(self):
+        """Returns the next batch, ready to use on the current stream."""
+        batch, event, error = self._queue.get()
+        if error is not None:
+            raise error
+        if event is not None:
+            current_stream = T.cuda.current_stream(self.device)
+            current_stream.wait_event(event)
+            # tensors were allocated on the prefetch stream
+            for t in batch:
+                if t is not None:
+                    t.record_stream(current_stream)
+        return batch
+
+    def close(self):
+        self._stop.set()
+        self._thread.join()
+
 class SharedReplayBuffer(Buffer):
     def __init__(self, manager, env:gym.Env, buffer_size:int=100000, goal_shape:tuple=None, device='cpu'):
         self.env = env
@@ -519,17 +733,8 @@ class Noise:
         Returns:
             Noise: An instance of the requested noise class.
         """
-        noise_classes = {
-            "Ornstein-Uhlenbeck": OUNoise,
-            "OUNoise": OUNoise,
-            "Normal": NormalNoise,
-            "NormalNoise": NormalNoise,
-            "Uniform": UniformNoise,
-            "UniformNoise": UniformNoise,
-        }
-
-        if noise_class_name in noise_classes:
-            return noise_classes[noise_class_name](**kwargs)
+        if noise_class_name in NOISE_REGISTRY:
+            return NOISE_REGISTRY[noise_class_name](**kwargs)
         else:
             raise ValueError(f"{noise_class_name} is not a recognized noise class")
 
@@ -667,6 +872,16 @@ class OUNoise(Noise):
             self.device
         )
     
+# noise classes by config name
+NOISE_REGISTRY = {
+    "Ornstein-Uhlenbeck": OUNoise,
+    "OUNoise": OUNoise,
+    "Normal": NormalNoise,
+    "NormalNoise": NormalNoise,
+    "Uniform": UniformNoise,
+    "UniformNoise": UniformNoise,
+}
+
 class Normalizer:
     def __init__(self, size, eps=1e-2, clip_range=5.0, device='cpu'):
         self.size = size
@@ -689,6 +904,10 @@ class Normalizer:
     def normalize(self, v):
         return T.clamp((v - self.running_mean) / self.running_std,
                        -self.clip_range, self.clip_range).float()
+
+    def normalize_(self, v):
+        """Normalizes a float tensor in place and returns it."""
+        return v.sub_(self.running_mean).div_(self.running_std).clamp_(-self.clip_range, self.clip_range)
     
     def update_local_stats(self, new_data):
         try:
@@ -699,7 +918,12 @@ class Normalizer:
         except Exception as e:
             print(f"Error during update: {e}")
     
-    def update_global_stats(self):
+    def update_global_stats(self, comm=None):
+        """Folds local stats into the running stats, averaged across comm (default COMM_WORLD)."""
+        sync_normalizer_stats([self], comm if comm is not None else MPI.COMM_WORLD)
+
+    def _take_local_stats(self):
+        """Returns copies of the local stats and zeroes them."""
         with self.lock:
             local_cnt = self.local_cnt.clone()
             local_sum = self.local_sum.clone()
@@ -709,30 +933,18 @@ class Normalizer:
             self.local_sum.zero_()
             self.local_sum_sq.zero_()
 
-        sync_sum, sync_sum_sq, sync_cnt = self.sync_thread_stats(
-                local_sum, local_sum_sq, local_cnt)
+        return local_sum, local_sum_sq, local_cnt
 
-        self.running_cnt += sync_cnt
-        self.running_sum += sync_sum
-        self.running_sum_sq += sync_sum_sq
+    def _fold_stats(self, local_sum, local_sum_sq, local_cnt):
+        self.running_cnt += local_cnt
+        self.running_sum += local_sum
+        self.running_sum_sq += local_sum_sq
 
         self.running_mean = self.running_sum / self.running_cnt
         tmp = self.running_sum_sq / self.running_cnt -\
             (self.running_sum / self.running_cnt)**2
         self.running_std = T.sqrt(T.maximum(self.eps**2, tmp))
 
-    def sync_thread_stats(self, local_sum, local_sum_sq, local_cnt):
-        local_sum[...] = self.mpi_average(local_sum)
-        local_sum_sq[...] = self.mpi_average(local_sum_sq)
-        local_cnt[...] = self.mpi_average(local_cnt)
-        return local_sum, local_sum_sq, local_cnt
-
-    def mpi_average(self, x):
-        buf = T.zeros_like(x)
-        MPI.COMM_WORLD.Allreduce(x.cpu().numpy(), buf.cpu().numpy(), op=MPI.SUM)
-        buf = buf.float() / MPI.COMM_WORLD.Get_size()
-        return buf.to(self.device)
-
     def get_config(self):
         return {
             "params":{
@@ -752,30 +964,29 @@ class Normalizer:
             },
         }
 
-    def save_state(self, file_path):
-        T.save({
-            'local_sum': self.local_sum,
-            'local_sum_sq': self.local_sum_sq,
-            'local_cnt': self.local_cnt,
-            'running_mean': self.running_mean,
-            'running_std': self.running_std,
-            'running_sum': self.running_sum,
-            'running_sum_sq': self.running_sum_sq,
-            'running_cnt': self.running_cnt,
-        }, file_path)
+    # stats written by save_state, one .npy file each
+    _STATE_KEYS = ('local_sum', 'local_sum_sq', 'local_cnt', 'running_mean',
+                   'running_std', 'running_sum', 'running_sum_sq', 'running_cnt')
+
+    def save_state(self, dir_path):
+        """Saves each stat as its own .npy file (shape and dtype kept) in dir_path."""
+        os.makedirs(dir_path, exist_ok=True)
+        for key in self._STATE_KEYS:
+            np.save(os.path.join(dir_path, key + '.npy'), getattr(self, key).detach().cpu().numpy())
 
     @classmethod
-    def load_state(cls, file_path, device='cpu'):
-        state = T.load(file_path)
+    def load_state(cls, dir_path, device='cpu'):
+        if os.path.isdir(dir_path):
+            # mmap each stat and copy it straight onto the target device
+            state = {key: T.tensor(np.load(os.path.join(dir_path, key + '.npy'), mmap_mode='r'), device=device)
+                     for key in cls._STATE_KEYS}
+        else:
+            # states saved before the per-stat .npy layout were T.save files named *.npz
+            file_path = dir_path if os.path.isfile(dir_path) else dir_path + '.npz'
+            state = T.load(file_path, map_location=device)
         normalizer = cls(size=state['running_mean'].shape, device=device)
-        normalizer.local_sum = state['local_sum']
-        normalizer.local_sum_sq = state['local_sum_sq']
-        normalizer.local_cnt = state['local_cnt']
-        normalizer.running_mean = state['running_mean']
-        normalizer.running_std = state['running_std']
-        normalizer.running_sum = state['running_sum']
-        normalizer.running_sum_sq = state['running_sum_sq']
-        normalizer.running_cnt = state['running_cnt']
+        for key in cls._STATE_KEYS:
+            setattr(normalizer, key, state[key])
         return normalizer
 
     
@@ -934,8 +1145,37 @@ class SharedNormalizer:
             normalizer.running_cnt = data['running_cnt']
         return normalizer
     
+def seed_everything(seed, cuda=None):
+    """Seeds python, numpy and torch RNGs; CUDA only when available unless cuda is given."""
+    random.seed(seed)
+    np.random.seed(seed)
+    T.manual_seed(seed)
+    if cuda if cuda is not None else T.cuda.is_available():
+        if T.cuda.device_count() > 1:
+            T.cuda.manual_seed_all(seed)
+        else:
+            T.cuda.manual_seed(seed)
+
 # MULTITHREADING FUNCTIONALITY
 
+class RollingMean:
+    """Mean of the last `window` values, updated in O(1) per value."""
+
+    def __init__(self, window: int = 100):
+        self.values = deque(maxlen=window)
+        self.sum = 0.0
+
+    def add(self, x):
+        # the deque drops its oldest value on append once full
+        if len(self.values) == self.values.maxlen:
+            self.sum -= self.values[0]
+        self.values.append(x)
+        self.sum += x
+
+    @property
+    def mean(self):
+        return self.sum / len(self.values) if self.values else float('nan')
+
 class MPIHelper:
     def __init__(self):
         self.comm = MPI.COMM_WORLD
@@ -951,43 +1191,181 @@ class MPIHelper:
     def gather(self, data, root=0):
         return self.comm.gather(data, root)
 
-def sync_networks(network, comm):
+def sync_networks(networks, comm):
+    """Broadcasts rank 0's parameters to all workers with a single Bcast.
+
+    Accepts a single network or a list of networks; their parameters are
+    flattened into one buffer so several models share one MPI round-trip.
+    Parameters shared between the networks are sent once.
+    """
+    if isinstance(networks, T.nn.Module):
+        networks = [networks]
+    seen = set()
+    params = []
+    for network in networks:
+        for p in network.parameters():
+            if id(p) not in seen:
+                seen.add(id(p))
+                params.append(p)
 
     try:
-        params = np.concatenate([getattr(p, 'data').cpu().numpy().flatten()
-                                for p in network.parameters()])
+        flat = T.nn.utils.parameters_to_vector(params).detach().cpu().numpy()
         logger.debug(f"rank {comm.rank} network params set")
     except Exception as e:
         logger.error(f"rank {comm.rank} error setting network params: {e}", exc_info=True)
     
     try:
-        comm.Bcast(params)
+        comm.Bcast(flat)
         logger.debug(f"rank {comm.rank} network params broadcasted")
     except Exception as e:
         logger.error(f"rank {comm.rank} error broadcasting network params: {e}", exc_info=True)
 
     try:
-        idx = 0
-        for p in network.parameters():
-            getattr(p, 'data').copy_(T.tensor(
-                params[idx:idx + p.data.numel()]).view_as(p.data))
-            idx += p.data.numel()
+        with T.no_grad():
+            # copy in place so parameter views, storage and memory format are preserved
+            vec = T.from_numpy(flat).to(params[0].device)
+            offset = 0
+            for p in params:
+                n = p.numel()
+                p.copy_(vec[offset:offset + n].view_as(p))
+                offset += n
         logger.debug(f"rank {comm.rank} network params copied")
     except Exception as e:
         logger.error(f"rank {comm.rank} error copying network params: {e}", exc_info=True)
 
-def sync_grads_sum(network, comm):
-    grads = np.concatenate([getattr(p, 'grad').cpu().numpy().flatten()
-                           for p in network.parameters()])
-    logger.debug(f"rank {comm.Get_rank()} grads: {grads}")
-    global_grads = np.zeros_like(grads)
-    comm.Allreduce(grads, global_grads, op=MPI.SUM)
-    logger.debug(f"rank {comm.Get_rank()} sum: {global_grads}")
-    idx = 0
-    for p in network.parameters():
-        getattr(p, 'grad').copy_(T.tensor(
-            global_grads[idx:idx + p.data.numel()]).view_as(p.data))
-        idx += p.data.numel()
+def sync_normalizer_stats(normalizers, comm=None):
+    """Folds each normalizer's local stats into its running stats.
+
+    With a multi-rank comm, the stats of all normalizers are averaged across
+    workers in a single allreduce. With comm None (or a single rank) the local
+    stats are folded in directly.
+    """
+    stats = [normalizer._take_local_stats() for normalizer in normalizers]
+    size = comm.Get_size() if comm is not None else 1
+    if size > 1:
+        tensors = [t for stat in stats for t in stat]
+        flat = np.concatenate([t.cpu().numpy().astype(np.float64).ravel() for t in tensors])
+        comm.Allreduce(MPI.IN_PLACE, flat, op=MPI.SUM)
+        flat /= size
+        idx = 0
+        for t in tensors:
+            # copy_ casts back to each tensor's dtype (the int32 count truncates)
+            t.copy_(T.from_numpy(flat[idx:idx + t.numel()]).view_as(t))
+            idx += t.numel()
+    for normalizer, stat in zip(normalizers, stats):
+        normalizer._fold_stats(*stat)
+
+def sync_grads_sum(networks, comm):
+    """Sums gradients across workers with a single allreduce.
+
+    Accepts a single network or a list of networks so that several models
+    (e.g. twin critics) can share one MPI round-trip.
+    """
+    wait_grads_sum(sync_grads_sum_async(networks, comm))
+
+def sync_grads_sum_async(networks, comm):
+    """Starts a non-blocking gradient sum across workers.
+
+    Returns a handle to pass to wait_grads_sum once the summed grads are needed,
+    so independent work can run while the reduction is in flight.
+    """
+    if isinstance(networks, T.nn.Module):
+        networks = [networks]
+    grads = [p.grad for network in networks for p in network.parameters() if p.grad is not None]
+    return _allreduce_grads_async(grads, comm)
+
+def _allreduce_grads_async(grads, comm):
+    if not grads:
+        return None
+    # flatten all grads into one contiguous host buffer and reduce in place
+    flat_grads = _flatten_dense_tensors(grads).cpu()
+    request = comm.Iallreduce(MPI.IN_PLACE, flat_grads.numpy(), op=MPI.SUM)
+    return request, grads, flat_grads
+
+def wait_grads_sum(handle):
+    """Waits on a sync_grads_sum_async handle and copies the summed grads back."""
+    if handle is None:
+        return
+    request, grads, flat_grads = handle
+    request.Wait()
+    for grad, synced in zip(grads, _unflatten_dense_tensors(flat_grads, grads)):
+        grad.copy_(synced)
+
+class GradBucketReducer:
+    """Sums gradients across workers in buckets launched during backward.
+
+    Parameters are grouped in reverse order (roughly the order autograd produces
+    their grads) into buckets of about bucket_cap_mb. While armed, each bucket is
+    reduced with a non-blocking allreduce as soon as all of its grads have been
+    accumulated, overlapping communication with the rest of the backward pass.
+    """
+
+    def __init__(self, networks, comm, bucket_cap_mb: float = 25):
+        if isinstance(networks, T.nn.Module):
+            networks = [networks]
+        self.comm = comm
+        self.armed = False
+
+        # parameters shared between the networks (e.g. a cloned critic's
+        # cnn_model) get a single bucket slot and hook
+        seen = set()
+        params = []
+        for network in networks:
+            for p in network.parameters():
+                if p.requires_grad and id(p) not in seen:
+                    seen.add(id(p))
+                    params.append(p)
+        bucket_cap = bucket_cap_mb * 1024 * 1024
+        self.buckets = []
+        bucket, bucket_size = [], 0
+        for p in reversed(params):
+            bucket.append(p)
+            bucket_size += p.numel() * p.element_size()
+            if bucket_size >= bucket_cap:
+                self.buckets.append(bucket)
+                bucket, bucket_size = [], 0
+        if bucket:
+            self.buckets.append(bucket)
+
+        self._bucket_index = {}
+        for idx, bucket in enumerate(self.buckets):
+            for p in bucket:
+                self._bucket_index[p] = idx
+                p.register_post_accumulate_grad_hook(self._on_grad_ready)
+        self._reset()
+
+    def _reset(self):
+        self._pending = [len(bucket) for bucket in self.buckets]
+        self._handles = [None] * len(self.buckets)
+
+    def arm(self):
+        """Reduces buckets as their grads become ready during the next backward pass."""
+        self._reset()
+        self.armed = True
+
+    def _on_grad_ready(self, param):
+        if not self.armed:
+            return
+        idx = self._bucket_index[param]
+        self._pending[idx] -= 1
+        if self._pending[idx] == 0:
+            self._handles[idx] = _allreduce_grads_async(
+                [p.grad for p in self.buckets[idx] if p.grad is not None], self.comm)
+
+    def wait(self):
+        """Finishes all bucket reductions and copies the summed grads back.
+
+        Buckets that were not launched during backward (not armed, or holding
+        params that got no grad) are reduced here, in bucket order on every rank.
+        """
+        for idx, bucket in enumerate(self.buckets):
+            if self._handles[idx] is None:
+                self._handles[idx] = _allreduce_grads_async(
+                    [p.grad for p in bucket if p.grad is not None], self.comm)
+        for handle in self._handles:
+            wait_grads_sum(handle)
+        self.armed = False
+        self._reset()
 
 def sync_grads_avg(network, comm):
     workers = MPI.COMM_WORLD.Get_size()
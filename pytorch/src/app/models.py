@@ -947,9 +947,19 @@ class CriticModel(Model):
          # Move the model to the specified device
         self.to(self.device)
 
-    def forward(self, state, action, goal=None):
+    def forward(self, state, action, goal=None, encoded=False):
+        # encoded=True means state already went through encode_state
+        if not encoded:
+            state = self.encode_state(state, goal)
+        return self.head(state, action)
+
+    def encode_state(self, state, goal=None):
+        """Runs the (optional) CNN and appends the goal.
+
+        The CNN module is shared by clones, so the encoding can be reused by
+        other critics built from this one.
+        """
         state = state.to(self.device)
-        action = action.to(self.device)
         if goal is not None:
             goal = goal.to(self.device)
 
@@ -961,11 +971,16 @@ class CriticModel(Model):
         if self.goal_shape is not None:
             state = T.cat([state, goal], dim=-1)
 
+        return state
+
+    def head(self, state, action):
+        """Computes the value of an encoded state and action."""
+        action = action.to(self.device)
+
         for layer in self.state_layers.values():
             state = layer(state)
 
         merged = T.cat([state, action], dim=-1)
-        logger.debug(f"merged layer input: {merged}")
         for layer in self.merged_layers.values():
             merged = layer(merged)
 
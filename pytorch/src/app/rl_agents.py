@@ -3,8 +3,14 @@ provides helper functions for loading any subclass of type Agent."""
 
 # imports
 import json
+try:
+    import orjson
+except ImportError:
+    orjson = None
+import math
 import os
 from typing import List
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 import time
 from typing import Union
@@ -12,9 +18,10 @@ from typing import Union
 # import inspect
 # import threading
 from mpi4py import MPI
-# import logging
+import logging
 from logging_config import logger
 import copy
+import dataclasses
 from encoder import CustomJSONEncoder, serialize_env_spec
 
 import rl_callbacks
@@ -39,6 +46,96 @@ import numpy as np
 import random
 import torch.profiler
 
+# monotonic high-resolution clock for training loop timers
+_perf = time.perf_counter
+
+def _noop(*args, **kwargs):
+    pass
+
+def _dispatcher(fns):
+    """Returns a callable that calls each of fns in order, or _noop if there are none."""
+    if not fns:
+        return _noop
+    fns = tuple(fns)
+    def dispatch(*args, **kwargs):
+        for fn in fns:
+            fn(*args, **kwargs)
+    return dispatch
+
+def _log_callback_error(future):
+    """Logs an exception raised by a callback run on a background thread."""
+    e = future.exception()
+    if e is not None:
+        logger.error(f"Error in background callback: {e}", exc_info=e)
+
+def _write_json(path, config, cls=None):
+    """Writes config as compact JSON in a single buffered write."""
+    if orjson is not None:
+        # orjson returns bytes; route unknown types through the custom encoder
+        default = cls().default if cls is not None else None
+        data = orjson.dumps(config, default=default,
+                            option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    else:
+        data = json.dumps(config, cls=cls, separators=(',', ':')).encode('utf-8')
+    with open(path, "wb", buffering=1 << 16) as f:
+        f.write(data)
+
+def load_json(path):
+    """Reads a JSON config file, using orjson when it is installed."""
+    with open(path, "rb") as f:
+        data = f.read()
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+# HER goal functions and goal shape, per env spec id
+_HER_GOAL_SPECS = {}
+
+def _her_goal_spec(env, reset=False):
+    """Returns (desired_goal_func, achieved_goal_func, reward_func, goal_shape) for env.
+
+    Cached by env spec id, so repeated builds skip probing the goal shape. On a
+    cache miss, reset=True resets env before the probe.
+    """
+    spec_id = env.spec.id
+    if spec_id not in _HER_GOAL_SPECS:
+        desired_goal_func, achieved_goal_func, reward_func = gym_helper.get_her_goal_functions(env)
+        if reset:
+            env.reset()
+        _HER_GOAL_SPECS[spec_id] = (desired_goal_func, achieved_goal_func, reward_func, desired_goal_func(env).shape)
+    return _HER_GOAL_SPECS[spec_id]
+
+def _polyak_param_lists(current, target):
+    """Pairs up current and target parameters, skipping ones both models share (the CNN).
+
+    current/target may be a model or a tuple of models updated together.
+    """
+    currents = current if isinstance(current, tuple) else (current,)
+    targets = target if isinstance(target, tuple) else (target,)
+    pairs = [(c, t) for current_model, target_model in zip(currents, targets)
+             for c, t in zip(current_model.parameters(), target_model.parameters()) if c is not t]
+    return [c for c, _ in pairs], [t for _, t in pairs]
+
+# optimizer-specific options read from sweep configs, per optimizer name
+OPT_PARAMS = {
+    "Adam": ("weight_decay",),
+    "Adagrad": ("weight_decay", "lr_decay"),
+    "RMSprop": ("weight_decay", "momentum"),
+    "SGD": ("weight_decay", "momentum"),
+}
+
+def build_opt_params(config, model_type, role, optimizer):
+    """Returns the optimizer kwargs for 'role' ('actor' or 'critic') from a sweep config."""
+    options = config[model_type][f"{model_type}_{role}_optimizer_{optimizer}_options"]
+    return {param: options[f"{optimizer}_{param}"] for param in OPT_PARAMS.get(optimizer, ())}
+
+def build_noise(config, model_type, shape, device=None):
+    """Returns the exploration noise named by a sweep config, built with its kwargs."""
+    mcfg = config[model_type]
+    noise_name = mcfg[f"{model_type}_noise"]
+    noise_kwargs = mcfg[f"{model_type}_noise_{noise_name}"]
+    return helper.NOISE_REGISTRY[noise_name](shape=shape, device=device, **noise_kwargs)
+
 
 # Agent class
 class Agent:
@@ -65,6 +162,38 @@ class Agent:
     def load(cls, folder: str = "models"):
         """Loads the model."""
 
+    def _stage(self, key, array):
+        """Copies a numpy state or goal to the actor's device through reused buffers.
+
+        On CUDA the array goes into a persistent pinned host buffer and is copied
+        (non_blocking) into a persistent device buffer, so get_action doesn't
+        allocate tensors every step. The returned tensor is overwritten by the next
+        call with the same key; each get_action syncs on its result before then.
+        Agents using it set self._staging = {} and have an actor_model.
+        """
+        device = self.actor_model.device
+        if T.device(device).type != 'cuda':
+            return T.as_tensor(array, dtype=T.float32, device=device)
+        array = np.asarray(array, dtype=np.float32)
+        buffers = self._staging.get(key)
+        if buffers is None or buffers[0].shape != array.shape:
+            # allocate as normal tensors even when first called under inference_mode
+            # (e.g. test before train); inference tensors can't be written outside it
+            with T.inference_mode(False):
+                buffers = (T.empty(array.shape, dtype=T.float32, pin_memory=True),
+                           T.empty(array.shape, dtype=T.float32, device=device))
+            self._staging[key] = buffers
+        host, staged = buffers
+        host.copy_(T.from_numpy(array))
+        staged.copy_(host, non_blocking=True)
+        return staged
+
+    def _sample(self, replay_buffer, state_normalizer, goal_normalizer, batch_size):
+        """Samples batch_size transitions from the (HER or own) replay buffer, normalized by the sampler."""
+        if self._use_her:
+            return replay_buffer.sample(batch_size, state_normalizer, goal_normalizer)
+        return self.replay_buffer.sample(batch_size, self.state_normalizer if self.normalize_inputs else None)
+
 
 class ActorCritic(Agent):
     """Actor Critic Agent."""
@@ -852,6 +981,7 @@ class DDPG(Agent):
         normalizer_clip:float=None,
         normalizer_eps:float=0.01,
         warmup:int=1000,
+        use_torch_compile: bool = False,
         callbacks: List = [],
         use_mpi = False,
         save_dir: str = "models",
@@ -886,6 +1016,7 @@ class DDPG(Agent):
             self.normalizer_clip = normalizer_clip
             self.normalizer_eps = normalizer_eps
             self.warmup = warmup
+            self.use_torch_compile = use_torch_compile
             self.device = device
             # logger.debug(f"rank {self.rank} DDPG init attributes set")
         except Exception as e:
@@ -903,6 +1034,10 @@ class DDPG(Agent):
 
             if self.normalize_inputs:
                 self.state_normalizer = helper.Normalizer(self._obs_space_shape, self.normalizer_eps, self.normalizer_clip, self.device)
+
+            # action bounds on the actor's device, so get_action doesn't rebuild them each step
+            self._action_low = T.as_tensor(env.action_space.low, dtype=T.float32, device=self.actor_model.device)
+            self._action_high = T.as_tensor(env.action_space.high, dtype=T.float32, device=self.actor_model.device)
             
             # self.save_dir = save_dir + "/ddpg/"
             if save_dir is not None and "/ddpg/" not in save_dir:
@@ -910,6 +1045,15 @@ class DDPG(Agent):
             elif save_dir is not None and "/ddpg/" in save_dir:
                     self.save_dir = save_dir
 
+            # single-state action selection is launch bound, so compiled forwards
+            # capture CUDA graphs (reduce-overhead). they share the models' parameters
+            if self.use_torch_compile:
+                self._actor_infer = T.compile(self.actor_model, mode="reduce-overhead", dynamic=False)
+                self._target_actor_infer = T.compile(self.target_actor_model, mode="reduce-overhead", dynamic=False)
+            else:
+                self._actor_infer = self.actor_model
+                self._target_actor_infer = self.target_actor_model
+
             # instantiate internal attribute use_her to be switched by HER class if using DDPG
             self._use_her = False
             # logger.debug(f"rank {self.rank} DDPG init: internal attributes set")
@@ -944,6 +1088,10 @@ class DDPG(Agent):
         self._test_episode_config = {}
 
         self._step = None
+        # persistent (pinned host, device) buffers get_action copies single states/goals through
+        self._staging = {}
+        # cached (current, target) parameter lists for soft_update
+        self._polyak_params = {}
 
     def clone(self):
         env = gym.make(self.env.spec)
@@ -966,6 +1114,8 @@ class DDPG(Agent):
             # self.normalize_kwargs,
             self.normalizer_clip,
             self.normalizer_eps,
+            self.warmup,
+            self.use_torch_compile,
             comm = self.comm,
             device = self.device
         )
@@ -974,7 +1124,7 @@ class DDPG(Agent):
     def clone_model(self, model):
         """Clones a model."""
         return model.get_clone()
-    
+
     @classmethod
     def build(
         cls,
@@ -1050,8 +1200,7 @@ class DDPG(Agent):
         device = config[config.model_type][f"{config.model_type}_device"]
 
         # get desired, achieved, reward func for env
-        desired_goal_func, achieved_goal_func, reward_func = gym_helper.get_her_goal_functions(env)
-        goal_shape = desired_goal_func(env).shape
+        desired_goal_func, achieved_goal_func, reward_func, goal_shape = _her_goal_spec(env)
 
         # Get actor clamp value
         # clamp_output = config[config.model_type][f"{config.model_type}_actor_clamp_output"]
@@ -1100,7 +1249,7 @@ class DDPG(Agent):
             action_epsilon = action_epsilon,
             replay_buffer = helper.ReplayBuffer(env=env),
             batch_size = config[config.model_type][f"{config.model_type}_batch_size"],
-            noise = helper.Noise.create_instance(config[config.model_type][f"{config.model_type}_noise"], shape=env.action_space.shape, **config[config.model_type][f"{config.model_type}_noise_{config[config.model_type][f'{config.model_type}_noise']}"]),
+            noise = build_noise(config, config.model_type, env.action_space.shape),
             normalize_inputs = normalize_inputs,
             # normalize_kwargs = normalize_kwargs,
             normalizer_clip = normalizer_clip,
@@ -1163,8 +1312,8 @@ class DDPG(Agent):
         # print('goal normalizer')
         # print(goal_normalizer.get_config())
 
-        # make sure state is a tensor and on correct device
-        state = T.tensor(state, dtype=T.float32, device=self.actor_model.device)
+        # copy state to the actor's device through the pinned staging buffers
+        state = self._stage('state', state)
 
         # check if get action is for testing
         if test:
@@ -1176,17 +1325,11 @@ class DDPG(Agent):
                     state = self.state_normalizer.normalize(state)
                 # (HER) else if using HER, normalize using passed normalizer
                 elif self._use_her:
-                    #DEBUG
-                    print('used passed state normalizer')
                     state = state_normalizer.normalize(state)
 
                 # (HER) normalize goal if self._use_her using passed normalizer
                 if self._use_her:
-                    goal = goal_normalizer.normalize(goal)
-                    # make sure goal is a tensor and on correct device
-                    goal = T.tensor(goal, dtype=T.float32, device=self.actor_model.device)
-                    #DEBUG
-                    print('used passed goal normalizer')
+                    goal = goal_normalizer.normalize(self._stage('goal', goal))
                 
                 # permute state to (C,H,W) if actor using cnn model
                 if self.actor_model.cnn_model:
@@ -1194,7 +1337,7 @@ class DDPG(Agent):
 
                 # get action
                 # _, action = self.actor_model(state, goal)
-                _, action = self.target_actor_model(state, goal) # use target network for testing
+                _, action = self._target_actor_infer(state, goal) # use target network for testing
                 # transfer action to cpu, detach from any graphs, tranform to numpy, and flatten
                 action_np = action.cpu().detach().numpy().flatten()
         
@@ -1220,10 +1363,7 @@ class DDPG(Agent):
                     
                     # (HER) normalize goal if self._use_her using passed normalizer
                     if self._use_her:
-                        goal = goal_normalizer.normalize(goal)
-                        # print(f'normalized goal: {goal}')
-                        # make sure goal is a tensor and on correct device
-                        goal = T.tensor(goal, dtype=T.float32, device=self.actor_model.device)
+                        goal = goal_normalizer.normalize(self._stage('goal', goal))
 
                     # permute state to (C,H,W) if actor using cnn model
                     if self.actor_model.cnn_model:
@@ -1237,14 +1377,13 @@ class DDPG(Agent):
                         action = T.tensor(self.env.action_space.sample(), dtype=T.float32, device=self.actor_model.device)
 
                     else:
-                        _, pi = self.actor_model(state, goal)
+                        # the action is only read back as numpy, so skip autograd tracking
+                        with T.inference_mode():
+                            _, pi = self._actor_infer(state, goal)
                         # print(f'pi: {pi}')
 
-                        # Convert the action space bounds to a tensor on the same device
-                        action_space_high = T.tensor(self.env.action_space.high, dtype=T.float32, device=self.actor_model.device)
-                        action_space_low = T.tensor(self.env.action_space.low, dtype=T.float32, device=self.actor_model.device)
-                        # print(f'actor model device:{self.actor_model.device}')
-                        action = (pi + noise).clip(action_space_low, action_space_high)
+                        # clip to the action bounds cached on the actor's device
+                        action = (pi + noise).clip(self._action_low, self._action_high)
                         # print(f'action + noise: {action}')
 
                     noise_np = noise.cpu().detach().numpy().flatten()
@@ -1263,9 +1402,7 @@ class DDPG(Agent):
 
                         # normalize goal if self._use_her
                         if self._use_her:
-                            goal = goal_normalizer.normalize(goal)
-                            # make sure goal is a tensor and on correct device
-                            goal = T.tensor(goal, dtype=T.float32, device=self.actor_model.device)
+                            goal = goal_normalizer.normalize(self._stage('goal', goal))
                         
                         # permute state to (C,H,W) if actor using cnn model
                         if self.actor_model.cnn_model:
@@ -1278,13 +1415,10 @@ class DDPG(Agent):
                             action = T.tensor(self.env.action_space.sample(), dtype=T.float32, device=self.actor_model.device)
 
                         else:
-                            _, pi = self.actor_model(state, goal)
-
-                            # Convert the action space bounds to a tensor on the same device
-                            action_space_high = T.tensor(self.env.action_space.high, dtype=T.float32, device=self.actor_model.device)
-                            action_space_low = T.tensor(self.env.action_space.low, dtype=T.float32, device=self.actor_model.device)
+                            _, pi = self._actor_infer(state, goal)
 
-                            action = (pi + noise).clip(action_space_low, action_space_high)
+                            # clip to the action bounds cached on the actor's device
+                            action = (pi + noise).clip(self._action_low, self._action_high)
 
                         noise_np = noise.cpu().detach().numpy().flatten()
                         action_np = action.cpu().detach().numpy().flatten()
@@ -1310,24 +1444,17 @@ class DDPG(Agent):
     def learn(self, replay_buffer:Buffer=None,
               state_normalizer:Union[Normalizer, SharedNormalizer]=None,
               goal_normalizer:Union[Normalizer, SharedNormalizer]=None,
+              batch:tuple=None,
               ):
 
-        # sample a batch of experiences from the replay buffer
+        # sample a batch of experiences from the replay buffer, normalized by the sampler
+        # (unless an already sampled and normalized batch is passed, see learn_batch)
+        if batch is None:
+            batch = self._sample(replay_buffer, state_normalizer, goal_normalizer, self.batch_size)
         if self._use_her: # if using HER
-            states, actions, rewards, next_states, dones, achieved_goals, next_achieved_goals, desired_goals = replay_buffer.sample(self.batch_size)
+            states, actions, rewards, next_states, dones, achieved_goals, next_achieved_goals, desired_goals = batch
         else:
-            states, actions, rewards, next_states, dones = self.replay_buffer.sample(self.batch_size)
-        
-        # normalize states if self.normalize_inputs
-        if self.normalize_inputs:
-            states = self.state_normalizer.normalize(states)
-            next_states = self.state_normalizer.normalize(next_states)
-
-        # (HER) Use passed normalizers to normalize states and goals
-        if self._use_her:
-            states = state_normalizer.normalize(states)
-            next_states = state_normalizer.normalize(next_states)
-            desired_goals = goal_normalizer.normalize(desired_goals)
+            states, actions, rewards, next_states, dones = batch
         
         # Convert to tensors
         # states = T.tensor(states, dtype=T.float32, device=self.actor_model.device)
@@ -1430,13 +1557,39 @@ class DDPG(Agent):
         self._train_step_config['target_actor_predictions'] = target_actions.mean()
         self._train_step_config['target_critic_predictions'] = target_critic_values.mean()
         
-        return actor_loss.item(), critic_loss.item()
+        # detached losses instead of .item() to avoid a device sync every step
+        return actor_loss.detach(), critic_loss.detach()
+
+    def learn_batch(self, replay_buffer:Buffer=None,
+                    state_normalizer:Union[Normalizer, SharedNormalizer]=None,
+                    goal_normalizer:Union[Normalizer, SharedNormalizer]=None,
+                    n_updates:int=1,
+                    ):
+        """Runs n_updates learn steps on slices of one n_updates * batch_size sample.
+
+        The sample is normalized by the sampler. Returns the mean actor and critic
+        losses over the updates as detached tensors.
+        """
+        batch = self._sample(replay_buffer, state_normalizer, goal_normalizer, self.batch_size * n_updates)
+        actor_losses, critic_losses = [], []
+        for i in range(n_updates):
+            rows = slice(i * self.batch_size, (i + 1) * self.batch_size)
+            actor_loss, critic_loss = self.learn(batch=tuple(t[rows] for t in batch))
+            actor_losses.append(actor_loss)
+            critic_losses.append(critic_loss)
+        return T.stack(actor_losses).mean(), T.stack(critic_losses).mean()
         
     
     def soft_update(self, current, target):
+        # fused multi-tensor polyak update: target = tau * current + (1 - tau) * target
+        # current/target may be a model or a tuple of models updated together
+        params = self._polyak_params.get((current, target))
+        if params is None:
+            params = self._polyak_params[(current, target)] = _polyak_param_lists(current, target)
+        current_params, target_params = params
         with T.no_grad():
-            for current_params, target_params in zip(current.parameters(), target.parameters()):
-                target_params.data.copy_(self.tau * current_params.data + (1 - self.tau) * target_params.data)
+            T._foreach_mul_(target_params, 1 - self.tau)
+            T._foreach_add_(target_params, current_params, alpha=self.tau)
 
     @classmethod
     def sweep_train(
@@ -1659,7 +1812,7 @@ class DDPG(Agent):
                 action_epsilon = action_epsilon,
                 replay_buffer = replay_buffer,
                 batch_size = config[model_type][f"{model_type}_batch_size"],
-                noise = helper.Noise.create_instance(config[model_type][f"{model_type}_noise"], shape=env.action_space.shape, **config[model_type][f"{model_type}_noise_{config[model_type][f'{model_type}_noise']}"], device=device),
+                noise = build_noise(config, model_type, env.action_space.shape, device),
                 warmup = config[model_type][f"{model_type}_warmup"],
                 callbacks = callbacks,
                 comm = comm,
@@ -1964,6 +2117,7 @@ class DDPG(Agent):
                 'normalizer_clip': self.normalizer_clip,
                 'normalizer_eps': self.normalizer_eps,
                 'warmup': self.warmup,
+                'use_torch_compile': self.use_torch_compile,
                 "callbacks": [callback.get_config() for callback in self.callbacks if self.callbacks is not None],
                 "use_mpi": self.use_mpi,
                 "save_dir": self.save_dir,
@@ -1984,15 +2138,14 @@ class DDPG(Agent):
         os.makedirs(self.save_dir, exist_ok=True)
 
         # writes and saves JSON file of DDPG agent config
-        with open(self.save_dir + "/config.json", "w", encoding="utf-8") as f:
-            json.dump(config, f)
+        _write_json(self.save_dir + "/config.json", config)
 
         # saves policy and value model
         self.actor_model.save(self.save_dir)
         self.critic_model.save(self.save_dir)
 
         if self.normalize_inputs:
-            self.state_normalizer.save_state(self.save_dir + "state_normalizer.npz")
+            self.state_normalizer.save_state(self.save_dir + "state_normalizer")
 
         # if wandb callback, save wandb config
         # if self._wandb:
@@ -2047,17 +2200,31 @@ class DDPG(Agent):
             normalize_inputs = normalize_inputs,
             normalizer_clip = normalizer_clip,
             warmup = config['warmup'],
+            use_torch_compile = config.get('use_torch_compile', False),
             callbacks=callbacks,
             save_dir=config["save_dir"],
             device=config["device"],
         )
 
         if agent.normalize_inputs:
-            agent.state_normalizer = helper.Normalizer.load_state(config['save_dir'] + "state_normalizer.npz")
+            agent.state_normalizer = helper.Normalizer.load_state(config['save_dir'] + "state_normalizer", device=agent.device)
 
         return agent
     
 
+def _td3_targets(rewards: T.Tensor, dones: T.Tensor, values_a: T.Tensor, values_b: T.Tensor,
+                 discount: float, clamp_her: bool, her_min: float) -> T.Tensor:
+    """Clipped double-Q targets."""
+    targets = rewards + (1 - dones) * discount * T.minimum(values_a, values_b)
+    if clamp_her:
+        targets = targets.clamp(min=her_min, max=0.0)
+    return targets
+
+# scripted so the element-wise ops run as one fused graph in eager learn steps;
+# the plain function is used when the target step is traced by torch.compile
+_compute_td3_targets = T.jit.script(_td3_targets)
+
+
 class TD3(Agent):
     """Twin Delayed Deep Deterministic Policy Gradient Agent."""
 
@@ -2075,11 +2242,19 @@ class TD3(Agent):
         target_noise_stddev: float = 0.2,
         target_noise_clip: float = 0.5,
         actor_update_delay: int = 2,
+        accumulation_steps: int = 1,
         normalize_inputs: bool = False,
         # normalize_kwargs: dict = {},
         normalizer_clip:float=None,
         normalizer_eps:float=0.01,
         warmup:int=1000,
+        use_torch_compile: bool = False,
+        num_prefetch: int = 0,
+        preempt_threshold: float = None,
+        num_envs: int = 1,
+        rollout_bf16: bool = False,
+        share_replay_buffer: bool = False,
+        n_train_steps: int = 1,
         callbacks: List = [],
         save_dir: str = "models",
         use_mpi = False,
@@ -2116,11 +2291,19 @@ class TD3(Agent):
             #                                               stddev=target_action_stddev, device=device)
             self.target_noise_clip = target_noise_clip
             self.actor_update_delay = actor_update_delay
+            self.accumulation_steps = accumulation_steps
             self.normalize_inputs = normalize_inputs
             # self.normalize_kwargs = normalize_kwargs
             self.normalizer_clip = normalizer_clip
             self.normalizer_eps = normalizer_eps
             self.warmup = warmup
+            self.use_torch_compile = use_torch_compile
+            self.num_prefetch = num_prefetch
+            self.preempt_threshold = preempt_threshold
+            self.num_envs = num_envs
+            self.rollout_bf16 = rollout_bf16
+            self.share_replay_buffer = share_replay_buffer
+            self.n_train_steps = n_train_steps
             self.device = device
             # if self.use_mpi:
             #     logger.debug(f"rank {self.rank} TD3 init attributes set")
@@ -2134,8 +2317,11 @@ class TD3(Agent):
         
         # set internal attributes
         try:
-            if isinstance(env.observation_space, gym.spaces.dict.Dict):
-                self._obs_space_shape = env.observation_space['observation'].shape
+            # cache observation space type check so step loops don't repeat it
+            self._obs_is_dict = isinstance(env.observation_space, gym.spaces.dict.Dict)
+            self._goal_key = 'observation'
+            if self._obs_is_dict:
+                self._obs_space_shape = env.observation_space[self._goal_key].shape
             else:
                 self._obs_space_shape = env.observation_space.shape
 
@@ -2148,6 +2334,73 @@ class TD3(Agent):
             elif save_dir is not None and "/td3/" in save_dir:
                     self.save_dir = save_dir
 
+            # cache action bounds and HER target clamp so learn doesn't rebuild them each step
+            self._act_low = T.as_tensor(env.action_space.low[0], dtype=T.float32, device=self.device)
+            self._act_high = T.as_tensor(env.action_space.high[0], dtype=T.float32, device=self.device)
+            # per-dimension bounds on the actor's device for clipping exploration actions in get_action
+            self._action_low = T.as_tensor(env.action_space.low, dtype=T.float32, device=self.actor_model.device)
+            self._action_high = T.as_tensor(env.action_space.high, dtype=T.float32, device=self.actor_model.device)
+            self._her_clamp_min = -1 / (1 - self.discount)
+
+            # observations arrive as NHWC, so run conv layers in channels_last to
+            # consume the permuted batches without a layout copy (clones share the CNN)
+            for model in (self.actor_model, self.critic_model_a, self.critic_model_b):
+                if model.cnn_model:
+                    model.cnn_model.to(memory_format=T.channels_last)
+
+            # target computation runs the same fixed-shape graph every step, so it can
+            # be specialized by torch.compile (dynamic=False) when enabled
+            self._target_head_params = None
+            if self.use_torch_compile:
+                self._targets_fn = _td3_targets
+                self._target_step = T.compile(self._compute_targets, dynamic=False)
+                # compiled forwards share the models' parameters. single-state inference
+                # is launch bound, so those paths also capture CUDA graphs (reduce-overhead)
+                self._actor_forward = T.compile(self.actor_model, dynamic=False)
+                self._actor_infer = T.compile(self.actor_model, mode="reduce-overhead", dynamic=False)
+                self._target_actor_infer = T.compile(self.target_actor_model, mode="reduce-overhead", dynamic=False)
+                self._critic_head_a = T.compile(self.critic_model_a.head, dynamic=False)
+                # run both target critic heads as one vmapped call
+                if self.target_critic_model_b.cnn_model is self.target_critic_model_a.cnn_model:
+                    self._stack_target_critic_heads()
+                # let matmuls/convs use TF32 tensor cores alongside compilation
+                T.backends.cuda.matmul.allow_tf32 = True
+                T.backends.cudnn.allow_tf32 = True
+            else:
+                self._targets_fn = _compute_td3_targets
+                self._target_step = self._compute_targets
+                self._actor_forward = self.actor_model
+                self._actor_infer = self.actor_model
+                self._target_actor_infer = self.target_actor_model
+                self._critic_head_a = self.critic_model_a.head
+
+            # run both online critic heads as one vmapped call when they share the CNN
+            self._critic_heads = None
+            if self.critic_model_b.cnn_model is self.critic_model_a.cnn_model:
+                self._critic_heads = self._build_online_critic_heads()
+                if self.use_torch_compile:
+                    self._critic_heads = T.compile(self._critic_heads, dynamic=False)
+
+            # bf16 copy of the actor for env rollouts (critics and targets stay fp32),
+            # refreshed from the actor after each actor optimizer step
+            self._rollout_actor = None
+            if self.rollout_bf16:
+                self._rollout_actor = self.clone_model(self.actor_model)
+                if self._rollout_actor.cnn_model:
+                    # clones share the CNN module; the rollout copy needs its own to cast
+                    self._rollout_actor.cnn_model = copy.deepcopy(self.actor_model.cnn_model)
+                self._rollout_actor.to(dtype=T.bfloat16).eval().requires_grad_(False)
+                self._rollout_params = list(self._rollout_actor.parameters())
+                self._actor_params = list(self.actor_model.parameters())
+                if self.use_torch_compile:
+                    self._rollout_forward = T.compile(self._rollout_actor, mode="reduce-overhead", dynamic=False)
+                else:
+                    self._rollout_forward = self._rollout_actor
+
+            # bucketed grad allreduce, set up by _init_mpi_sync (use_mpi may be switched on after init)
+            self._critic_grad_reducer = None
+            self._actor_grad_reducer = None
+
             # instantiate internal attribute use_her to be switched by HER class if using DDPG
             self._use_her = False
             # if self.use_mpi:
@@ -2184,10 +2437,29 @@ class TD3(Agent):
         self._train_config = {}
         self._train_episode_config = {}
         self._train_step_config = {}
+        # set by train(); False when no callback reads the per-step logs
+        self._needs_step_logs = True
         self._test_config = {}
         self._test_episode_config = {}
 
         self._step = None
+        # counts learn calls for gradient accumulation
+        self._accum_step = 0
+        # learn() calls so far; paces the delayed actor updates
+        self._learn_step = 0
+        self._actor_accumulated = False
+        # actor loss of the latest actor update step, returned by learn on critic-only steps
+        self._last_actor_loss = None
+        # cached (current, target) parameter lists for soft_update
+        self._polyak_params = {}
+        # background batch sampler, started on the first learn call when num_prefetch > 0
+        self._prefetcher = None
+        # persistent (pinned host, device) buffers get_action copies single states/goals through
+        self._staging = {}
+        # side stream for host to device batch copies in learn
+        self._copy_stream = T.cuda.Stream() if T.device(self.device).type == 'cuda' and T.cuda.is_available() else None
+        # pending non-blocking exchange of episode progress flags (MPI straggler preemption)
+        self._progress_request = None
 
     def clone(self):
         env = gym.make(self.env.spec)
@@ -2232,50 +2504,26 @@ class TD3(Agent):
         save_dir: str = "models/",
     ):
         """Builds the agent."""
+        # bind model type config once instead of re-indexing on every lookup
+        mt = config.model_type
+        mcfg = config[mt]
+        def cfg(key):
+            return mcfg[f"{mt}_{key}"]
+
         # Actor
-        actor_learning_rate=config[config.model_type][f"{config.model_type}_actor_learning_rate"]
-        actor_optimizer = config[config.model_type][f"{config.model_type}_actor_optimizer"]
+        actor_learning_rate = cfg("actor_learning_rate")
+        actor_optimizer = cfg("actor_optimizer")
         # get optimizer params
-        actor_optimizer_params = {}
-        if actor_optimizer == "Adam":
-            actor_optimizer_params['weight_decay'] = \
-                config[config.model_type][f"{config.model_type}_actor_optimizer_{actor_optimizer}_options"][f'{actor_optimizer}_weight_decay']
-        
-        elif actor_optimizer == "Adagrad":
-            actor_optimizer_params['weight_decay'] = \
-                config[config.model_type][f"{config.model_type}_actor_optimizer_{actor_optimizer}_options"][f'{actor_optimizer}_weight_decay']
-            actor_optimizer_params['lr_decay'] = \
-                config[config.model_type][f"{config.model_type}_actor_optimizer_{actor_optimizer}_options"][f'{actor_optimizer}_lr_decay']
-        
-        elif actor_optimizer == "RMSprop" or actor_optimizer == "SGD":
-            actor_optimizer_params['weight_decay'] = \
-                config[config.model_type][f"{config.model_type}_actor_optimizer_{actor_optimizer}_options"][f'{actor_optimizer}_weight_decay']
-            actor_optimizer_params['momentum'] = \
-                config[config.model_type][f"{config.model_type}_actor_optimizer_{actor_optimizer}_options"][f'{actor_optimizer}_momentum']
+        actor_optimizer_params = build_opt_params(config, mt, "actor", actor_optimizer)
 
-        actor_normalize_layers = config[config.model_type][f"{config.model_type}_actor_normalize_layers"]
+        actor_normalize_layers = cfg("actor_normalize_layers")
 
         # Critic
-        critic_learning_rate=config[config.model_type][f"{config.model_type}_critic_learning_rate"]
-        critic_optimizer = config[config.model_type][f"{config.model_type}_critic_optimizer"]
-        critic_optimizer_params = {}
-        if critic_optimizer == "Adam":
-            critic_optimizer_params['weight_decay'] = \
-                config[config.model_type][f"{config.model_type}_critic_optimizer_{critic_optimizer}_options"][f'{critic_optimizer}_weight_decay']
-        
-        elif critic_optimizer == "Adagrad":
-            critic_optimizer_params['weight_decay'] = \
-                config[config.model_type][f"{config.model_type}_critic_optimizer_{critic_optimizer}_options"][f'{critic_optimizer}_weight_decay']
-            critic_optimizer_params['lr_decay'] = \
-                config[config.model_type][f"{config.model_type}_critic_optimizer_{critic_optimizer}_options"][f'{critic_optimizer}_lr_decay']
-        
-        elif critic_optimizer == "RMSprop" or critic_optimizer == "SGD":
-            critic_optimizer_params['weight_decay'] = \
-                config[config.model_type][f"{config.model_type}_critic_optimizer_{critic_optimizer}_options"][f'{critic_optimizer}_weight_decay']
-            critic_optimizer_params['momentum'] = \
-                config[config.model_type][f"{config.model_type}_critic_optimizer_{critic_optimizer}_options"][f'{critic_optimizer}_momentum']
+        critic_learning_rate = cfg("critic_learning_rate")
+        critic_optimizer = cfg("critic_optimizer")
+        critic_optimizer_params = build_opt_params(config, mt, "critic", critic_optimizer)
         
-        critic_normalize_layers = config[config.model_type][f"{config.model_type}_critic_normalize_layers"]
+        critic_normalize_layers = cfg("critic_normalize_layers")
 
         # Check if CNN layers and if so, build CNN model
         if actor_cnn_layers:
@@ -2289,14 +2537,13 @@ class TD3(Agent):
             critic_cnn_model = None
 
         # Set device
-        device = config[config.model_type][f"{config.model_type}_device"]
+        device = cfg("device")
 
         # get desired, achieved, reward func for env
-        desired_goal_func, achieved_goal_func, reward_func = gym_helper.get_her_goal_functions(env)
-        goal_shape = desired_goal_func(env).shape
+        desired_goal_func, achieved_goal_func, reward_func, goal_shape = _her_goal_spec(env)
 
         # Get actor clamp value
-        # clamp_output = config[config.model_type][f"{config.model_type}_actor_clamp_output"]
+        # clamp_output = cfg("actor_clamp_output")
         
         actor_model = models.ActorModel(env = env,
                                         cnn_model = actor_cnn_model,
@@ -2324,25 +2571,25 @@ class TD3(Agent):
         )
 
         # action epsilon
-        action_epsilon = config[config.model_type][f"{config.model_type}_epsilon_greedy"]
+        action_epsilon = cfg("epsilon_greedy")
 
         # normalize inputs
-        normalize_inputs = config[config.model_type][f"{config.model_type}_normalize_input"]
+        normalize_inputs = cfg("normalize_input")
         # normalize_kwargs = {}
         if "True" in normalize_inputs:
-            # normalize_kwargs = config[config.model_type][f"{config.model_type}_normalize_clip"]
-            normalizer_clip = config[config.model_type][f"{config.model_type}_normalize_clip"]
+            # normalize_kwargs = cfg("normalize_clip")
+            normalizer_clip = cfg("normalize_clip")
 
         agent = cls(
             env = env,
             actor_model = actor_model,
             critic_model = critic_model,
-            discount = config[config.model_type][f"{config.model_type}_discount"],
-            tau = config[config.model_type][f"{config.model_type}_tau"],
+            discount = cfg("discount"),
+            tau = cfg("tau"),
             action_epsilon = action_epsilon,
             replay_buffer = helper.ReplayBuffer(env=env),
-            batch_size = config[config.model_type][f"{config.model_type}_batch_size"],
-            noise = helper.Noise.create_instance(config[config.model_type][f"{config.model_type}_noise"], shape=env.action_space.shape, **config[config.model_type][f"{config.model_type}_noise_{config[config.model_type][f'{config.model_type}_noise']}"]),
+            batch_size = cfg("batch_size"),
+            noise = build_noise(config, mt, env.action_space.shape),
             normalize_inputs = normalize_inputs,
             # normalize_kwargs = normalize_kwargs,
             normalizer_clip = normalizer_clip,
@@ -2354,6 +2601,26 @@ class TD3(Agent):
 
         return agent
 
+    def _init_mpi_sync(self):
+        """Sets up data parallel training over self.comm.
+
+        Like DDP construction, rank 0's weights are broadcast so every rank starts
+        from identical models, and the bucketed gradient reducers that learn arms
+        during backward are registered. Must be called on all ranks before any
+        parameter update.
+        """
+        try:
+            helper.sync_networks([self.actor_model, self.critic_model_a, self.critic_model_b,
+                                  self.target_actor_model, self.target_critic_model_a, self.target_critic_model_b],
+                                 self.comm)
+            if self._rollout_actor is not None:
+                self._sync_rollout_actor()
+            self._critic_grad_reducer = helper.GradBucketReducer([self.critic_model_a, self.critic_model_b], self.comm)
+            self._actor_grad_reducer = helper.GradBucketReducer(self.actor_model, self.comm)
+        except Exception as e:
+            logger.error(f"rank {self.rank} Error in TD3._init_mpi_sync: {e}", exc_info=True)
+            raise
+
     def _init_her(self):
             # self.normalize_inputs = True
             self._use_her = True
@@ -2433,30 +2700,22 @@ class TD3(Agent):
         # print('goal normalizer')
         # print(goal_normalizer.get_config())
 
+        # pick a single state normalizer: HER passes its own, otherwise use the agent's if enabled
+        norm = state_normalizer if self._use_her else (self.state_normalizer if self.normalize_inputs else None)
+
         # check if get action is for testing
         if test:
-            # print(f'action test fired')
-            with T.no_grad():
-                # print('no grad fired')
-                # normalize state if self.normalize_inputs
-                if self.normalize_inputs:
-                    state = self.state_normalizer.normalize(state)
-                # (HER) else if using HER, normalize using passed normalizer
-                elif self._use_her:
-                    #DEBUG
-                    print('used passed state normalizer')
-                    state = state_normalizer.normalize(state)
-
-                # make sure state is a tensor and on correct device
-                state = T.tensor(state, dtype=T.float32, device=self.actor_model.device)
+            # deterministic fast path: no noise, epsilon or step logging (test doesn't log steps)
+            # inference mode skips view tracking and version counter bumps
+            with T.inference_mode():
+                # copy state to the actor's device, then normalize it there
+                state = self._stage('state', state)
+                if norm is not None:
+                    state = norm.normalize(state)
                 
                 # (HER) normalize goal if self._use_her using passed normalizer
                 if self._use_her:
-                    goal = goal_normalizer.normalize(goal)
-                    # make sure goal is a tensor and on correct device
-                    goal = T.tensor(goal, dtype=T.float32, device=self.actor_model.device)
-                    #DEBUG
-                    print('used passed goal normalizer')
+                    goal = goal_normalizer.normalize(self._stage('goal', goal))
                 
                 # permute state to (C,H,W) if actor using cnn model
                 if self.actor_model.cnn_model:
@@ -2464,9 +2723,9 @@ class TD3(Agent):
 
                 # get action
                 # _, action = self.actor_model(state, goal)
-                _, action = self.target_actor_model(state, goal) # use target network for testing
-                # transfer action to cpu, detach from any graphs, tranform to numpy, and flatten
-                action_np = action.cpu().detach().numpy().flatten()
+                _, action = self._target_actor_infer(state, goal) # use target network for testing
+                # transfer action to cpu, tranform to numpy, and flatten
+                return action.cpu().numpy().flatten()
         
         # check if using epsilon greedy
         else: #self.action_epsilon > 0.0:
@@ -2481,22 +2740,15 @@ class TD3(Agent):
                 # if gradient tracking is true
                 if grad:
                     # print('with grad fired')
-                    # normalize state if self.normalize_inputs
-                    if self.normalize_inputs==True or self._use_her==True:
-                        state = self.state_normalizer.normalize(state)
-                    # (HER) use passed state normalizer if using HER
-                    # elif self._use_her:
-                    #     state = state_normalizer.normalize(state)
-                    
-                    # make sure state is a tensor and on correct device
-                    state = T.tensor(state, dtype=T.float32, device=self.actor_model.device)
+                    # copy state to the actor's device, then normalize it there
+                    state = self._stage('state', state)
+                    if norm is not None:
+                        state = norm.normalize(state)
                     
                     # (HER) normalize goal if self._use_her using passed normalizer
                     if self._use_her==True:
-                        goal = goal_normalizer.normalize(goal)
+                        goal = goal_normalizer.normalize(self._stage('goal', goal))
                         # print(f'normalized goal: {goal}')
-                        # make sure goal is a tensor and on correct device
-                        goal = T.tensor(goal, dtype=T.float32, device=self.actor_model.device)
 
                     # permute state to (C,H,W) if actor using cnn model
                     if self.actor_model.cnn_model:
@@ -2511,14 +2763,11 @@ class TD3(Agent):
                         action = T.tensor(self.env.action_space.sample(), dtype=T.float32, device=self.actor_model.device)
 
                     else:
-                        _, pi = self.actor_model(state, goal)
+                        pi = self._rollout_pi(state, goal, self._actor_forward)
                         # print(f'pi: {pi}')
 
-                        # Convert the action space bounds to a tensor on the same device
-                        action_space_high = T.tensor(self.env.action_space.high, dtype=T.float32, device=self.actor_model.device)
-                        action_space_low = T.tensor(self.env.action_space.low, dtype=T.float32, device=self.actor_model.device)
-                        # print(f'actor model device:{self.actor_model.device}')
-                        action = (pi + noise).clip(action_space_low, action_space_high)
+                        # clip to the action bounds cached on the actor's device
+                        action = (pi + noise).clip(self._action_low, self._action_high)
                         # print(f'action + noise: {action}')
 
                     noise_np = noise.cpu().detach().numpy().flatten()
@@ -2526,22 +2775,15 @@ class TD3(Agent):
                     # print(f'action np: {action_np}')
 
                 else:
-                    with T.no_grad():
+                    with T.inference_mode():
                         # print('without grad fired')
-                        # normalize state if self.normalize_inputs
-                        if self.normalize_inputs==True:
-                            state = self.state_normalizer.normalize(state)
-                        # (HER) use passed state normalizer if using HER
-                        elif self._use_her==True:
-                            state = state_normalizer.normalize(state)
-
-                        # make sure state is a tensor and on correct device
-                        state = T.tensor(state, dtype=T.float32, device=self.actor_model.device)
+                        # copy state to the actor's device, then normalize it there
+                        state = self._stage('state', state)
+                        if norm is not None:
+                            state = norm.normalize(state)
                         # normalize goal if self._use_her
                         if self._use_her==True:
-                            goal = goal_normalizer.normalize(goal)
-                            # make sure goal is a tensor and on correct device
-                            goal = T.tensor(goal, dtype=T.float32, device=self.actor_model.device)
+                            goal = goal_normalizer.normalize(self._stage('goal', goal))
                         
                         # permute state to (C,H,W) if actor using cnn model
                         if self.actor_model.cnn_model:
@@ -2555,25 +2797,16 @@ class TD3(Agent):
                             action = T.tensor(self.env.action_space.sample(), dtype=T.float32, device=self.actor_model.device)
 
                         else:
-                            _, pi = self.actor_model(state, goal)
+                            pi = self._rollout_pi(state, goal, self._actor_infer)
 
-                            # Convert the action space bounds to a tensor on the same device
-                            action_space_high = T.tensor(self.env.action_space.high, dtype=T.float32, device=self.actor_model.device)
-                            action_space_low = T.tensor(self.env.action_space.low, dtype=T.float32, device=self.actor_model.device)
-
-                            action = (pi + noise).clip(action_space_low, action_space_high)
+                            # clip to the action bounds cached on the actor's device
+                            action = (pi + noise).clip(self._action_low, self._action_high)
 
                         noise_np = noise.cpu().detach().numpy().flatten()
                         action_np = action.cpu().detach().numpy().flatten()
 
-        if test:
-            # loop over all actions to log to wandb
-            for i, a in enumerate(action_np):
-                # Log the values to wandb
-                self._train_step_config[f'action_{i}'] = a
-
-        else:
-            # Loop over the noise and action values and log them to wandb
+        # Loop over the noise and action values and log them to wandb
+        if self._needs_step_logs:
             for i, (a,n) in enumerate(zip(action_np, noise_np)):
                 # Log the values to wandb
                 self._train_step_config[f'action_{i}'] = a
@@ -2827,72 +3060,100 @@ class TD3(Agent):
 
     def learn(self, replay_buffer: Buffer = None,
           state_normalizer: Union[Normalizer, SharedNormalizer] = None,
-          goal_normalizer: Union[Normalizer, SharedNormalizer] = None):
+          goal_normalizer: Union[Normalizer, SharedNormalizer] = None,
+          batch: tuple = None):
         # Timer for the entire function
         total_start_time = time.time()
+
+        # fallback for callers that learn without TD3.train (which syncs up front);
+        # must run before any forward so targets come from rank 0's weights
+        if self.use_mpi==True and self._critic_grad_reducer is None:
+            self._init_mpi_sync()
         
-        # Sample a batch of experiences from the replay buffer
+        # Sample a batch of experiences from the replay buffer, normalized by the sampler
+        # (unless an already sampled batch is passed, see learn_batch)
         sample_start_time = time.time()
-        if self._use_her:  # if using HER
-            states, actions, rewards, next_states, dones, achieved_goals, next_achieved_goals, desired_goals = replay_buffer.sample(self.batch_size)
+        if batch is None:
+            sample_batch = lambda: self._sample(replay_buffer, state_normalizer, goal_normalizer, self.batch_size)
+            if self.num_prefetch > 0:
+                # sample (and copy to device) the next batches on a worker thread while this step computes
+                if self._prefetcher is None:
+                    self._prefetcher = helper.ReplayPrefetcher(sample_batch, self.actor_model.device, self.num_prefetch)
+                batch = self._prefetcher.next()
+            else:
+                batch = sample_batch()
+        if self._use_her:
+            states, actions, rewards, next_states, dones, achieved_goals, next_achieved_goals, desired_goals = batch
         else:
-            states, actions, rewards, next_states, dones = self.replay_buffer.sample(self.batch_size)
+            states, actions, rewards, next_states, dones = batch
+            desired_goals = None
         # print(f'Time to sample batch: {time.time() - sample_start_time} seconds')
-        
-        # Normalize states if self.normalize_inputs
-        normalize_start_time = time.time()
-        if self.normalize_inputs==True:
-            states = self.state_normalizer.normalize(states)
-            next_states = self.state_normalizer.normalize(next_states)
-        if self._use_her==True:
-            states = state_normalizer.normalize(states)
-            next_states = state_normalizer.normalize(next_states)
-            desired_goals = goal_normalizer.normalize(desired_goals)
+
+        # Queue host to device copies (async from pinned memory), starting with the
+        # inputs the target networks need first so transfers overlap their forward pass
+        device = self.actor_model.device
+        if self._copy_stream is not None and states.device.type == 'cpu':
+            # issue the copies on a side stream so they can run alongside kernels
+            # still queued from the previous learn step
+            with T.cuda.stream(self._copy_stream):
+                batch = [t.to(device, non_blocking=True) if t is not None else None
+                         for t in (next_states, desired_goals, states, actions, rewards, dones)]
+            current_stream = T.cuda.current_stream()
+            current_stream.wait_stream(self._copy_stream)
+            for t in batch:
+                if t is not None:
+                    t.record_stream(current_stream)
+            next_states, desired_goals, states, actions, rewards, dones = batch
         else:
-            desired_goals = None
-        # print(f'Time to normalize inputs: {time.time() - normalize_start_time} seconds')
+            next_states = next_states.to(device, non_blocking=True)
+            if desired_goals is not None:
+                desired_goals = desired_goals.to(device, non_blocking=True)
+            states = states.to(device, non_blocking=True)
+            actions = actions.to(device, non_blocking=True)
+            rewards = rewards.to(device, non_blocking=True)
+            dones = dones.to(device, non_blocking=True)
 
         # Permute states and next states if using CNN
         permute_start_time = time.time()
+        # (NHWC -> NCHW view whose strides are already channels_last)
         if self.actor_model.cnn_model:
-            states = states.permute(0, 3, 1, 2)
-            next_states = next_states.permute(0, 3, 1, 2)
+            states = states.permute(0, 3, 1, 2).contiguous(memory_format=T.channels_last)
+            next_states = next_states.permute(0, 3, 1, 2).contiguous(memory_format=T.channels_last)
         # print(f'Time to permute states: {time.time() - permute_start_time} seconds')
 
         # Convert rewards and dones to 2D tensors
         conversion_start_time = time.time()
-        rewards = rewards.unsqueeze(1)
-        dones = dones.unsqueeze(1)
+        rewards = rewards.view(-1, 1)
+        dones = dones.view(-1, 1)
         # print(f'Time to convert rewards and dones: {time.time() - conversion_start_time} seconds')
 
         # Get target values
         target_start_time = time.time()
-        with T.no_grad():
-            _, target_actions = self.target_actor_model(next_states, desired_goals)
-            noise = (T.randn_like(target_actions) * self.target_noise_stddev).clamp(-self.target_noise_clip, self.target_noise_clip)
-            target_actions = (target_actions + noise).clamp(self.env.action_space.low[0], self.env.action_space.high[0])
-            # target_actions = T.clamp(target_actions, min=T.tensor(self.env.action_space.low[0], dtype=T.float, device=self.device), max=T.tensor(self.env.action_space.high[0], dtype=T.float, device=self.device))
-            target_critic_values_a = self.target_critic_model_a(next_states, target_actions, desired_goals)
-            target_critic_values_b = self.target_critic_model_b(next_states, target_actions, desired_goals)
-            target_critic_values = T.min(target_critic_values_a, target_critic_values_b)
-            #DEBUG
-            # print(f'rewards device:{rewards.device}')
-            # print(f'target critic values device:{target_critic_values.device}')
-            targets = rewards + (1 - dones) * self.discount * target_critic_values
-            if self._use_her:
-                targets = T.clamp(targets, min=-1/(1-self.discount), max=0)
+        targets, target_actions, target_critic_values_a = self._target_step(next_states, rewards, dones, desired_goals)
         # print(f'Time to get target values: {time.time() - target_start_time} seconds')
 
+        # Gradient accumulation: grads are summed over accumulation_steps learn calls
+        # and the optimizers (and MPI sync) only run on the last call of each window
+        self._accum_step += 1
+        window_start = (self._accum_step - 1) % self.accumulation_steps == 0
+        window_end = self._accum_step % self.accumulation_steps == 0
+
         # Zero gradients for the optimizers
         zero_grad_start_time = time.time()
-        self.critic_model_a.optimizer.zero_grad()
-        self.critic_model_b.optimizer.zero_grad()
+        if window_start:
+            self.critic_model_a.optimizer.zero_grad(set_to_none=True)
+            self.critic_model_b.optimizer.zero_grad(set_to_none=True)
         # print(f'Time to zero gradients: {time.time() - zero_grad_start_time} seconds')
 
         # Get current critic values and calculate critic losses
         critic_loss_start_time = time.time()
-        predictions_a = self.critic_model_a(states, actions, desired_goals)
-        predictions_b = self.critic_model_b(states, actions, desired_goals)
+        # encode states and goals once; critic_b shares the CNN so it can reuse the encoding
+        state_encoding = self.critic_model_a.encode_state(states, desired_goals)
+        if self._critic_heads is not None:
+            predictions_a, predictions_b = self._critic_heads(state_encoding, actions).unbind(0)
+        else:
+            predictions_a = self._critic_head_a(state_encoding, actions)
+            predictions_b = self.critic_model_b(states, actions, desired_goals)
         # critic_loss_a = F.mse_loss(predictions_a, targets)
         # critic_loss_b = F.mse_loss(predictions_b, targets)
         critic_loss = F.mse_loss(predictions_a, targets) + F.mse_loss(predictions_b, targets)
@@ -2900,56 +3161,237 @@ class TD3(Agent):
 
         # Backward pass and optimization for critics
         critic_backward_start_time = time.time()
-        critic_loss.backward()
-        if self.use_mpi==True:
-            helper.sync_grads_sum(self.critic_model_a, self.comm)
-            helper.sync_grads_sum(self.critic_model_b, self.comm)
-        self.critic_model_a.optimizer.step()
-        self.critic_model_b.optimizer.step()
+        if window_end and self.use_mpi==True:
+            # reduce critic grads bucket by bucket while backward runs
+            self._critic_grad_reducer.arm()
+        (critic_loss / self.accumulation_steps).backward()
+        if window_end:
+            if self.use_mpi==True:
+                self._critic_grad_reducer.wait()
+            self.critic_model_a.optimizer.step()
+            self.critic_model_b.optimizer.step()
         # print(f'Time for critic backward pass and optimization: {time.time() - critic_backward_start_time} seconds')
 
         # Zero gradients for the actor optimizer
         actor_zero_grad_start_time = time.time()
-        self.actor_model.optimizer.zero_grad()
+        if window_start:
+            self.actor_model.optimizer.zero_grad(set_to_none=True)
+            self._actor_accumulated = False
         # print(f'Time to zero actor gradients: {time.time() - actor_zero_grad_start_time} seconds')
 
-        # Get current actor values and calculate actor loss
-        actor_loss_start_time = time.time()
-        pre_act_values, action_values = self.actor_model(states, desired_goals)
-        critic_values = self.critic_model_a(states, action_values, desired_goals)
-        actor_loss = -T.mean(critic_values)
-        if self._use_her==True:
-            actor_loss += pre_act_values.pow(2).mean()
-        # print(f'Time to calculate actor loss: {time.time() - actor_loss_start_time} seconds')
+        # Critic-only steps stop here; the actor forward, loss and backward only run on
+        # actor update steps (every actor_update_delay critic updates), picked once in Python
+        self._learn_step += 1
+        actor_loss = None
+        if self._learn_step % self.actor_update_delay == 0:
+            actor_loss = self._critic_and_actor_step(states, desired_goals, state_encoding, window_end)
 
         # Backward pass and optimization for the actor
         actor_backward_start_time = time.time()
-        if self._step % self.actor_update_delay == 0:
-            actor_loss.backward()
+        if window_end and self._actor_accumulated:
+            # actor grad buckets are still reducing while the critic targets are updated
+            self.soft_update((self.critic_model_a, self.critic_model_b),
+                             (self.target_critic_model_a, self.target_critic_model_b))
             if self.use_mpi==True:
-                helper.sync_grads_sum(self.actor_model, self.comm)
+                self._actor_grad_reducer.wait()
             self.actor_model.optimizer.step()
+            if self._rollout_actor is not None:
+                self._sync_rollout_actor()
             self.soft_update(self.actor_model, self.target_actor_model)
-            self.soft_update(self.critic_model_a, self.target_critic_model_a)
-            self.soft_update(self.critic_model_b, self.target_critic_model_b)
         # print(f'Time for actor backward pass and optimization: {time.time() - actor_backward_start_time} seconds')
 
         # Total time for the learn function
         # print(f'Total time for learn function: {time.time() - total_start_time} seconds')
 
-        # Add metrics to step_logs
-        self._train_step_config['actor_predictions'] = action_values.mean()
-        self._train_step_config['critic_predictions'] = critic_values.mean()
-        self._train_step_config['target_actor_predictions'] = target_actions.mean()
-        self._train_step_config['target_critic_predictions'] = target_critic_values_a.mean()
+        # Add metrics to step_logs (kept as detached tensors; converted when logged)
+        if self._needs_step_logs:
+            self._train_step_config['target_actor_predictions'] = target_actions.mean()
+            self._train_step_config['target_critic_predictions'] = target_critic_values_a.mean()
+
+        # return detached losses instead of .item() to avoid a device sync every step;
+        # the actor loss is None on critic-only steps
+        return actor_loss, critic_loss.detach()
+
+    def learn_batch(self, replay_buffer: Buffer = None,
+          state_normalizer: Union[Normalizer, SharedNormalizer] = None,
+          goal_normalizer: Union[Normalizer, SharedNormalizer] = None,
+          n_updates: int = 1):
+        """Runs n_updates learn steps on slices of one n_updates * batch_size sample.
+
+        The sample is normalized by the sampler. Returns the mean actor loss (None
+        if no actor update ran) and mean critic loss as detached tensors.
+        """
+        batch = self._sample(replay_buffer, state_normalizer, goal_normalizer, self.batch_size * n_updates)
+        actor_losses, critic_losses = [], []
+        for i in range(n_updates):
+            rows = slice(i * self.batch_size, (i + 1) * self.batch_size)
+            actor_loss, critic_loss = self.learn(batch=tuple(t[rows] for t in batch))
+            if actor_loss is not None:
+                actor_losses.append(actor_loss)
+            critic_losses.append(critic_loss)
+        actor_loss = T.stack(actor_losses).mean() if actor_losses else None
+        return actor_loss, T.stack(critic_losses).mean()
+
+    def _critic_and_actor_step(self, states, desired_goals, state_encoding, window_end):
+        """Computes the actor loss, accumulates its gradients and returns the detached loss (actor update steps only)."""
+        # Get current actor values and calculate actor loss
+        pre_act_values, action_values = self._actor_forward(states, desired_goals)
+        # reuse the critic state encoding; it is detached because the actor loss only
+        # backprops into the actor and the critic has already stepped
+        critic_values = self._critic_head_a(state_encoding.detach(), action_values)
+        actor_loss = -T.mean(critic_values)
+        if self._use_her==True:
+            actor_loss += pre_act_values.pow(2).mean()
 
-        return actor_loss.item(), critic_loss.item()
+        if window_end and self.use_mpi==True:
+            self._actor_grad_reducer.arm()
+        # only backprop into the actor so accumulated critic grads are left untouched
+        (actor_loss / self.accumulation_steps).backward(inputs=list(self.actor_model.parameters()))
+        self._actor_accumulated = True
+
+        if self._needs_step_logs:
+            self._train_step_config['actor_predictions'] = action_values.detach().mean()
+            self._train_step_config['critic_predictions'] = critic_values.detach().mean()
+        # kept for train step logging, which reports the latest actor loss every step
+        self._last_actor_loss = actor_loss.detach()
+        return self._last_actor_loss
         
     
+    def _exchange_progress(self, done, ready):
+        """Posts this step's done/ready flags and returns the previous step's totals.
+
+        Every rank calls this once per step, whether stepping its env or waiting,
+        so the non-blocking allreduces line up across ranks.
+        """
+        totals = None
+        if self._progress_request is not None:
+            self._progress_request.Wait()
+            totals = self._progress_recv.copy()
+        self._progress_send[0] = int(done)
+        self._progress_send[1] = int(not ready)
+        self._progress_request = self.comm.Iallreduce(self._progress_send, self._progress_recv, op=MPI.SUM)
+        return totals
+
+    def _learn_n(self):
+        """Runs n_train_steps updates for the current env step, returning the last losses."""
+        for _ in range(self.n_train_steps - 1):
+            self.learn()
+        return self.learn()
+
+    def _ready_to_learn(self):
+        """True once this rank has stored more than batch_size and warmup transitions."""
+        return self._transitions > self.batch_size and self._transitions > self.warmup
+
+    def _wait_for_stragglers(self, world_size):
+        """Keeps learning in step with the other ranks until every rank has ended its episode."""
+        # no transitions are stored while waiting, so readiness is fixed
+        ready = self._ready_to_learn()
+        while True:
+            totals = self._exchange_progress(True, ready)
+            if totals is not None and totals[0] == world_size:
+                break
+            self._step += 1
+            if totals is not None and totals[1] == 0:
+                self._learn_n()
+        # discard the flags posted by the last exchange so the next episode starts clean
+        self._progress_request.Wait()
+        self._progress_request = None
+
+    def _build_online_critic_heads(self):
+        """Returns a function running both online critic heads in one vmapped call.
+
+        Unlike the target heads, the online parameters are stacked on each call
+        (a small copy of the head layers), so gradients still accumulate into each
+        critic's own parameters for its optimizer and grad reducer hooks.
+        """
+        params_a = dict(self.critic_model_a.named_parameters())
+        params_b = dict(self.critic_model_b.named_parameters())
+        # the CNN is shared by both critics and encoded once
+        head_params = [(name, param_a, params_b[name]) for name, param_a in params_a.items()
+                       if not name.startswith('cnn_model.')]
+        critic = self.critic_model_a
+        heads = T.vmap(
+            lambda params, encoding, actions: T.func.functional_call(critic, params, (encoding, actions), {'encoded': True}),
+            in_dims=(0, None, None))
+
+        def critic_heads(encoding, actions):
+            params = {name: T.stack([param_a, param_b]) for name, param_a, param_b in head_params}
+            return heads(params, encoding, actions)
+
+        return critic_heads
+
+    def _stack_target_critic_heads(self):
+        """Stores both target critics' head parameters in stacked [2, ...] tensors.
+
+        Each target head parameter becomes a view into its stack, so soft updates
+        and weight loads keep the stack current, and _compute_targets can run both
+        heads with one vmapped functional call.
+        """
+        params_a = dict(self.target_critic_model_a.named_parameters())
+        params_b = dict(self.target_critic_model_b.named_parameters())
+        self._target_head_params = {}
+        for name, param_a in params_a.items():
+            # the CNN is shared by both critics and encoded once
+            if name.startswith('cnn_model.'):
+                continue
+            stacked = T.stack([param_a.detach(), params_b[name].detach()])
+            param_a.data = stacked[0]
+            params_b[name].data = stacked[1]
+            self._target_head_params[name] = stacked
+        critic = self.target_critic_model_a
+        self._target_heads = T.vmap(
+            lambda params, encoding, actions: T.func.functional_call(critic, params, (encoding, actions), {'encoded': True}),
+            in_dims=(0, None, None))
+
+    def _rollout_pi(self, state, goal, forward):
+        """Actor output for env rollouts, from the bf16 actor copy when rollout_bf16 is set."""
+        if self._rollout_actor is None:
+            return forward(state, goal)[1]
+        if goal is not None:
+            goal = goal.to(T.bfloat16)
+        return self._rollout_forward(state.to(T.bfloat16), goal)[1].float()
+
+    def _sync_rollout_actor(self):
+        """Copies the actor's weights into the bf16 rollout actor."""
+        with T.no_grad():
+            for rollout_param, param in zip(self._rollout_params, self._actor_params):
+                rollout_param.copy_(param)
+
+    def _compute_targets(self, next_states, rewards, dones, desired_goals):
+        """Computes smoothed target actions and clipped double-Q targets."""
+        with T.no_grad():
+            _, target_actions = self.target_actor_model(next_states, desired_goals)
+            # target policy smoothing, done in place on the fresh target actions
+            noise = T.empty_like(target_actions).normal_(0, self.target_noise_stddev).clamp_(-self.target_noise_clip, self.target_noise_clip)
+            target_actions.add_(noise).clamp_(min=self._act_low, max=self._act_high)
+            # target_actions = T.clamp(target_actions, min=T.tensor(self.env.action_space.low[0], dtype=T.float, device=self.device), max=T.tensor(self.env.action_space.high[0], dtype=T.float, device=self.device))
+            # both target critics share the CNN module (get_clone reuses it), so
+            # encode next states and goals once and run the two heads on it
+            target_encoding = self.target_critic_model_a.encode_state(next_states, desired_goals)
+            if self._target_head_params is not None:
+                target_critic_values_a, target_critic_values_b = \
+                    self._target_heads(self._target_head_params, target_encoding, target_actions).unbind(0)
+            elif self.target_critic_model_b.cnn_model is self.target_critic_model_a.cnn_model:
+                target_critic_values_a = self.target_critic_model_a.head(target_encoding, target_actions)
+                target_critic_values_b = self.target_critic_model_b.head(target_encoding, target_actions)
+            else:
+                target_critic_values_a = self.target_critic_model_a.head(target_encoding, target_actions)
+                target_critic_values_b = self.target_critic_model_b(next_states, target_actions, desired_goals)
+            targets = self._targets_fn(rewards, dones, target_critic_values_a, target_critic_values_b,
+                                       self.discount, self._use_her, self._her_clamp_min)
+
+        return targets, target_actions, target_critic_values_a
+
     def soft_update(self, current, target):
+        # fused multi-tensor polyak update: target = tau * current + (1 - tau) * target
+        # current/target may be a model or a tuple of models updated together
+        params = self._polyak_params.get((current, target))
+        if params is None:
+            params = self._polyak_params[(current, target)] = _polyak_param_lists(current, target)
+        current_params, target_params = params
         with T.no_grad():
-            for current_params, target_params in zip(current.parameters(), target.parameters()):
-                target_params.data.copy_(self.tau * current_params.data + (1 - self.tau) * target_params.data)
+            T._foreach_mul_(target_params, 1 - self.tau)
+            T._foreach_add_(target_params, current_params, alpha=self.tau)
 
     @classmethod
     def sweep_train(
@@ -2965,12 +3407,12 @@ class TD3(Agent):
         rank = MPI.COMM_WORLD.rank
 
         if comm is not None:
-            logger.debug(f"Rank {rank} comm detected")
+            logger.debug("Rank %s comm detected", rank)
             rank = comm.Get_rank()
-            logger.debug(f"Global rank {MPI.COMM_WORLD.Get_rank()} in {comm.Get_name()} set to comm rank {rank}")
-            logger.debug(f"init_sweep fired: global rank {MPI.COMM_WORLD.rank}, group rank {rank}, {comm.Get_name()}")
+            logger.debug("Global rank %s in %s set to comm rank %s", MPI.COMM_WORLD.Get_rank(), comm.Get_name(), rank)
+            logger.debug("init_sweep fired: global rank %s, group rank %s, %s", MPI.COMM_WORLD.rank, rank, comm.Get_name())
         else:
-            logger.debug(f"init_sweep fired: global rank")
+            logger.debug("init_sweep fired: global rank")
         try:
             # rank = MPI.COMM_WORLD.rank
             # Instantiate env from env_spec
@@ -2978,127 +3420,97 @@ class TD3(Agent):
             # agent_config_path = f'sweep/agent_config_{run_number}.json'
             # logger.debug(f"rank {rank} agent config path: {agent_config_path}")
             if comm is not None:
-                logger.debug(f"{comm.Get_name()}; Rank {rank} train config: {train_config}")
-                logger.debug(f"{comm.Get_name()}; Rank {rank} env spec id: {env.spec.id}")
-                logger.debug(f"{comm.Get_name()}; Rank {rank} callbacks: {callbacks}")
-                logger.debug(f"{comm.Get_name()}; Rank {rank} run number: {run_number}")
-                logger.debug(f"{comm.Get_name()}; Rank {rank} config set: {config}")
+                logger.debug("%s; Rank %s train config: %s", comm.Get_name(), rank, train_config)
+                logger.debug("%s; Rank %s env spec id: %s", comm.Get_name(), rank, env.spec.id)
+                logger.debug("%s; Rank %s callbacks: %s", comm.Get_name(), rank, callbacks)
+                logger.debug("%s; Rank %s run number: %s", comm.Get_name(), rank, run_number)
+                logger.debug("%s; Rank %s config set: %s", comm.Get_name(), rank, config)
             else:
-                logger.debug(f"train config: {train_config}")
-                logger.debug(f"env spec id: {env.spec.id}")
-                logger.debug(f"callbacks: {callbacks}")
-                logger.debug(f"run number: {run_number}")
-                logger.debug(f"config set: {config}")
+                logger.debug("train config: %s", train_config)
+                logger.debug("env spec id: %s", env.spec.id)
+                logger.debug("callbacks: %s", callbacks)
+                logger.debug("run number: %s", run_number)
+                logger.debug("config set: %s", config)
             model_type = list(config.keys())[0]
             if comm is not None:
-                logger.debug(f"{comm.Get_name()}; Rank {rank} model type: {model_type}")
+                logger.debug("%s; Rank %s model type: %s", comm.Get_name(), rank, model_type)
             else:
-                logger.debug(f"model type: {model_type}")
+                logger.debug("model type: %s", model_type)
             # Only primary process (rank 0) calls wandb.init() to build agent and log data
 
             actor_cnn_layers, critic_cnn_layers, actor_layers, critic_state_layers, critic_merged_layers, kernels = wandb_support.build_layers(config)
             if comm is not None:
-                logger.debug(f"{comm.Get_name()}; Rank {rank} layers built")
+                logger.debug("%s; Rank %s layers built", comm.Get_name(), rank)
             else:
-                logger.debug(f"layers built")
+                logger.debug("layers built")
             # Actor
             actor_learning_rate=config[model_type][f"{model_type}_actor_learning_rate"]
             if comm is not None:
-                logger.debug(f"{comm.Get_name()}; Rank {rank} actor learning rate set")
+                logger.debug("%s; Rank %s actor learning rate set", comm.Get_name(), rank)
             else:
-                logger.debug(f"actor learning rate set")
+                logger.debug("actor learning rate set")
             actor_optimizer = config[model_type][f"{model_type}_actor_optimizer"]
             if comm is not None:
-                logger.debug(f"{comm.Get_name()}; Rank {rank} actor optimizer set")
+                logger.debug("%s; Rank %s actor optimizer set", comm.Get_name(), rank)
             else:
-                logger.debug(f"actor optimizer set")
+                logger.debug("actor optimizer set")
             # get optimizer params
-            actor_optimizer_params = {}
-            if actor_optimizer == "Adam":
-                actor_optimizer_params['weight_decay'] = \
-                    config[model_type][f"{model_type}_actor_optimizer_{actor_optimizer}_options"][f'{actor_optimizer}_weight_decay']
-            
-            elif actor_optimizer == "Adagrad":
-                actor_optimizer_params['weight_decay'] = \
-                    config[model_type][f"{model_type}_actor_optimizer_{actor_optimizer}_options"][f'{actor_optimizer}_weight_decay']
-                actor_optimizer_params['lr_decay'] = \
-                    config[model_type][f"{model_type}_actor_optimizer_{actor_optimizer}_options"][f'{actor_optimizer}_lr_decay']
-            
-            elif actor_optimizer == "RMSprop" or actor_optimizer == "SGD":
-                actor_optimizer_params['weight_decay'] = \
-                    config[model_type][f"{model_type}_actor_optimizer_{actor_optimizer}_options"][f'{actor_optimizer}_weight_decay']
-                actor_optimizer_params['momentum'] = \
-                    config[model_type][f"{model_type}_actor_optimizer_{actor_optimizer}_options"][f'{actor_optimizer}_momentum']
+            actor_optimizer_params = build_opt_params(config, model_type, "actor", actor_optimizer)
             if comm is not None:
-                logger.debug(f"{comm.Get_name()}; Rank {rank} actor optimizer params set")
+                logger.debug("%s; Rank %s actor optimizer params set", comm.Get_name(), rank)
             else:
-                logger.debug(f"actor optimizer params set")
+                logger.debug("actor optimizer params set")
             actor_normalize_layers = config[model_type][f"{model_type}_actor_normalize_layers"]
             if comm is not None:
-                logger.debug(f"{comm.Get_name()}; Rank {rank} actor normalize layers set")
+                logger.debug("%s; Rank %s actor normalize layers set", comm.Get_name(), rank)
             else:
-                logger.debug(f"actor normalize layers set")
+                logger.debug("actor normalize layers set")
             # Critic
             critic_learning_rate=config[model_type][f"{model_type}_critic_learning_rate"]
             if comm is not None:
-                logger.debug(f"{comm.Get_name()}; Rank {rank} critic learning rate set")
+                logger.debug("%s; Rank %s critic learning rate set", comm.Get_name(), rank)
             else:
-                logger.debug(f"critic learning rate set")
+                logger.debug("critic learning rate set")
             critic_optimizer = config[model_type][f"{model_type}_critic_optimizer"]
             if comm is not None:
-                logger.debug(f"{comm.Get_name()}; Rank {rank} critic optimizer set")
+                logger.debug("%s; Rank %s critic optimizer set", comm.Get_name(), rank)
             else:
-                logger.debug(f"critic optimizer set")
-            critic_optimizer_params = {}
-            if critic_optimizer == "Adam":
-                critic_optimizer_params['weight_decay'] = \
-                    config[model_type][f"{model_type}_critic_optimizer_{critic_optimizer}_options"][f'{critic_optimizer}_weight_decay']
-            
-            elif critic_optimizer == "Adagrad":
-                critic_optimizer_params['weight_decay'] = \
-                    config[model_type][f"{model_type}_critic_optimizer_{critic_optimizer}_options"][f'{critic_optimizer}_weight_decay']
-                critic_optimizer_params['lr_decay'] = \
-                    config[model_type][f"{model_type}_critic_optimizer_{critic_optimizer}_options"][f'{critic_optimizer}_lr_decay']
-            
-            elif critic_optimizer == "RMSprop" or critic_optimizer == "SGD":
-                critic_optimizer_params['weight_decay'] = \
-                    config[model_type][f"{model_type}_critic_optimizer_{critic_optimizer}_options"][f'{critic_optimizer}_weight_decay']
-                critic_optimizer_params['momentum'] = \
-                    config[model_type][f"{model_type}_critic_optimizer_{critic_optimizer}_options"][f'{critic_optimizer}_momentum']
+                logger.debug("critic optimizer set")
+            critic_optimizer_params = build_opt_params(config, model_type, "critic", critic_optimizer)
             if comm is not None:
-                logger.debug(f"{comm.Get_name()}; Rank {rank} critic optimizer params set")
+                logger.debug("%s; Rank %s critic optimizer params set", comm.Get_name(), rank)
             else:
-                logger.debug(f"critic optimizer params set")
+                logger.debug("critic optimizer params set")
 
             critic_normalize_layers = config[model_type][f"{model_type}_critic_normalize_layers"]
             if comm is not None:
-                logger.debug(f"{comm.Get_name()}; Rank {rank} critic normalize layers set")
+                logger.debug("%s; Rank %s critic normalize layers set", comm.Get_name(), rank)
             else:
-                logger.debug(f"critic normalize layers set")
+                logger.debug("critic normalize layers set")
             # Set device
             device = config[model_type][f"{model_type}_device"]
             if comm is not None:
-                logger.debug(f"{comm.Get_name()}; Rank {rank} device set")
+                logger.debug("%s; Rank %s device set", comm.Get_name(), rank)
             else:
-                logger.debug(f"device set")
+                logger.debug("device set")
             # Check if CNN layers and if so, build CNN model
             if actor_cnn_layers:
                 actor_cnn_model = cnn_models.CNN(actor_cnn_layers, env)
             else:
                 actor_cnn_model = None
             if comm is not None:
-                logger.debug(f"{comm.Get_name()}; Rank {rank} actor cnn layers set: {actor_cnn_layers}")
+                logger.debug("%s; Rank %s actor cnn layers set: %s", comm.Get_name(), rank, actor_cnn_layers)
             else:
-                logger.debug(f"actor cnn layers set: {actor_cnn_layers}")
+                logger.debug("actor cnn layers set: %s", actor_cnn_layers)
 
             if critic_cnn_layers:
                 critic_cnn_model = cnn_models.CNN(critic_cnn_layers, env)
             else:
                 critic_cnn_model = None
             if comm is not None:
-                logger.debug(f"{comm.Get_name()}; Rank {rank} critic cnn layers set: {critic_cnn_layers}")
+                logger.debug("%s; Rank %s critic cnn layers set: %s", comm.Get_name(), rank, critic_cnn_layers)
             else:
-                logger.debug(f"critic cnn layers set: {critic_cnn_layers}")
+                logger.debug("critic cnn layers set: %s", critic_cnn_layers)
             # # Get actor clamp value
             # clamp_output = config[model_type][f"{model_type}_actor_clamp_output"]
             # if comm is not None:
@@ -3116,10 +3528,11 @@ class TD3(Agent):
                                             # clamp_output=clamp_output,
                                             device=device,
             )
-            if comm is not None:
-                logger.debug(f"{comm.Get_name()}; Rank {rank} actor model built: {actor_model.get_config()}")
-            else:
-                logger.debug(f"actor model built: {actor_model.get_config()}")
+            if logger.isEnabledFor(logging.DEBUG):
+                if comm is not None:
+                    logger.debug("%s; Rank %s actor model built: %s", comm.Get_name(), rank, actor_model.get_config())
+                else:
+                    logger.debug("actor model built: %s", actor_model.get_config())
             critic_model = models.CriticModel(env = env,
                                             cnn_model = critic_cnn_model,
                                             state_layers = critic_state_layers,
@@ -3131,34 +3544,35 @@ class TD3(Agent):
                                             normalize_layers = critic_normalize_layers,
                                             device=device,
             )
-            if comm is not None:
-                logger.debug(f"{comm.Get_name()}; Rank {rank} critic model built: {critic_model.get_config()}")
-            else:
-                logger.debug(f"critic model built: {critic_model.get_config()}")
+            if logger.isEnabledFor(logging.DEBUG):
+                if comm is not None:
+                    logger.debug("%s; Rank %s critic model built: %s", comm.Get_name(), rank, critic_model.get_config())
+                else:
+                    logger.debug("critic model built: %s", critic_model.get_config())
             # get normalizer clip value
             normalizer_clip = config[model_type][f"{model_type}_normalizer_clip"]
             if comm is not None:
-                logger.debug(f"{comm.Get_name()}; Rank {rank} normalizer clip set: {normalizer_clip}")
+                logger.debug("%s; Rank %s normalizer clip set: %s", comm.Get_name(), rank, normalizer_clip)
             else:
-                logger.debug(f"normalizer clip set: {normalizer_clip}")
+                logger.debug("normalizer clip set: %s", normalizer_clip)
             # get action epsilon
             action_epsilon = config[model_type][f"{model_type}_epsilon_greedy"]
             if comm is not None:
-                logger.debug(f"{comm.Get_name()}; Rank {rank} action epsilon set: {action_epsilon}")
+                logger.debug("%s; Rank %s action epsilon set: %s", comm.Get_name(), rank, action_epsilon)
             else:
-                logger.debug(f"action epsilon set: {action_epsilon}")
+                logger.debug("action epsilon set: %s", action_epsilon)
             # Replay buffer size
             replay_buffer_size = config[model_type][f"{model_type}_replay_buffer_size"]
             if comm is not None:
-                logger.debug(f"{comm.Get_name()}; Rank {rank} replay buffer size set: {replay_buffer_size}")
+                logger.debug("%s; Rank %s replay buffer size set: %s", comm.Get_name(), rank, replay_buffer_size)
             else:
-                logger.debug(f"replay buffer size set: {replay_buffer_size}")
+                logger.debug("replay buffer size set: %s", replay_buffer_size)
             # Save dir
             save_dir = config[model_type][f"{model_type}_save_dir"]
             if comm is not None:
-                logger.debug(f"{comm.Get_name()}; Rank {rank} save dir set: {save_dir}")
+                logger.debug("%s; Rank %s save dir set: %s", comm.Get_name(), rank, save_dir)
             else:
-                logger.debug(f"save dir set: {save_dir}")
+                logger.debug("save dir set: %s", save_dir)
 
             # create replay buffer
             replay_buffer = ReplayBuffer(env, replay_buffer_size, device=device)
@@ -3173,7 +3587,7 @@ class TD3(Agent):
                 action_epsilon = action_epsilon,
                 replay_buffer = replay_buffer,
                 batch_size = config[model_type][f"{model_type}_batch_size"],
-                noise = helper.Noise.create_instance(config[model_type][f"{model_type}_noise"], shape=env.action_space.shape, **config[model_type][f"{model_type}_noise_{config[model_type][f'{model_type}_noise']}"], device=device),
+                noise = build_noise(config, model_type, env.action_space.shape, device),
                 target_noise_stddev = config[model_type][f"{model_type}_target_action_stddev"],
                 target_noise_clip = config[model_type][f"{model_type}_target_action_clip"],
                 actor_update_delay = config[model_type][f"{model_type}_actor_update_delay"],
@@ -3182,19 +3596,21 @@ class TD3(Agent):
                 comm = comm,
                 device = device,
             )
-            if comm is not None:
-                logger.debug(f"{comm.Get_name()}; Rank {rank} TD3 agent built: {td3_agent.get_config()}")
-            else:
-                logger.debug(f"TD3 agent built: {td3_agent.get_config()}")
+            # get_config serializes the whole agent, so only build it when debug logging is on
+            if logger.isEnabledFor(logging.DEBUG):
+                if comm is not None:
+                    logger.debug("%s; Rank %s TD3 agent built: %s", comm.Get_name(), rank, td3_agent.get_config())
+                else:
+                    logger.debug("TD3 agent built: %s", td3_agent.get_config())
             
             if comm is not None:
-                logger.debug(f"{comm.Get_name()}; Rank {rank} train barrier called")
+                logger.debug("%s; Rank %s train barrier called", comm.Get_name(), rank)
             else:
-                logger.debug(f"train barrier called")
+                logger.debug("train barrier called")
 
             if comm is not None:
                 comm.Barrier()
-                logger.debug(f"{comm.Get_name()}; Rank {rank} train barrier passed")
+                logger.debug("%s; Rank %s train barrier passed", comm.Get_name(), rank)
 
             td3_agent.train(
                     num_episodes=train_config['num_episodes'],
@@ -3215,11 +3631,10 @@ class TD3(Agent):
         self.critic_model_b.train()
 
         # Update save_dir if passed
-        if save_dir is not None and save_dir.split("/")[-2] != "td3":
-            self.save_dir = save_dir + "/td3/"
-            print(f'new save dir: {self.save_dir}')
-        elif save_dir is not None and save_dir.split("/")[-2] == "td3":
-            self.save_dir = save_dir
+        if save_dir is not None:
+            parts = save_dir.split("/")
+            tag = parts[-2] if len(parts) >= 2 else ''
+            self.save_dir = save_dir if tag == "td3" else save_dir + "/td3/"
             print(f'new save dir: {self.save_dir}')
         
         if self.callbacks:
@@ -3241,6 +3656,19 @@ class TD3(Agent):
                     else:
                         callback.on_train_begin(logs=self._config)
 
+        # resolve per-phase callback dispatchers once; under MPI only rank 0 runs
+        # callbacks, so the other ranks (and runs without callbacks) get _noop
+        callbacks = self.callbacks if self.callbacks and (not self.use_mpi or self.rank == 0) else []
+        self._on_epoch_begin = _dispatcher([callback.on_train_epoch_begin for callback in callbacks])
+        # only callbacks overriding on_train_step_end read the per-step logs
+        step_callbacks = [callback for callback in callbacks
+                          if type(callback).on_train_step_end is not rl_callbacks.Callback.on_train_step_end]
+        self._on_step_end = _dispatcher([callback.on_train_step_end for callback in step_callbacks])
+        self._needs_step_logs = bool(step_callbacks)
+        self._on_epoch_end = _dispatcher([callback.on_train_epoch_end for callback in callbacks])
+        self._on_train_end = _dispatcher([callback.on_train_end for callback in callbacks])
+        # per-step timings are only consumed by the wandb step logs
+        time_steps = any(isinstance(callback, rl_callbacks.WandbCallback) for callback in callbacks)
         
         if self.use_mpi:
             try:
@@ -3262,20 +3690,57 @@ class TD3(Agent):
             except Exception as e:
                 logger.error(f"Error in TD3.train agent._initialize_env process: {e}", exc_info=True)
 
+        if self.use_mpi and self.share_replay_buffer and not isinstance(self.replay_buffer, helper.MPISharedReplayBuffer):
+            try:
+                # ranks on a node collect into, and sample from, one buffer;
+                # the rank-local buffer is restored by _end_train
+                self._rank_replay_buffer = self.replay_buffer
+                self.replay_buffer = helper.MPISharedReplayBuffer(
+                    self.replay_buffer.env,
+                    self.replay_buffer.buffer_size,
+                    self.replay_buffer.goal_shape,
+                    comm=self.comm,
+                )
+            except Exception as e:
+                logger.error(f"{self.group}; Rank {self.rank} Error in TD3.train creating shared replay buffer: {e}", exc_info=True)
+
+        # broadcast rank 0's weights and register the grad reducers before any forward
+        if self.use_mpi and self._critic_grad_reducer is None:
+            self._init_mpi_sync()
+
         # initialize step counter (for logging)
         self._step = 1
+        # transitions this rank has stored. Learning readiness is based on it rather
+        # than a shared buffer's node-wide cursor, which other ranks keep advancing
+        # (ranks could disagree on readiness and mismatch the learn collectives)
+        shared_buffer = isinstance(self.replay_buffer, helper.MPISharedReplayBuffer)
+        self._transitions = 0 if shared_buffer else self.replay_buffer.counter
         # set best reward
         try:
             best_reward = self.env.reward_range[0]
         except:
             best_reward = -np.inf
-        # instantiate list to store reward history
-        reward_history = []
-        # instantiate lists to store time history
-        episode_time_history = []
-        step_time_history = []
-        learning_time_history = []
-        steps_per_episode_history = []  # List to store steps per episode
+        # rolling means over the last 100 values
+        reward_history = helper.RollingMean(100)
+        episode_time_history = helper.RollingMean(100)
+        step_time_history = helper.RollingMean(100)
+        learning_time_history = helper.RollingMean(100)
+        steps_per_episode_history = helper.RollingMean(100)  # steps per episode
+
+        # with MPI, end slow ranks' episodes once preempt_threshold of the ranks are done
+        preempt = self.use_mpi and self.preempt_threshold is not None
+        if preempt:
+            world_size = self.comm.Get_size()
+            preempt_count = int(np.ceil(self.preempt_threshold * world_size))
+            # [ranks done with their episode, ranks not yet ready to learn]
+            self._progress_send = np.zeros(2, dtype=np.int64)
+            self._progress_recv = np.zeros(2, dtype=np.int64)
+
+        if self.num_envs > 1:
+            # step num_envs copies of the env as one batch
+            self._train_vector_envs(num_episodes, best_reward, time_steps)
+            self._end_train()
+            return
 
         # Calculate total_steps and wait_steps
         # max_episode_steps = self.env.spec.max_episode_steps
@@ -3301,17 +3766,9 @@ class TD3(Agent):
         #     with_stack=True
         # ) as prof:
         for i in range(num_episodes):
-            episode_start_time = time.time()
-            if self.callbacks:
-                if self.use_mpi:
-                    if self.rank == 0:
-                        for callback in self.callbacks:
-                            callback.on_train_epoch_begin(epoch=self._step, logs=None)
-                            # logger.debug(f'{self.group}; Rank {self.rank} TD3.train on train epoch begin callback completed')
-                else:
-                    for callback in self.callbacks:
-                        callback.on_train_epoch_begin(epoch=self._step, logs=None)
-                        # logger.debug(f'TD3.train on train epoch begin callback completed')
+            episode_start_time = _perf()
+            step_clock = episode_start_time
+            self._on_epoch_begin(epoch=self._step, logs=None)
             # reset noise
             if type(self.noise) == helper.OUNoise:
                 self.noise.reset()
@@ -3325,15 +3782,15 @@ class TD3(Agent):
                 # if self.callbacks:
                 #     for callback in self.callbacks:
                 #         callback.on_train_step_begin(step=self._step, logs=None)
-                step_start_time = time.time()
                 action = self.get_action(state)
                 next_state, reward, term, trunc, _ = self.env.step(action)
                 # extract observation from next state if next_state is dict (robotics)
-                if isinstance(next_state, dict):
-                    next_state = next_state['observation']
+                if self._obs_is_dict:
+                    next_state = next_state[self._goal_key]
 
                 # store trajectory in replay buffer
                 self.replay_buffer.add(state, action, reward, next_state, done)
+                self._transitions += 1
                 if term or trunc:
                     done = True
                 episode_reward += reward
@@ -3341,47 +3798,53 @@ class TD3(Agent):
                 episode_steps += 1
                 
                 # check if enough samples in replay buffer and if so, learn from experiences
-                if self.replay_buffer.counter > self.batch_size and self.replay_buffer.counter > self.warmup:
-                    learn_time = time.time()
-                    actor_loss, critic_loss = self.learn()
-                    self._train_step_config["actor_loss"] = actor_loss
-                    self._train_step_config["critic_loss"] = critic_loss
-
-                    learning_time_history.append(time.time() - learn_time)
+                ready = self._ready_to_learn()
+                if preempt:
+                    # decide from last step's group totals so every rank makes the same call
+                    totals = self._exchange_progress(done, ready)
+                    ready = totals is not None and totals[1] == 0
+                    if totals is not None and totals[0] >= preempt_count:
+                        done = True
+                if ready:
+                    if time_steps:
+                        learn_time = _perf()
+                    _, critic_loss = self._learn_n()
+                    if self._needs_step_logs:
+                        if self._last_actor_loss is not None:
+                            self._train_step_config["actor_loss"] = self._last_actor_loss
+                        self._train_step_config["critic_loss"] = critic_loss
+
+                    if time_steps:
+                        learning_time_history.add(_perf() - learn_time)
                 
-                step_time = time.time() - step_start_time
-                step_time_history.append(step_time)
-
-                self._train_step_config["step_reward"] = reward
-                self._train_step_config["step_time"] = step_time
-                
-                # log to wandb if using wandb callback
-                if self.callbacks:
-                    if self.use_mpi:
-                        # only have the main process log callback values to avoid multiple callback calls
-                        if self.rank == 0:
-                            for callback in self.callbacks:
-                                callback.on_train_step_end(step=self._step, logs=self._train_step_config)
-                                # logger.debug(f'{self.group}; Rank {self.rank} TD3.train on train step end callback completed')
-                    else:
-                        for callback in self.callbacks:
-                            callback.on_train_step_end(step=self._step, logs=self._train_step_config)
-                            # logger.debug(f'TD3.train on train step end callback completed')
+                if time_steps:
+                    # one clock read per step: time since the previous step's read
+                    now = _perf()
+                    step_time = now - step_clock
+                    step_clock = now
+                    step_time_history.add(step_time)
+                    self._train_step_config["step_time"] = step_time
+
+                if self._needs_step_logs:
+                    self._train_step_config["step_reward"] = reward
+                    # log to wandb if using wandb callback
+                    self._on_step_end(step=self._step, logs=self._train_step_config)
                 
                 # prof.step()
 
                 if not done:
                     self._step += 1
+
+            if preempt:
+                self._wait_for_stragglers(world_size)
             
-            episode_time = time.time() - episode_start_time
-            episode_time_history.append(episode_time)
-            reward_history.append(episode_reward)
-            steps_per_episode_history.append(episode_steps) 
-            avg_reward = np.mean(reward_history[-100:])
-            avg_episode_time = np.mean(episode_time_history[-100:])
-            avg_step_time = np.mean(step_time_history[-100:])
-            avg_learn_time = np.mean(learning_time_history[-100:])
-            avg_steps_per_episode = np.mean(steps_per_episode_history[-100:])  # Calculate average steps per episode
+            episode_time = _perf() - episode_start_time
+            episode_time_history.add(episode_time)
+            reward_history.add(episode_reward)
+            steps_per_episode_history.add(episode_steps) 
+            avg_reward = reward_history.mean
+            avg_episode_time = episode_time_history.mean
+            avg_steps_per_episode = steps_per_episode_history.mean
 
             self._train_episode_config['episode'] = i
             self._train_episode_config["episode_reward"] = episode_reward
@@ -3397,32 +3860,167 @@ class TD3(Agent):
             else:
                 self._train_episode_config["best"] = False
 
-            if self.callbacks:
-                if self.use_mpi:
-                    if self.rank == 0:
-                        for callback in self.callbacks:
-                            callback.on_train_epoch_end(epoch=self._step, logs=self._train_episode_config)
-                            # logger.debug(f'{self.group}; Rank {self.rank} TD3.train on train epoch callback completed')
-                else:
-                    for callback in self.callbacks:
-                        callback.on_train_epoch_end(epoch=self._step, logs=self._train_episode_config)
-                        # logger.debug(f'TD3.train on train epoch callback completed')
+            self._on_epoch_end(epoch=self._step, logs=self._train_episode_config)
 
-            print(f"episode {i+1}, score {episode_reward}, avg_score {avg_reward}, episode_time {episode_time:.2f}s, avg_episode_time {avg_episode_time:.2f}s, avg_step_time {avg_step_time:.6f}s, avg_learn_time {avg_learn_time:.6f}s, avg_steps_per_episode {avg_steps_per_episode:.2f}")
+            step_stats = f", avg_step_time {step_time_history.mean:.6f}s, avg_learn_time {learning_time_history.mean:.6f}s" if time_steps else ""
+            print(f"episode {i+1}, score {episode_reward}, avg_score {avg_reward}, episode_time {episode_time:.2f}s, avg_episode_time {avg_episode_time:.2f}s{step_stats}, avg_steps_per_episode {avg_steps_per_episode:.2f}")
 
-        if self.callbacks:
-            if self.use_mpi:
-                if self.rank == 0:
-                    for callback in self.callbacks:
-                        callback.on_train_end(logs=self._train_episode_config)
-                        # logger.debug(f'{self.group}; Rank {self.rank} TD3.train on train end callback complete')
-            else:
-                for callback in self.callbacks:
-                    callback.on_train_end(logs=self._train_episode_config)
-                    # logger.debug(f'TD3.train on train end callback complete')
+        self._end_train()
+
+    def _end_train(self):
+        """Runs train end callbacks and releases the training env and sampler."""
+        self._on_train_end(logs=self._train_episode_config)
+        # stop the background sampler
+        if self._prefetcher is not None:
+            self._prefetcher.close()
+            self._prefetcher = None
+        # free the node-shared buffer windows (collective over the node's ranks)
+        if isinstance(self.replay_buffer, helper.MPISharedReplayBuffer):
+            self.replay_buffer.close()
+            self.replay_buffer = self._rank_replay_buffer
         # close the environment
         self.env.close()
 
+    def _train_vector_envs(self, num_episodes, best_reward, time_steps):
+        """Training loop over num_envs copies of the env, stepped together.
+
+        Each iteration runs one batched actor forward, adds num_envs transitions
+        to the replay buffer and makes one learn call. Envs reset themselves on
+        the step after they finish (gymnasium's next-step autoreset), and that
+        step's output is not a transition, so it is not stored.
+        """
+        spec = self.env.spec
+        envs = gym.vector.AsyncVectorEnv([lambda: gym.make(spec) for _ in range(self.num_envs)])
+        # each env gets its own noise process so OU noise stays per-trajectory
+        noises = [self.noise.clone() for _ in range(self.num_envs)]
+        action_low = T.as_tensor(self.env.action_space.low, dtype=T.float32, device=self.actor_model.device)
+        action_high = T.as_tensor(self.env.action_space.high, dtype=T.float32, device=self.actor_model.device)
+
+        reward_history = helper.RollingMean(100)
+        episode_time_history = helper.RollingMean(100)
+        step_time_history = helper.RollingMean(100)
+        learning_time_history = helper.RollingMean(100)
+        steps_per_episode_history = helper.RollingMean(100)
+
+        episode_rewards = np.zeros(self.num_envs)
+        episode_steps = np.zeros(self.num_envs, dtype=np.int64)
+        episode_start_times = np.full(self.num_envs, _perf())
+        step_clock = _perf()
+        autoreset = np.zeros(self.num_envs, dtype=bool)
+        episodes = 0
+
+        states, _ = envs.reset()
+        if self._obs_is_dict:
+            states = states[self._goal_key]
+        self._on_epoch_begin(epoch=self._step, logs=None)
+
+        while episodes < num_episodes:
+            actions, noise_np = self._get_vector_actions(states, noises, envs.action_space, action_low, action_high)
+            next_states, rewards, terms, truncs, _ = envs.step(actions)
+            if self._obs_is_dict:
+                next_states = next_states[self._goal_key]
+
+            # rows of envs that were just autoreset hold reset observations, not transitions
+            keep = ~autoreset
+            self.replay_buffer.add_batch(states[keep], actions[keep], rewards[keep], next_states[keep], terms[keep])
+            self._transitions += int(keep.sum())
+            episode_rewards[keep] += rewards[keep]
+            episode_steps[keep] += 1
+            dones = (terms | truncs) & keep
+
+            if self._ready_to_learn():
+                if time_steps:
+                    learn_time = _perf()
+                _, critic_loss = self._learn_n()
+                if self._needs_step_logs:
+                    if self._last_actor_loss is not None:
+                        self._train_step_config["actor_loss"] = self._last_actor_loss
+                    self._train_step_config["critic_loss"] = critic_loss
+                if time_steps:
+                    learning_time_history.add(_perf() - learn_time)
+
+            if time_steps:
+                now = _perf()
+                step_time = now - step_clock
+                step_clock = now
+                step_time_history.add(step_time)
+                self._train_step_config["step_time"] = step_time
+            if self._needs_step_logs:
+                self._train_step_config["step_reward"] = rewards.mean()
+                for i, (a, n) in enumerate(zip(actions[0], noise_np[0])):
+                    self._train_step_config[f'action_{i}'] = a
+                    self._train_step_config[f'noise_{i}'] = n
+                self._on_step_end(step=self._step, logs=self._train_step_config)
+
+            for env_idx in np.flatnonzero(dones):
+                if episodes >= num_episodes:
+                    break
+                episode_time = _perf() - episode_start_times[env_idx]
+                episode_time_history.add(episode_time)
+                reward_history.add(episode_rewards[env_idx])
+                steps_per_episode_history.add(episode_steps[env_idx])
+                avg_reward = reward_history.mean
+
+                self._train_episode_config['episode'] = episodes
+                self._train_episode_config["episode_reward"] = episode_rewards[env_idx]
+                self._train_episode_config["avg_reward"] = avg_reward
+                self._train_episode_config["episode_time"] = episode_time
+
+                # check if best reward
+                if avg_reward > best_reward:
+                    best_reward = avg_reward
+                    self._train_episode_config["best"] = True
+                    # save model
+                    self.save()
+                else:
+                    self._train_episode_config["best"] = False
+
+                self._on_epoch_end(epoch=self._step, logs=self._train_episode_config)
+
+                step_stats = f", avg_step_time {step_time_history.mean:.6f}s, avg_learn_time {learning_time_history.mean:.6f}s" if time_steps else ""
+                print(f"episode {episodes+1}, env {env_idx}, score {episode_rewards[env_idx]}, avg_score {avg_reward}, episode_time {episode_time:.2f}s, avg_episode_time {episode_time_history.mean:.2f}s{step_stats}, avg_steps_per_episode {steps_per_episode_history.mean:.2f}")
+
+                episodes += 1
+                episode_rewards[env_idx] = 0
+                episode_steps[env_idx] = 0
+                episode_start_times[env_idx] = _perf()
+                if type(noises[env_idx]) == helper.OUNoise:
+                    noises[env_idx].reset()
+                if episodes < num_episodes:
+                    self._on_epoch_begin(epoch=self._step, logs=None)
+
+            autoreset = terms | truncs
+            states = next_states
+            self._step += 1
+
+        envs.close()
+
+    def _get_vector_actions(self, states, noises, action_space, action_low, action_high):
+        """Batched counterpart of get_action for _train_vector_envs (one actor forward for all envs)."""
+        with T.inference_mode():
+            states = T.as_tensor(states, dtype=T.float32, device=self.actor_model.device)
+            if self.normalize_inputs:
+                states = self.state_normalizer.normalize(states)
+            # permute states to (N,C,H,W) if actor using cnn model
+            if self.actor_model.cnn_model:
+                states = states.permute(0, 3, 1, 2)
+            noise = T.stack([noise() for noise in noises]).to(self.actor_model.device)
+
+            # Check if in warmup; _step counts vector steps, warmup counts transitions
+            if self._step * self.num_envs <= self.warmup:
+                actions = T.as_tensor(action_space.sample(), dtype=T.float32, device=self.actor_model.device)
+            else:
+                _, pi = self._actor_infer(states, None)
+                actions = (pi + noise).clip(action_low, action_high)
+            actions_np = actions.cpu().numpy()
+
+        # epsilon greedy, per env
+        if self.action_epsilon > 0.0:
+            explore = np.random.random(len(noises)) < self.action_epsilon
+            if explore.any():
+                actions_np[explore] = action_space.sample()[explore]
+        return actions_np, noise.cpu().numpy()
+
        
     def test(self, num_episodes, render, render_freq, save_dir=None):
         """Runs a test over 'num_episodes'."""
@@ -3433,11 +4031,10 @@ class TD3(Agent):
         self.critic_model_b.eval()
 
         # Update save_dir if passed
-        if save_dir is not None and save_dir.split("/")[-2] != "td3":
-            self.save_dir = save_dir + "/td3/"
-            print(f'new save dir: {self.save_dir}')
-        elif save_dir is not None and save_dir.split("/")[-2] == "td3":
-            self.save_dir = save_dir
+        if save_dir is not None:
+            parts = save_dir.split("/")
+            tag = parts[-2] if len(parts) >= 2 else ''
+            self.save_dir = save_dir if tag == "td3" else save_dir + "/td3/"
             print(f'new save dir: {self.save_dir}')
 
         # instantiate list to store reward history
@@ -3455,10 +4052,6 @@ class TD3(Agent):
                 if self.callbacks:
                     for callback in self.callbacks:
                         callback.on_test_epoch_begin(epoch=self._step, logs=None) # update to pass any logs if needed
-                states = []
-                next_states = []
-                actions = []
-                rewards = []
                 state, _ = self.env.reset()
                 done = False
                 episode_reward = 0
@@ -3466,13 +4059,8 @@ class TD3(Agent):
                     action = self.get_action(state, test=True)
                     next_state, reward, term, trunc, _ = self.env.step(action)
                     # extract observation from next state if next_state is dict (robotics)
-                    if isinstance(next_state, dict):
-                        next_state = next_state['observation']
-                    # store trajectories
-                    states.append(state)
-                    actions.append(action)
-                    next_states.append(next_state)
-                    rewards.append(reward)
+                    if self._obs_is_dict:
+                        next_state = next_state[self._goal_key]
                     if term or trunc:
                         done = True
                     episode_reward += reward
@@ -3510,11 +4098,19 @@ class TD3(Agent):
                 "target_noise_stddev": self.target_noise_stddev,
                 "target_noise_clip": self.target_noise_clip,
                 "actor_update_delay": self.actor_update_delay,
+                "accumulation_steps": self.accumulation_steps,
                 'normalize_inputs': self.normalize_inputs,
                 # 'normalize_kwargs': self.normalize_kwargs,
                 'normalizer_clip': self.normalizer_clip,
                 'normalizer_eps': self.normalizer_eps,
                 'warmup': self.warmup,
+                'use_torch_compile': self.use_torch_compile,
+                'num_prefetch': self.num_prefetch,
+                'preempt_threshold': self.preempt_threshold,
+                'num_envs': self.num_envs,
+                'rollout_bf16': self.rollout_bf16,
+                'share_replay_buffer': self.share_replay_buffer,
+                'n_train_steps': self.n_train_steps,
                 "callbacks": [callback.get_config() for callback in self.callbacks if self.callbacks is not None],
                 "save_dir": self.save_dir,
                 "use_mpi": self.use_mpi,
@@ -3535,8 +4131,7 @@ class TD3(Agent):
         os.makedirs(self.save_dir, exist_ok=True)
 
         # writes and saves JSON file of DDPG agent config
-        with open(self.save_dir + "/config.json", "w", encoding="utf-8") as f:
-            json.dump(config, f, cls=CustomJSONEncoder)
+        _write_json(self.save_dir + "/config.json", config, cls=CustomJSONEncoder)
 
         # saves policy and value model
         self.actor_model.save(self.save_dir)
@@ -3544,7 +4139,7 @@ class TD3(Agent):
         self.critic_model_b.save(self.save_dir)
 
         if self.normalize_inputs:
-            self.state_normalizer.save_state(self.save_dir + "state_normalizer.npz")
+            self.state_normalizer.save_state(self.save_dir + "state_normalizer")
 
         # if wandb callback, save wandb config
         # if self._wandb:
@@ -3595,20 +4190,32 @@ class TD3(Agent):
             target_noise_stddev = config['target_noise_stddev'],
             target_noise_clip = config['target_noise_clip'],
             actor_update_delay = config['actor_update_delay'],
+            accumulation_steps = config.get('accumulation_steps', 1),
             normalize_inputs = config['normalize_inputs'],
             normalizer_clip = config['normalizer_clip'],
             warmup = config['warmup'],
+            use_torch_compile = config.get('use_torch_compile', False),
+            num_prefetch = config.get('num_prefetch', 0),
+            preempt_threshold = config.get('preempt_threshold', None),
+            num_envs = config.get('num_envs', 1),
+            rollout_bf16 = config.get('rollout_bf16', False),
+            share_replay_buffer = config.get('share_replay_buffer', False),
+            n_train_steps = config.get('n_train_steps', 1),
             callbacks=callbacks,
             save_dir=config["save_dir"],
             device=config["device"],
         )
 
         if agent.normalize_inputs:
-            agent.state_normalizer = helper.Normalizer.load_state(config['save_dir'] + "state_normalizer.npz")
+            agent.state_normalizer = helper.Normalizer.load_state(config['save_dir'] + "state_normalizer", device=agent.device)
 
         return agent
 
 
+# underlying agent class per HER sweep model type
+HER_AGENT_CLASSES = {"HER_DDPG": DDPG, "HER_TD3": TD3}
+
+
 class HER(Agent):
 
     def __init__(self,
@@ -3624,7 +4231,8 @@ class HER(Agent):
                  replay_buffer_size:int=1_000_000,
                  device:str='cuda',
                  save_dir: str = "models",
-                 comm=None):
+                 comm=None,
+                 stats_sync_every:int=1):
         super().__init__()
         try:
             if comm is not None:
@@ -3637,6 +4245,8 @@ class HER(Agent):
             self.agent = agent
             self.strategy = strategy
             self.tolerance = tolerance
+            # success is checked on squared distances against the squared tolerance
+            self._tol_sq = tolerance ** 2
             self.num_goals = num_goals
             self.desired_goal_func = desired_goal
             self.achieved_goal_func = achieved_goal
@@ -3645,10 +4255,14 @@ class HER(Agent):
             self.normalizer_eps = normalizer_eps
             self.replay_buffer_size = replay_buffer_size
             self.device = device
+            # episodes between normalizer stat syncs (local stats accumulate in between)
+            self.stats_sync_every = stats_sync_every
+            if save_dir is not None:
+                # agent's save dir ends in its own name, e.g. ".../td3/"
+                agent_name = self.agent.save_dir.split("/")[-2]
             if save_dir is not None and "/her/" not in save_dir:
                 self.save_dir = save_dir + "/her/"
                 # change save dir of agent to be in save dir of HER
-                agent_name = self.agent.save_dir.split("/")[-2]
                 #DEBUG
                 # print(f'agent name: {agent_name}')
                 self.agent.save_dir = self.save_dir + agent_name + "/"
@@ -3656,7 +4270,6 @@ class HER(Agent):
             elif save_dir is not None and "her" in save_dir:
                 self.save_dir = save_dir
                 # change save dir of agent to be in save dir of HER
-                agent_name = self.agent.save_dir.split("/")[-2]
                 self.agent.save_dir = self.save_dir + agent_name + "/"
 
             # update callback configs b/c changed save_dir
@@ -3666,6 +4279,12 @@ class HER(Agent):
 
             # Instantiate self.num_workers as placeholder (set in train)
             self.num_workers = None
+            # normalizer stats only need an MPI sync with more than one worker
+            self._mpi_parallel = self.comm.Get_size() > 1
+            # side stream for the target network soft updates, so the next cycle's rollout
+            # forwards don't queue behind them; readers of the targets wait on the event
+            self._target_stream = T.cuda.Stream() if T.device(self.device).type == 'cuda' and T.cuda.is_available() else None
+            self._target_event = None
             # logger.debug(f'rank {self.rank} attributes set')
         except Exception as e:
             logger.error(f"{self.group} rank {self.rank} attribute set failed: {e}", exc_info=True)
@@ -3729,11 +4348,10 @@ class HER(Agent):
         
         ## MPI for CPU ##
         try:
-            #sync networks
-            helper.sync_networks(self.agent.actor_model, self.comm)
-            helper.sync_networks(self.agent.critic_model, self.comm)
-            helper.sync_networks(self.agent.target_actor_model, self.comm)
-            helper.sync_networks(self.agent.target_critic_model, self.comm)
+            # sync networks (one flattened broadcast for all four)
+            helper.sync_networks([self.agent.actor_model, self.agent.critic_model,
+                                  self.agent.target_actor_model, self.agent.target_critic_model],
+                                 self.comm)
             # logger.debug(f"rank {self.rank} networks synced")
         except Exception as e:
             logger.error(f"{self.group} rank {self.rank} failed to sync networks: {e}", exc_info=True)
@@ -3776,13 +4394,15 @@ class HER(Agent):
         rank = MPI.COMM_WORLD.rank
 
         if comm is not None:
-            logger.debug(f"Rank {rank} comm detected")
+            logger.debug("Rank %s comm detected", rank)
             rank = comm.Get_rank()
-            logger.debug(f"Global rank {MPI.COMM_WORLD.Get_rank()} in {comm.Get_name()} set to comm rank {rank}")
+            logger.debug("Global rank %s in %s set to comm rank %s", MPI.COMM_WORLD.Get_rank(), comm.Get_name(), rank)
 
-            logger.debug(f"init_sweep fired: global rank {MPI.COMM_WORLD.rank}, group rank {rank}, {comm.Get_name()}")
+            logger.debug("init_sweep fired: global rank %s, group rank %s, %s", MPI.COMM_WORLD.rank, rank, comm.Get_name())
         else:
-            logger.debug(f"init_sweep fired: global rank")
+            logger.debug("init_sweep fired: global rank")
+        # prepended to every debug message below
+        log_prefix = f"{comm.Get_name()}; Rank {rank} " if comm is not None else ""
         try:
             # rank = MPI.COMM_WORLD.rank
             # Instantiate her variable 
@@ -3792,148 +4412,60 @@ class HER(Agent):
             # agent_config_path = f'sweep/agent_config_{run_number}.json'
             # logger.debug(f"rank {rank} agent config path: {agent_config_path}")
             model_type = list(config.keys())[0]
+            # every sweep setting for this agent lives under config[model_type]
+            mcfg = config[model_type]
             # config = wandb.config
-            if comm is not None:
-                logger.debug(f"{comm.Get_name()}; Rank {rank} train config: {train_config}")
-                logger.debug(f"{comm.Get_name()}; Rank {rank} env spec id: {env.spec.id}")
-                logger.debug(f"{comm.Get_name()}; Rank {rank} callbacks: {callbacks}")
-                logger.debug(f"{comm.Get_name()}; Rank {rank} run number: {run_number}")
-                logger.debug(f"{comm.Get_name()}; Rank {rank} config set: {config}")
-                logger.debug(f"{comm.Get_name()}; Rank {rank} model type: {model_type}")
-                # Only primary process (rank 0) calls wandb.init() to build agent and log data
-            else:
-                logger.debug(f"train config: {train_config}")
-                logger.debug(f"env spec id: {env.spec.id}")
-                logger.debug(f"callbacks: {callbacks}")
-                logger.debug(f"run number: {run_number}")
-                logger.debug(f"config set: {config}")
-                logger.debug(f"model type: {model_type}")
+            logger.debug("%strain config: %s", log_prefix, train_config)
+            logger.debug("%senv spec id: %s", log_prefix, env.spec.id)
+            logger.debug("%scallbacks: %s", log_prefix, callbacks)
+            logger.debug("%srun number: %s", log_prefix, run_number)
+            logger.debug("%sconfig set: %s", log_prefix, config)
+            logger.debug("%smodel type: %s", log_prefix, model_type)
+            # Only primary process (rank 0) calls wandb.init() to build agent and log data
 
             actor_cnn_layers, critic_cnn_layers, actor_layers, critic_state_layers, critic_merged_layers, kernels = wandb_support.build_layers(config)
-            if comm is not None:
-                logger.debug(f"{comm.Get_name()}; Rank {rank} layers built")
-            else:
-                logger.debug(f"layers built")
+            logger.debug("%slayers built", log_prefix)
             # Actor
-            actor_learning_rate=config[model_type][f"{model_type}_actor_learning_rate"]
-            if comm is not None:
-                logger.debug(f"{comm.Get_name()}; Rank {rank} actor learning rate set")
-            else:
-                logger.debug(f"actor learning rate set")
-            actor_optimizer = config[model_type][f"{model_type}_actor_optimizer"]
-            if comm is not None:
-                logger.debug(f"{comm.Get_name()}; Rank {rank} actor optimizer set")
-            else:
-                logger.debug(f"actor optimizer set")
+            actor_learning_rate=mcfg[f"{model_type}_actor_learning_rate"]
+            logger.debug("%sactor learning rate set", log_prefix)
+            actor_optimizer = mcfg[f"{model_type}_actor_optimizer"]
+            logger.debug("%sactor optimizer set", log_prefix)
             # get optimizer params
-            actor_optimizer_params = {}
-            if actor_optimizer == "Adam":
-                actor_optimizer_params['weight_decay'] = \
-                    config[model_type][f"{model_type}_actor_optimizer_{actor_optimizer}_options"][f'{actor_optimizer}_weight_decay']
-            
-            elif actor_optimizer == "Adagrad":
-                actor_optimizer_params['weight_decay'] = \
-                    config[model_type][f"{model_type}_actor_optimizer_{actor_optimizer}_options"][f'{actor_optimizer}_weight_decay']
-                actor_optimizer_params['lr_decay'] = \
-                    config[model_type][f"{model_type}_actor_optimizer_{actor_optimizer}_options"][f'{actor_optimizer}_lr_decay']
-            
-            elif actor_optimizer == "RMSprop" or actor_optimizer == "SGD":
-                actor_optimizer_params['weight_decay'] = \
-                    config[model_type][f"{model_type}_actor_optimizer_{actor_optimizer}_options"][f'{actor_optimizer}_weight_decay']
-                actor_optimizer_params['momentum'] = \
-                    config[model_type][f"{model_type}_actor_optimizer_{actor_optimizer}_options"][f'{actor_optimizer}_momentum']
-
-            if comm is not None:
-                logger.debug(f"{comm.Get_name()}; Rank {rank} actor optimizer params set")
-            else:
-                logger.debug(f"actor optimizer params set")
-            actor_normalize_layers = config[model_type][f"{model_type}_actor_normalize_layers"]
-            if comm is not None:
-                logger.debug(f"{comm.Get_name()}; Rank {rank} actor normalize layers set")
-            else:
-                logger.debug(f"actor normalize layers set")
+            actor_optimizer_params = build_opt_params(config, model_type, "actor", actor_optimizer)
+            logger.debug("%sactor optimizer params set", log_prefix)
+            actor_normalize_layers = mcfg[f"{model_type}_actor_normalize_layers"]
+            logger.debug("%sactor normalize layers set", log_prefix)
             # Critic
-            critic_learning_rate=config[model_type][f"{model_type}_critic_learning_rate"]
-            if comm is not None:
-                logger.debug(f"{comm.Get_name()}; Rank {rank} critic learning rate set")
-            else:
-                logger.debug(f"critic learning rate set")
-            critic_optimizer = config[model_type][f"{model_type}_critic_optimizer"]
-            if comm is not None:
-                logger.debug(f"{comm.Get_name()}; Rank {rank} critic optimizer set")
-            else:
-                logger.debug(f"critic optimizer set")
-            critic_optimizer_params = {}
-            if critic_optimizer == "Adam":
-                critic_optimizer_params['weight_decay'] = \
-                    config[model_type][f"{model_type}_critic_optimizer_{critic_optimizer}_options"][f'{critic_optimizer}_weight_decay']
-            
-            elif critic_optimizer == "Adagrad":
-                critic_optimizer_params['weight_decay'] = \
-                    config[model_type][f"{model_type}_critic_optimizer_{critic_optimizer}_options"][f'{critic_optimizer}_weight_decay']
-                critic_optimizer_params['lr_decay'] = \
-                    config[model_type][f"{model_type}_critic_optimizer_{critic_optimizer}_options"][f'{critic_optimizer}_lr_decay']
-            
-            elif critic_optimizer == "RMSprop" or critic_optimizer == "SGD":
-                critic_optimizer_params['weight_decay'] = \
-                    config[model_type][f"{model_type}_critic_optimizer_{critic_optimizer}_options"][f'{critic_optimizer}_weight_decay']
-                critic_optimizer_params['momentum'] = \
-                    config[model_type][f"{model_type}_critic_optimizer_{critic_optimizer}_options"][f'{critic_optimizer}_momentum']
-            if comm is not None:
-                logger.debug(f"{comm.Get_name()}; Rank {rank} critic optimizer params set")
-            else:
-                logger.debug(f"critic optimizer params set")
-
-            critic_normalize_layers = config[model_type][f"{model_type}_critic_normalize_layers"]
-            if comm is not None:
-                logger.debug(f"{comm.Get_name()}; Rank {rank} critic normalize layers set")
-            else:
-                logger.debug(f"critic normalize layers set")
+            critic_learning_rate=mcfg[f"{model_type}_critic_learning_rate"]
+            logger.debug("%scritic learning rate set", log_prefix)
+            critic_optimizer = mcfg[f"{model_type}_critic_optimizer"]
+            logger.debug("%scritic optimizer set", log_prefix)
+            critic_optimizer_params = build_opt_params(config, model_type, "critic", critic_optimizer)
+            logger.debug("%scritic optimizer params set", log_prefix)
+
+            critic_normalize_layers = mcfg[f"{model_type}_critic_normalize_layers"]
+            logger.debug("%scritic normalize layers set", log_prefix)
             # Set device
-            device = config[model_type][f"{model_type}_device"]
-            if comm is not None:
-                logger.debug(f"{comm.Get_name()}; Rank {rank} device set")
-            else:
-                logger.debug(f"device set")
+            device = mcfg[f"{model_type}_device"]
+            logger.debug("%sdevice set", log_prefix)
             # Check if CNN layers and if so, build CNN model
             if actor_cnn_layers:
                 actor_cnn_model = cnn_models.CNN(actor_cnn_layers, env)
             else:
                 actor_cnn_model = None
-            if comm is not None:
-                logger.debug(f"{comm.Get_name()}; Rank {rank} actor cnn layers set: {actor_cnn_layers}")
-            else:
-                logger.debug(f"actor cnn layers set: {actor_cnn_layers}")
+            logger.debug("%sactor cnn layers set: %s", log_prefix, actor_cnn_layers)
 
             if critic_cnn_layers:
                 critic_cnn_model = cnn_models.CNN(critic_cnn_layers, env)
             else:
                 critic_cnn_model = None
-            if comm is not None:
-                logger.debug(f"{comm.Get_name()}; Rank {rank} critic cnn layers set: {critic_cnn_layers}")
-            else:
-                logger.debug(f"critic cnn layers set: {critic_cnn_layers}")
+            logger.debug("%scritic cnn layers set: %s", log_prefix, critic_cnn_layers)
             # get desired, achieved, reward func for env
-            if comm is not None:
-                logger.debug(f"{comm.Get_name()}; Rank {rank} second call env.spec: {env.spec.id}")
-            else:
-                logger.debug(f"second call env.spec: {env.spec.id}")
-            desired_goal_func, achieved_goal_func, reward_func = gym_helper.get_her_goal_functions(env)
-            if comm is not None:
-                logger.debug(f"{comm.Get_name()}; Rank {rank} goal function set")
-            else:
-                logger.debug(f"goal function set")
-            # Reset env state to initiate state to detect correct goal shape
-            _,_ = env.reset()
-            if comm is not None:
-                logger.debug(f"{comm.Get_name()}; Rank {rank} env reset")
-            else:
-                logger.debug(f"env reset")
-            goal_shape = desired_goal_func(env).shape
-            if comm is not None:
-                logger.debug(f"{comm.Get_name()}; Rank {rank} goal shape set: {goal_shape}")
-            else:
-                logger.debug(f"goal shape set: {goal_shape}")
+            logger.debug("%ssecond call env.spec: %s", log_prefix, env.spec.id)
+            # (the env is only reset to probe the goal shape the first time this spec is built)
+            desired_goal_func, achieved_goal_func, reward_func, goal_shape = _her_goal_spec(env, reset=True)
+            logger.debug("%sgoal function set", log_prefix)
+            logger.debug("%sgoal shape set: %s", log_prefix, goal_shape)
             # Get actor clamp value
             # clamp_output = config[model_type][f"{model_type}_actor_clamp_output"]
             # logger.debug(f"{comm.Get_name()}; Rank {rank} clamp output set: {clamp_output}")
@@ -3949,10 +4481,8 @@ class HER(Agent):
                                             # clamp_output=clamp_output,
                                             device=device,
             )
-            if comm is not None:
-                logger.debug(f"{comm.Get_name()}; Rank {rank} actor model built: {actor_model.get_config()}")
-            else:
-                logger.debug(f"actor model built: {actor_model.get_config()}")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("%sactor model built: %s", log_prefix, actor_model.get_config())
             critic_model = models.CriticModel(env = env,
                                             cnn_model = critic_cnn_model,
                                             state_layers = critic_state_layers,
@@ -3965,93 +4495,62 @@ class HER(Agent):
                                             normalize_layers = critic_normalize_layers,
                                             device=device,
             )
-            if comm is not None:
-                logger.debug(f"{comm.Get_name()}; Rank {rank} critic model built: {critic_model.get_config()}")
-            else:
-                logger.debug(f"critic model built: {critic_model.get_config()}")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("%scritic model built: %s", log_prefix, critic_model.get_config())
             # get goal metrics
-            strategy = config[model_type][f"{model_type}_goal_strategy"]
+            strategy = mcfg[f"{model_type}_goal_strategy"]
             
-            tolerance = config[model_type][f"{model_type}_goal_tolerance"]
+            tolerance = mcfg[f"{model_type}_goal_tolerance"]
             
-            num_goals = config[model_type][f"{model_type}_num_goals"]
+            num_goals = mcfg[f"{model_type}_num_goals"]
             
             # get normalizer clip value
-            normalizer_clip = config[model_type][f"{model_type}_normalizer_clip"]
+            normalizer_clip = mcfg[f"{model_type}_normalizer_clip"]
             
             # get action epsilon
-            action_epsilon = config[model_type][f"{model_type}_epsilon_greedy"]
+            action_epsilon = mcfg[f"{model_type}_epsilon_greedy"]
             
             # Replay buffer size
-            replay_buffer_size = config[model_type][f"{model_type}_replay_buffer_size"]
+            replay_buffer_size = mcfg[f"{model_type}_replay_buffer_size"]
             
             # Save dir
-            save_dir = config[model_type][f"{model_type}_save_dir"]
+            save_dir = mcfg[f"{model_type}_save_dir"]
             
-            if comm is not None:
-                logger.debug(f"{comm.Get_name()}; Rank {rank} strategy set: {strategy}")
-                logger.debug(f"{comm.Get_name()}; Rank {rank} tolerance set: {tolerance}")
-                logger.debug(f"{comm.Get_name()}; Rank {rank} num goals set: {num_goals}")
-                logger.debug(f"{comm.Get_name()}; Rank {rank} normalizer clip set: {normalizer_clip}")
-                logger.debug(f"{comm.Get_name()}; Rank {rank} action epsilon set: {action_epsilon}")
-                logger.debug(f"{comm.Get_name()}; Rank {rank} replay buffer size set: {replay_buffer_size}")
-                logger.debug(f"{comm.Get_name()}; Rank {rank} save dir set: {save_dir}")
-            else:
-                logger.debug(f"strategy set: {strategy}")
-                logger.debug(f"tolerance set: {tolerance}")
-                logger.debug(f"num goals set: {num_goals}")
-                logger.debug(f"normalizer clip set: {normalizer_clip}")
-                logger.debug(f"action epsilon set: {action_epsilon}")
-                logger.debug(f"replay buffer size set: {replay_buffer_size}")
-                logger.debug(f"save dir set: {save_dir}")
+            logger.debug("%sstrategy set: %s", log_prefix, strategy)
+            logger.debug("%stolerance set: %s", log_prefix, tolerance)
+            logger.debug("%snum goals set: %s", log_prefix, num_goals)
+            logger.debug("%snormalizer clip set: %s", log_prefix, normalizer_clip)
+            logger.debug("%saction epsilon set: %s", log_prefix, action_epsilon)
+            logger.debug("%sreplay buffer size set: %s", log_prefix, replay_buffer_size)
+            logger.debug("%ssave dir set: %s", log_prefix, save_dir)
             
             
-            if model_type == "HER_DDPG":
-                ddpg_agent= DDPG(
-                    env = env,
-                    actor_model = actor_model,
-                    critic_model = critic_model,
-                    discount = config[model_type][f"{model_type}_discount"],
-                    tau = config[model_type][f"{model_type}_tau"],
-                    action_epsilon = action_epsilon,
-                    replay_buffer = None,
-                    batch_size = config[model_type][f"{model_type}_batch_size"],
-                    noise = helper.Noise.create_instance(config[model_type][f"{model_type}_noise"], shape=env.action_space.shape, **config[model_type][f"{model_type}_noise_{config[model_type][f'{model_type}_noise']}"], device=device),
-                    callbacks = callbacks,
-                    comm = comm
-                )
-                if comm is not None:
-                    logger.debug(f"{comm.Get_name()}; Rank {rank} ddpg agent built: {ddpg_agent.get_config()}")
-                else:
-                    logger.debug(f"ddpg agent built: {ddpg_agent.get_config()}")
-
-            elif model_type == "HER_TD3":
-                ddpg_agent= TD3(
-                    env = env,
-                    actor_model = actor_model,
-                    critic_model = critic_model,
-                    discount = config[model_type][f"{model_type}_discount"],
-                    tau = config[model_type][f"{model_type}_tau"],
-                    action_epsilon = action_epsilon,
-                    replay_buffer = None,
-                    batch_size = config[model_type][f"{model_type}_batch_size"],
-                    noise = helper.Noise.create_instance(config[model_type][f"{model_type}_noise"], shape=env.action_space.shape, **config[model_type][f"{model_type}_noise_{config[model_type][f'{model_type}_noise']}"], device=device),
-                    target_noise_stddev= config[model_type][f"{model_type}_target_action_stddev"],
-                    target_noise_clip= config[model_type][f"{model_type}_target_action_clip"],
-                    actor_update_delay= config[model_type][f"{model_type}_actor_update_delay"],
-                    callbacks = callbacks,
-                    comm = comm
+            # kwargs shared by both underlying agents; TD3 adds its target smoothing and delay
+            agent_kwargs = dict(
+                env = env,
+                actor_model = actor_model,
+                critic_model = critic_model,
+                discount = mcfg[f"{model_type}_discount"],
+                tau = mcfg[f"{model_type}_tau"],
+                action_epsilon = action_epsilon,
+                replay_buffer = None,
+                batch_size = mcfg[f"{model_type}_batch_size"],
+                noise = build_noise(config, model_type, env.action_space.shape, device),
+                callbacks = callbacks,
+                comm = comm
+            )
+            if model_type == "HER_TD3":
+                agent_kwargs.update(
+                    target_noise_stddev = mcfg[f"{model_type}_target_action_stddev"],
+                    target_noise_clip = mcfg[f"{model_type}_target_action_clip"],
+                    actor_update_delay = mcfg[f"{model_type}_actor_update_delay"],
                 )
-                if comm is not None:
-                    logger.debug(f"{comm.Get_name()}; Rank {rank} ddpg agent built: {ddpg_agent.get_config()}")
-                else:
-                    logger.debug(f"ddpg agent built: {ddpg_agent.get_config()}")
-
-            if comm is not None:
-                logger.debug(f"{comm.Get_name()}; Rank {rank} build barrier called")
-                comm.Barrier()
-                logger.debug(f"{comm.Get_name()}; Rank {rank} build barrier passed")
+            ddpg_agent = HER_AGENT_CLASSES[model_type](**agent_kwargs)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("%sddpg agent built: %s", log_prefix, ddpg_agent.get_config())
 
+            # HER init broadcasts the networks (a collective), and the barrier
+            # before train syncs all ranks, so no separate build barrier is needed
             her = cls(
                 agent = ddpg_agent,
                 strategy = strategy,
@@ -4066,15 +4565,14 @@ class HER(Agent):
                 save_dir = save_dir,
                 comm = comm
             )
-            if comm is not None:
-                logger.debug(f"{comm.Get_name()}; Rank {rank} her agent built: {her.get_config()}")
-            else:
-                logger.debug(f"her agent built: {her.get_config()}")
+            # get_config serializes the whole agent, so only build it when debug logging is on
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("%sher agent built: %s", log_prefix, her.get_config())
 
             if comm is not None:
-                logger.debug(f"{comm.Get_name()}; Rank {rank} train barrier called")
+                logger.debug("%strain barrier called", log_prefix)
                 comm.Barrier()
-                logger.debug(f"{comm.Get_name()}; Rank {rank} train barrier passed")
+                logger.debug("%strain barrier passed", log_prefix)
 
             her.train(
                     num_epochs=train_config['num_epochs'],
@@ -4090,21 +4588,19 @@ class HER(Agent):
 
     def train(self, num_epochs:int, num_cycles:int, num_episodes:int, num_updates:int,
               render:bool, render_freq:int, save_dir=None):
+        cb_pool = None
         try:
             logger.debug(f"{self.group}; Rank {self.rank} train fired")
 
-            if save_dir is not None and len(save_dir.split("/")) >= 2:
-                if save_dir.split("/")[-2] != "her":
+            if save_dir is not None:
+                # last path component, with or without a trailing slash
+                if Path(save_dir).name == "her":
+                    self.save_dir = os.path.join(save_dir, "")
+                else:
                     self.save_dir = save_dir + "/her/"
-                    # change save dir of agent to be in save dir of HER
-                    agent_name = self.agent.save_dir.split("/")[-2]
-                    self.agent.save_dir = self.save_dir + agent_name + "/"
-            elif save_dir is not None and len(save_dir.split("/")) >= 2:
-                if save_dir.split("/")[-2] == "her":
-                    self.save_dir = save_dir
-                    # change save dir of agent to be in save dir of HER
-                    agent_name = self.agent.save_dir.split("/")[-2]
-                    self.agent.save_dir = self.save_dir + agent_name + "/"
+                # change save dir of agent to be in save dir of HER
+                agent_name = Path(self.agent.save_dir).name
+                self.agent.save_dir = self.save_dir + agent_name + "/"
             
             # set models to train mode
             self.agent.actor_model.train()
@@ -4158,17 +4654,46 @@ class HER(Agent):
             self._step = 0
             self._episode = 0
             self._cycle = 0
-            self._successes = 0.0
             # set best reward
             # best_reward = self.agent.env.reward_range[0] # substitute with -np.inf
             best_reward = -np.inf
-            # instantiate list to store reward history
-            reward_history = []
-            # instantiate lists to store time history
-            episode_time_history = []
-            step_time_history = []
-            learning_time_history = []
-            steps_per_episode_history = []  # List to store steps per episode
+            # rolling means over the last 100 values
+            reward_history = helper.RollingMean(100)
+            success_history = helper.RollingMean(100)
+            episode_time_history = helper.RollingMean(100)
+            steps_per_episode_history = helper.RollingMean(100)  # steps per episode
+            # only OU noise carries state that needs resetting between episodes
+            noise_reset = self.agent.noise.reset if isinstance(self.agent.noise, helper.OUNoise) else None
+            # per-episode trajectory arrays, allocated on the first episode and reused
+            traj_capacity = getattr(self.agent.env.spec, 'max_episode_steps', None) or 1000
+            traj = None
+            tol_sq = self._tol_sq
+            stats_sync_every = self.stats_sync_every
+            # only rank 0 runs callbacks, so only it needs the per-step logs
+            log_step = bool(self.agent.callbacks) and self.rank == 0
+            # epoch begin, step end and epoch end callbacks (wandb network I/O) all run on
+            # one background worker, so training doesn't wait on them and wandb still
+            # receives every log in step order
+            cb_pool = ThreadPoolExecutor(max_workers=1) if log_step else None
+
+            def run_callbacks(method, **kwargs):
+                for callback in self.agent.callbacks:
+                    cb_pool.submit(getattr(callback, method), **kwargs).add_done_callback(_log_callback_error)
+
+            def drain_callbacks():
+                # wait for queued callbacks, e.g. before files they upload are rewritten
+                if cb_pool is not None:
+                    cb_pool.submit(lambda: None).result()
+            # bind the objects and methods used on every step once
+            env = self.agent.env
+            env_step = env.step
+            get_action = self.agent.get_action
+            achieved_goal_func = self.achieved_goal_func
+            state_norm_update = self.state_normalizer.update_local_stats
+            goal_norm_update = self.goal_normalizer.update_local_stats
+            replay_buffer_add = self.replay_buffer.add
+            # observation type is fixed per env, so check it once
+            obs_is_dict = isinstance(env.observation_space, gym.spaces.dict.Dict)
             for epoch in range(num_epochs):
                 logger.debug(f'{self.group}; Rank {self.rank} HER.train starting epoch {epoch+1}')
                 for cycle in range(num_cycles):
@@ -4180,35 +4705,36 @@ class HER(Agent):
                         if self.agent.callbacks:
                             # if mpi_active:
                             if self.rank == 0:
-                                for callback in self.agent.callbacks:
-                                    callback.on_train_epoch_begin(epoch=self._step, logs=None)
-                                    logger.debug(f'{self.group}; Rank {self.rank} HER.train on train epoch begin callback completed')
+                                run_callbacks('on_train_epoch_begin', epoch=self._step, logs=None)
                             # else:
                             #     for callback in self.agent.callbacks:
                             #         callback.on_train_epoch_begin(epoch=step_counter, logs=None)
 
-                        episode_start_time = time.time()
+                        episode_start_time = _perf()
                         
                         # reset noise
-                        if type(self.agent.noise) == helper.OUNoise:
-                            self.agent.noise.reset()
+                        if noise_reset is not None:
+                            noise_reset()
 
                         # reset environment
-                        state, _ = self.agent.env.reset()
+                        state, _ = env.reset()
                         # print(f'state: {state}' )
-                        if isinstance(state, dict): # if state is a dict, extract observation (robotics)
+                        if obs_is_dict: # if state is a dict, extract observation and goals (robotics)
+                            # goal envs return the same goals their goal functions would re-read from the env
+                            desired_goal = state["desired_goal"]
+                            state_achieved_goal = state["achieved_goal"]
                             state = state["observation"]
-                        
-                        # instantiate empty lists to store current episode trajectory
+                        else:
+                            # set desired goal
+                            desired_goal = self.desired_goal_func(env)
+                            # set achieved goal
+                            state_achieved_goal = achieved_goal_func(env)
+
+                        # arrays to store current episode trajectory
+                        if traj is None:
+                            traj = self._trajectory_buffers(traj_capacity, state, desired_goal)
                         states, actions, next_states, dones, state_achieved_goals, \
-                        next_state_achieved_goals, desired_goals = [], [], [], [], [], [], []
-                        
-                        # set desired goal
-                        desired_goal = self.desired_goal_func(self.agent.env)
-                        # print(f'desired goal: {desired_goal}')
-                        
-                        # set achieved goal
-                        state_achieved_goal = self.achieved_goal_func(self.agent.env)
+                        next_state_achieved_goals, desired_goals = traj
 
                         # add initial state and goals to local normalizer stats
                         self.state_normalizer.update_local_stats(state)
@@ -4228,50 +4754,53 @@ class HER(Agent):
                             # increase step counter
                             self._step += 1
                             
-                            # start step timer
-                            step_start_time = time.time()
+                            # start step timer (step time is only consumed by step logs)
+                            if log_step:
+                                step_start_time = _perf()
                             
                             # get action
-                            action = self.agent.get_action(state, desired_goal, grad=True,
+                            action = get_action(state, desired_goal, grad=True,
                                                     state_normalizer=self.state_normalizer,
                                                     goal_normalizer=self.goal_normalizer)
                             
                             # take action
-                            next_state, reward, term, trunc, _ = self.agent.env.step(action)
+                            next_state, reward, term, trunc, _ = env_step(action)
                             
-                            # extract observation from next state if next_state is dict (robotics)
-                            if isinstance(next_state, dict):
+                            # extract observation and next state achieved goal from next state if next_state is dict (robotics)
+                            if obs_is_dict:
+                                next_state_achieved_goal = next_state["achieved_goal"]
                                 next_state = next_state["observation"]
+                            else:
+                                next_state_achieved_goal = achieved_goal_func(env)
                             
-                            # calculate and log step time
-                            step_time = time.time() - step_start_time
-                            step_time_history.append(step_time)
-                            
-                            # get next state achieved goal
-                            next_state_achieved_goal = self.achieved_goal_func(self.agent.env)
+                            # calculate step time
+                            if log_step:
+                                step_time = _perf() - step_start_time
                             
                             # add next state and next state achieved goal to normalizers
-                            self.state_normalizer.update_local_stats(next_state)
-                            self.goal_normalizer.update_local_stats(next_state_achieved_goal)
-                            
-                            # calculate distance from achieved goal to desired goal
-                            distance_to_goal = np.linalg.norm(desired_goal - next_state_achieved_goal)
+                            state_norm_update(next_state)
+                            goal_norm_update(next_state_achieved_goal)
                             
-                            # store distance in step config to send to wandb
-                            self.agent._train_step_config["goal_distance"] = distance_to_goal
+                            # calculate (squared) distance from achieved goal to desired goal
+                            goal_diff = (desired_goal - next_state_achieved_goal).ravel()
+                            dist_sq = float(np.dot(goal_diff, goal_diff))
                             
                             # store trajectory in replay buffer (non normalized!)
-                            self.replay_buffer.add(state, action, reward, next_state, done,\
+                            replay_buffer_add(state, action, reward, next_state, done,\
                                                             state_achieved_goal, next_state_achieved_goal, desired_goal)
                             
-                            # append step state, action, next state, and goals to respective lists
-                            states.append(state)
-                            actions.append(action)
-                            next_states.append(next_state)
-                            dones.append(done)
-                            state_achieved_goals.append(state_achieved_goal)
-                            next_state_achieved_goals.append(next_state_achieved_goal)
-                            desired_goals.append(desired_goal)
+                            # write step state, action, next state, and goals to respective arrays
+                            if episode_steps == len(states):
+                                traj = self._trajectory_buffers(2 * len(states), state, desired_goal, traj)
+                                states, actions, next_states, dones, state_achieved_goals, \
+                                next_state_achieved_goals, desired_goals = traj
+                            states[episode_steps] = state
+                            actions[episode_steps] = action
+                            next_states[episode_steps] = next_state
+                            dones[episode_steps] = done
+                            state_achieved_goals[episode_steps] = state_achieved_goal
+                            next_state_achieved_goals[episode_steps] = next_state_achieved_goal
+                            desired_goals[episode_steps] = desired_goal
 
                             # add to episode reward and increment steps counter
                             episode_reward += reward
@@ -4282,92 +4811,92 @@ class HER(Agent):
                             # update done flag
                             if term or trunc:
                                 done = True
-                            # log step metrics
-                            self.agent._train_step_config["step_reward"] = reward
-                            self.agent._train_step_config["step_time"] = step_time
-                            
-                            
-                            # log to wandb if using wandb callback
-                            if self.agent.callbacks:
-                                # only have the main process log callback values to avoid multiple callback calls
-                                # if mpi_active:
-                                if self.rank == 0:
-                                    for callback in self.agent.callbacks:
-                                        callback.on_train_step_end(step=self._step, logs=self.agent._train_step_config)
-                                        logger.debug(f'{self.group}; Rank {self.rank} HER.train on train step end callback completed')
-                                # else:
-                                #     for callback in self.agent.callbacks:
-                                #         callback.on_train_step_end(step=step_counter, logs=self.agent._train_step_config)
-
-                        # calculate success rate
-                        success = (distance_to_goal <= self.tolerance).astype(np.float32)
-                        self._successes += success
-                        success_perc = self._successes / self._episode
-                        # store success rate to train episode config
-                        self.agent._train_episode_config["success_rate"] = success_perc
-
-                        # Update global normalizer stats (main process only)
-                        self.state_normalizer.update_global_stats()
-                        self.goal_normalizer.update_global_stats()
+                            # log step metrics and send them to wandb if using wandb callback
+                            # (only the main process logs callback values to avoid multiple callback calls)
+                            if log_step:
+                                self.agent._train_step_config.update(
+                                    goal_distance=math.sqrt(dist_sq),
+                                    step_reward=reward,
+                                    step_time=step_time,
+                                )
+                                # snapshot the logs, the next step keeps updating the step config
+                                run_callbacks('on_train_step_end', step=self._step, logs=dict(self.agent._train_step_config))
+
+                        # calculate success rate (over the last 100 episodes)
+                        success_history.add(1.0 if dist_sq <= tol_sq else 0.0)
+                        success_perc = success_history.mean
+
+                        # Update global normalizer stats every stats_sync_every episodes
+                        # (state and goal share one allreduce)
+                        if self._episode % stats_sync_every == 0:
+                            helper.sync_normalizer_stats((self.state_normalizer, self.goal_normalizer),
+                                                         self.comm if self._mpi_parallel else None)
                         
                         # package episode states, actions, next states, and goals into trajectory tuple
-                        trajectory = (states, actions, next_states, dones, state_achieved_goals, next_state_achieved_goals, desired_goals)
+                        trajectory = tuple(buf[:episode_steps] for buf in traj)
 
                         # store hindsight experience replay trajectory using current episode trajectory and goal strategy
                         self.store_hindsight_trajectory(trajectory)
                             
                         # check if enough samples in replay buffer and if so, learn from experiences
                         if self.replay_buffer.counter > self.agent.batch_size:
-                            learn_time = time.time()
-                            for _ in range(num_updates):
-                                actor_loss, critic_loss = self.agent.learn(replay_buffer=self.replay_buffer,
-                                                                    state_normalizer=self.state_normalizer,
-                                                                    goal_normalizer=self.goal_normalizer,
-                                                                    )
-                            self.agent._train_episode_config["actor_loss"] = actor_loss
-                            self.agent._train_episode_config["critic_loss"] = critic_loss
-                    
-                            learning_time_history.append(time.time() - learn_time)
-                        
-                        episode_time = time.time() - episode_start_time
-                        episode_time_history.append(episode_time)
-                        reward_history.append(episode_reward)
-                        steps_per_episode_history.append(episode_steps) 
-                        avg_reward = np.mean(reward_history[-100:])
-                        avg_episode_time = np.mean(episode_time_history[-100:])
-                        avg_step_time = np.mean(step_time_history[-100:])
-                        avg_learn_time = np.mean(learning_time_history[-100:])
-                        avg_steps_per_episode = np.mean(steps_per_episode_history[-100:])  # Calculate average steps per episode
-
-                        self.agent._train_episode_config['episode'] = episode
-                        self.agent._train_episode_config["episode_reward"] = episode_reward
-                        self.agent._train_episode_config["avg_reward"] = avg_reward
-                        self.agent._train_episode_config["episode_time"] = episode_time
+                            # learn reads the target networks
+                            self._wait_target_update()
+                            # num_updates gradient steps from one sample; losses are averaged over them
+                            actor_loss, critic_loss = self.agent.learn_batch(replay_buffer=self.replay_buffer,
+                                                                state_normalizer=self.state_normalizer,
+                                                                goal_normalizer=self.goal_normalizer,
+                                                                n_updates=num_updates,
+                                                                )
+                            # TD3 returns no actor loss when none of the updates was a delayed actor step;
+                            # keep the last real one
+                            if actor_loss is not None:
+                                self.agent._train_episode_config['actor_loss'] = actor_loss
+                            self.agent._train_episode_config['critic_loss'] = critic_loss
                         
+                        episode_time = _perf() - episode_start_time
+                        episode_time_history.add(episode_time)
+                        reward_history.add(episode_reward)
+                        steps_per_episode_history.add(episode_steps)
+                        avg_reward = reward_history.mean
+                        avg_episode_time = episode_time_history.mean
+                        avg_steps_per_episode = steps_per_episode_history.mean  # Calculate average steps per episode
+
                         # check if best reward and save model if it is
                         if avg_reward > best_reward:
                             best = True
                             best_reward = avg_reward
-                            # save model
-                            self.save()
+                            # save model (weights are synced across ranks, so only rank 0 writes;
+                            # save has no collectives, so skipping it on other ranks can't stall them)
+                            if self.rank == 0:
+                                drain_callbacks()
+                                self.save()
                         else:
                             best = False
+
+                        # store episode metrics to train episode config
+                        self.agent._train_episode_config.update(
+                            success_rate=success_perc,
+                            episode=episode,
+                            episode_reward=episode_reward,
+                            avg_reward=avg_reward,
+                            episode_time=episode_time,
+                            best=best,
+                        )
                         
                         if self.agent.callbacks:
-                            self.agent._train_episode_config["best"] = best
                             # if mpi_active:
                             if self.rank == 0:
-                                for callback in self.agent.callbacks:
-                                    callback.on_train_epoch_end(epoch=self._step, logs=self.agent._train_episode_config)
-                                    logger.debug(f'{self.group}; Rank {self.rank} HER.train on train epoch callback completed')
+                                # snapshot the logs, the next cycle keeps updating the episode config
+                                run_callbacks('on_train_epoch_end', epoch=self._step, logs=dict(self.agent._train_episode_config))
                             # else:
                             #     for callback in self.agent.callbacks:
                             #         callback.on_train_epoch_end(epoch=step_counter, logs=self.agent._train_episode_config)
 
                     # perform soft update on target networks
                     try:
-                        self.agent.soft_update(self.agent.actor_model, self.agent.target_actor_model)
-                        self.agent.soft_update(self.agent.critic_model, self.agent.target_critic_model)
+                        # actor and critic targets in one fused foreach pass
+                        self._soft_update_targets()
                         logger.debug(f"{self.group}; Rank {self.rank} HER.train target network soft update complete")
                     except Exception as e:
                         logger.error(f"{self.group}; Rank {self.rank} Error in HER.train target network soft update process: {e}", exc_info=True)
@@ -4378,6 +4907,8 @@ class HER(Agent):
             if self.agent.callbacks:
                 # if mpi_active:
                 if self.rank == 0:
+                    # let queued callbacks finish before the train end ones
+                    drain_callbacks()
                     for callback in self.agent.callbacks:
                         callback.on_train_end(logs=self.agent._train_episode_config)
                         logger.debug(f'{self.group}; Rank {self.rank} HER.train on train end callback complete')
@@ -4388,6 +4919,9 @@ class HER(Agent):
             self.agent.env.close()
         except Exception as e:
             logger.error(f"{self.group}; Rank {self.rank} Error during train process: {e}", exc_info=True)
+        finally:
+            if cb_pool is not None:
+                cb_pool.shutdown(wait=True)
     
     
     # def train_worker(self, rank, agent:Agent, actor_params, critic_params, epochs:int, 
@@ -4745,11 +5279,13 @@ class HER(Agent):
     def test(self, num_episodes, render, render_freq):
         """Runs a test over 'num_episodes'."""
 
-        # set model in eval mode
+        # test actions come from the target actor
+        self._wait_target_update()
+
+        # set the actors in eval mode (test actions come from the target actor);
+        # the critics aren't used during test, train() puts every model back in train mode
         self.agent.actor_model.eval()
-        self.agent.critic_model.eval()
         self.agent.target_actor_model.eval()
-        self.agent.target_critic_model.eval()
 
         if self.agent.callbacks:
             for callback in self.agent.callbacks:
@@ -4759,33 +5295,42 @@ class HER(Agent):
 
         # instantiate new environment
         self.agent.env = self.agent._initialize_env(render, render_freq, context='test')
+        # observation type is fixed per env, so check it once
+        obs_is_dict = isinstance(self.agent.env.observation_space, gym.spaces.dict.Dict)
+
+        # bind the objects and methods used on every step once
+        env = self.agent.env
+        env_step = env.step
+        get_action = self.agent.get_action
+        state_normalizer = self.state_normalizer
+        goal_normalizer = self.goal_normalizer
 
         # instantiate list to store reward, step time, and episode time history
         reward_history = []
         self._step = 1
-        success_counter = 0.0
-        # set the model to calculate no gradients during evaluation
-        with T.no_grad():
+        success_history = helper.RollingMean(100)
+        # evaluation needs no autograd; inference mode also skips view tracking and version counters
+        with T.inference_mode():
             for i in range(num_episodes):
                 if self.agent.callbacks:
                     for callback in self.agent.callbacks:
                         callback.on_test_epoch_begin(epoch=self._step, logs=None)
 
-                state, _ = self.agent.env.reset()
-                if isinstance(state, dict): # if state is a dict, extract observation (robotics)
+                state, _ = env.reset()
+                if obs_is_dict: # if state is a dict, extract observation (robotics)
                     state = state["observation"]
                 # set desired goal
-                desired_goal = self.desired_goal_func(self.agent.env)
+                desired_goal = self.desired_goal_func(env)
                 done = False
                 episode_reward = 0
                 while not done:
                     # get action
-                    action = self.agent.get_action(state, desired_goal, grad=False, test=True,
-                                                   state_normalizer=self.state_normalizer,
-                                                   goal_normalizer=self.goal_normalizer)
-                    next_state, reward, term, trunc, _ = self.agent.env.step(action)
+                    action = get_action(state, desired_goal, grad=False, test=True,
+                                        state_normalizer=state_normalizer,
+                                        goal_normalizer=goal_normalizer)
+                    next_state, reward, term, trunc, _ = env_step(action)
                     # extract observation from next state if next_state is dict (robotics)
-                    if isinstance(next_state, dict):
+                    if obs_is_dict:
                         next_state = next_state['observation']
                     if term or trunc:
                         done = True
@@ -4797,11 +5342,10 @@ class HER(Agent):
                 avg_reward = np.mean(reward_history[-100:])
                 self.agent._test_episode_config["episode reward"] = episode_reward
                 self.agent._test_episode_config["avg reward"] = avg_reward
-                # calculate success rate
-                goal_distance = np.linalg.norm(self.achieved_goal_func(self.agent.env) - desired_goal, axis=-1)
-                success = (goal_distance <= self.tolerance).astype(np.float32)
-                success_counter += success
-                success_perc = success_counter / (i+1)
+                # calculate success rate (over the last 100 episodes)
+                goal_diff = (self.achieved_goal_func(env) - desired_goal).ravel()
+                success_history.add(1.0 if np.dot(goal_diff, goal_diff) <= self._tol_sq else 0.0)
+                success_perc = success_history.mean
                 # store success rate to train episode config
                 self.agent._test_episode_config["success rate"] = success_perc
                 if self.agent.callbacks:
@@ -4816,6 +5360,43 @@ class HER(Agent):
             # close the environment
             self.agent.env.close()
 
+    def _soft_update_targets(self):
+        """Soft updates the target actor and critic, on the target stream when on CUDA."""
+        currents = (self.agent.actor_model, self.agent.critic_model)
+        targets = (self.agent.target_actor_model, self.agent.target_critic_model)
+        if self._target_stream is None:
+            self.agent.soft_update(currents, targets)
+            return
+        # start after the learn step that produced the current weights
+        self._target_stream.wait_stream(T.cuda.current_stream())
+        with T.cuda.stream(self._target_stream):
+            self.agent.soft_update(currents, targets)
+        self._target_event = self._target_stream.record_event()
+
+    def _wait_target_update(self):
+        """Makes the current stream wait for a pending target soft update."""
+        if self._target_event is not None:
+            T.cuda.current_stream().wait_event(self._target_event)
+            self._target_event = None
+
+    def _trajectory_buffers(self, capacity, state, goal, old=None):
+        """Allocates per-episode trajectory arrays, copying over the rows of old if passed."""
+        state_shape = np.shape(state)
+        goal_shape = np.shape(goal)
+        buffers = (
+            np.empty((capacity, *state_shape), dtype=np.float32), # states
+            np.empty((capacity, *self.agent.env.action_space.shape), dtype=np.float32), # actions
+            np.empty((capacity, *state_shape), dtype=np.float32), # next states
+            np.empty(capacity, dtype=bool), # dones
+            np.empty((capacity, *goal_shape), dtype=np.float32), # state achieved goals
+            np.empty((capacity, *goal_shape), dtype=np.float32), # next state achieved goals
+            np.empty((capacity, *goal_shape), dtype=np.float32), # desired goals
+        )
+        if old is not None:
+            for new, prev in zip(buffers, old):
+                new[:len(prev)] = prev
+        return buffers
+
     def store_hindsight_trajectory(self, trajectory):
         """
         Stores a hindsight experience replay trajectory in the replay buffer.
@@ -4833,57 +5414,44 @@ class HER(Agent):
         # print(f'next state achieved goals: {next_state_achieved_goals}')
         # print(f'desired goals: {desired_goals}')
         # print('')
-        # instantiate variable to keep track of times tolerance is hit
-        tol_count = 0
-
-        # loop over each step in the trajectory to set new achieved goals, calculate new reward, and save to replay buffer
-        for idx, (state, action, next_state, done, state_achieved_goal, next_state_achieved_goal, desired_goal) in enumerate(zip(states, actions, next_states, dones, state_achieved_goals, next_state_achieved_goals, desired_goals)):
-            
-            # normalize state and next states goals
-            # state_achieved_goal_norm = self.agent.goal_normalizer.normalize(state_achieved_goal)
-            # next_state_achieved_goal_norm = self.agent.goal_normalizer.normalize(next_state_achieved_goal)
+        num_steps = len(states)
+
+        # pick the trajectory rows and new desired goal of every relabeled transition
+        if self.strategy == "final":
+            # every step once, so rows is a slice and the gathers below are views
+            rows = slice(None)
+            num_relabeled = num_steps
+            new_desired_goals = np.repeat(next_state_achieved_goals[-1:], num_steps, axis=0)
+        elif self.strategy == 'future':
+            # step idx gets up to num_goals goals, each achieved at a random later step.
+            # draw a (T, num_goals) matrix of offsets in [1, remaining] and keep the first
+            # min(num_goals, remaining) of each row
+            steps = np.arange(num_steps)
+            remaining = num_steps - 1 - steps
+            offsets = (np.random.rand(num_steps, self.num_goals) * remaining[:, None]).astype(np.int64) + 1
+            keep = np.arange(self.num_goals) < np.minimum(remaining, self.num_goals)[:, None]
+            rows = np.broadcast_to(steps[:, None], keep.shape)[keep]
+            num_relabeled = len(rows)
+            new_desired_goals = next_state_achieved_goals[(steps[:, None] + offsets)[keep]]
+        else:
+            num_relabeled = 0
 
-            
+        # recompute rewards for all relabeled transitions in one reward_fn call
+        tol_count = 0
+        if num_relabeled:
+            new_rewards, within_tol = self.reward_fn(self.agent.env, actions[rows], state_achieved_goals[rows],
+                                                     next_state_achieved_goals[rows], new_desired_goals, self.tolerance)
+            tol_count = int(np.sum(within_tol))
 
-            if self.strategy == "final":
-                new_desired_goal = next_state_achieved_goals[-1]
-                # normalize desired goal to pass to reward func
-                # new_desired_goal_norm = self.agent.goal_normalizer.normalize(new_desired_goal)
-                new_reward, within_tol = self.reward_fn(self.agent.env, action, state_achieved_goal, next_state_achieved_goal, new_desired_goal, self.tolerance)
-                # DEBUG
-                # print(f'reward: {new_reward}; within_tol: {within_tol}')
-                # increment tol_count
-                tol_count += within_tol
-
-                # store non normalized trajectory
-                self.replay_buffer.add(state, action, new_reward, next_state, done, state_achieved_goal, next_state_achieved_goal, new_desired_goal)
-
-            elif self.strategy == 'future':
-                for i in range(self.num_goals):
-                    if idx + i >= len(states) -1:
-                        break
-                    goal_idx = np.random.randint(idx + 1, len(states))
-                    new_desired_goal = next_state_achieved_goals[goal_idx]
-                    # normalize desired goal to pass to reward func
-                    # new_desired_goal_norm = self.agent.goal_normalizer.normalize(new_desired_goal)
-                    #DEBUG
-                    # print(f'sent next state achieved goal: {next_state_achieved_goal}')
-                    # print(f'sent new desired goal: {new_desired_goal}')
-                    new_reward, within_tol = self.reward_fn(self.agent.env, action, state_achieved_goal, next_state_achieved_goal, new_desired_goal, self.tolerance)
-                    # DEBUG
-                    # print(f'reward: {new_reward}; within_tol: {within_tol}')
-                    # increment tol_count
-                    tol_count += within_tol
-                    # print(f'tol count: {tol_count}')
-                    # store non normalized trajectory
-                    self.replay_buffer.add(state, action, new_reward, next_state, done, state_achieved_goal, next_state_achieved_goal, new_desired_goal)
-
-            elif self.strategy == 'none':
-                break
+            # store non normalized relabeled transitions
+            self.replay_buffer.add_batch(states[rows], actions[rows], np.asarray(new_rewards, dtype=np.float32),
+                                         next_states[rows], dones[rows], state_achieved_goals[rows],
+                                         next_state_achieved_goals[rows], new_desired_goals)
 
         # add tol count to train step config for callbacks
+        # (callbacks run on rank 0 of this HER's comm, which may be a sweep sub-communicator)
         if self.agent.callbacks:
-            if MPI.COMM_WORLD.Get_rank() == 0:
+            if self.rank == 0:
                 self.agent._train_episode_config["tolerance count"] = tol_count
                 
         
@@ -4917,6 +5485,7 @@ class HER(Agent):
             "replay_buffer_size": self.replay_buffer_size,
             "device": self.device,
             "save_dir": self.save_dir,
+            "stats_sync_every": self.stats_sync_every,
         }
 
         # if callable(self.reward_fn) and self.reward_fn.__name__ == '<lambda>':
@@ -4934,14 +5503,16 @@ class HER(Agent):
         #     self.save_dir = save_dir + "/her/"
         #     print(f'new save dir: {self.save_dir}')
 
+        # the target weights may still be updating on the target stream
+        self._wait_target_update()
+
         config = self.get_config()
 
         # makes directory if it doesn't exist
         os.makedirs(self.save_dir, exist_ok=True)
 
         # writes and saves JSON file of DDPG agent config
-        with open(self.save_dir + "config.json", "w", encoding="utf-8") as f:
-            json.dump(config, f)
+        _write_json(self.save_dir + "config.json", config)
 
         # save agent
         # if save_dir is not None:
@@ -4950,13 +5521,15 @@ class HER(Agent):
         # else:
         self.agent.save()
 
-        self.state_normalizer.save_state(self.save_dir + "state_normalizer.npz")
-        self.goal_normalizer.save_state(self.save_dir + "goal_normalizer.npz")
+        self.state_normalizer.save_state(self.save_dir + "state_normalizer")
+        self.goal_normalizer.save_state(self.save_dir + "goal_normalizer")
 
     @classmethod
     def load(cls, config, load_weights=True):
         """Loads the model."""
-        logger.debug(f'rank {MPI.COMM_WORLD.rank} HER.load called')
+        # global rank, looked up once for the log messages below
+        rank = MPI.COMM_WORLD.rank
+        logger.debug(f'rank {rank} HER.load called')
         # # load reinforce agent config
         # with open(
         #     Path(folder).joinpath(Path("obj_config.json")), "r", encoding="utf-8"
@@ -4968,35 +5541,41 @@ class HER(Agent):
             config["desired_goal"] = getattr(gym_helper, config["desired_goal"])
             config["achieved_goal"] = getattr(gym_helper, config["achieved_goal"])
             config["reward_fn"] = getattr(gym_helper, config["reward_fn"])
-            logger.debug(f"rank {MPI.COMM_WORLD.rank} HER.load successfully loaded gym goal functions")
+            logger.debug(f"rank {rank} HER.load successfully loaded gym goal functions")
         except Exception as e:
-            logger.error(f"rank {MPI.COMM_WORLD.rank} HER.load failed to load gym goal functions: {e}", exc_info=True)
+            logger.error(f"rank {rank} HER.load failed to load gym goal functions: {e}", exc_info=True)
+            raise
 
         # load agent
         try:
             agent = load_agent_from_config(config["agent"], load_weights)
-            logger.debug(f"rank {MPI.COMM_WORLD.rank} HER.load successfully loaded Agent")
-            logger.debug(f'rank {MPI.COMM_WORLD.rank} agent config:{agent.get_config()}')
+            logger.debug(f"rank {rank} HER.load successfully loaded Agent")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f'rank {rank} agent config:{agent.get_config()}')
         except Exception as e:
-            logger.error(f"rank {MPI.COMM_WORLD.rank} HER.load failed to load Agent: {e}", exc_info=True)
+            logger.error(f"rank {rank} HER.load failed to load Agent: {e}", exc_info=True)
+            raise
 
         # instantiate HER model
         try:
             her = cls(agent, config["strategy"], config["tolerance"], config["num_goals"],
                     config["desired_goal"], config["achieved_goal"], config["reward_fn"],
                     config['normalizer_clip'], config['normalizer_eps'], config["replay_buffer_size"],
-                    config["device"], config["save_dir"])
-            logger.debug(f"rank {MPI.COMM_WORLD.rank} HER.load successfully loaded HER")
+                    config["device"], config["save_dir"],
+                    stats_sync_every=config.get("stats_sync_every", 1))
+            logger.debug(f"rank {rank} HER.load successfully loaded HER")
         except Exception as e:
-            logger.error(f"rank {MPI.COMM_WORLD.rank} HER.load failed to load HER: {e}", exc_info=True)
+            logger.error(f"rank {rank} HER.load failed to load HER: {e}", exc_info=True)
+            raise
 
         # load agent normalizers
         try:
-            agent.state_normalizer = helper.Normalizer.load_state(config['save_dir'] + "state_normalizer.npz")
-            agent.goal_normalizer = helper.Normalizer.load_state(config['save_dir'] + "goal_normalizer.npz")
-            logger.debug(f"rank {MPI.COMM_WORLD.rank} HER.load successfully loaded normalizers")
+            agent.state_normalizer = helper.Normalizer.load_state(config['save_dir'] + "state_normalizer", device=agent.device)
+            agent.goal_normalizer = helper.Normalizer.load_state(config['save_dir'] + "goal_normalizer", device=agent.device)
+            logger.debug(f"rank {rank} HER.load successfully loaded normalizers")
         except Exception as e:
-            logger.error(f"rank {MPI.COMM_WORLD.rank} HER.load failed to load normalizers: {e}", exc_info=True)
+            logger.error(f"rank {rank} HER.load failed to load normalizers: {e}", exc_info=True)
+            raise
         
         return her
     
@@ -5018,37 +5597,61 @@ class HER(Agent):
 
 #     raise ValueError(f"Unknown agent type: {agent_type}")
 
+# agent classes keyed by class name (config "agent_type")
+_AGENT_CLASS_BY_NAME = {cls.__name__: cls for cls in (ActorCritic, Reinforce, DDPG, TD3, HER)}
+
+# agent classes keyed by friendly model type name
+_AGENT_TYPE_MAP = {"Actor Critic": ActorCritic,
+                   "Reinforce": Reinforce,
+                   "DDPG": DDPG,
+                   "HER_DDPG": HER,
+                   "HER": HER,
+                   "TD3": TD3,
+                  }
+
 def load_agent_from_config(config, load_weights=True):
     """Loads an agent from a loaded config file."""
     agent_type = config["agent_type"]
 
-    # Use globals() to get a reference to the class
-    agent_class = globals().get(agent_type)
-
-    if agent_class:
-        return agent_class.load(config, load_weights)
+    try:
+        agent_class = _AGENT_CLASS_BY_NAME[agent_type]
+    except KeyError:
+        raise ValueError(f"Unknown agent type: {agent_type}") from None
 
-    raise ValueError(f"Unknown agent type: {agent_type}")
+    return agent_class.load(config, load_weights)
 
 
 def get_agent_class_from_type(agent_type: str):
     """Builds an agent from a passed agent type str."""
-
-    types = {"Actor Critic": "ActorCritic",
-             "Reinforce": "Reinforce",
-             "DDPG": "DDPG",
-             "HER_DDPG": "HER",
-             "HER": "HER",
-             "TD3": "TD3",
-            }
-
-    # Use globals() to get a reference to the class
-    agent_class = globals().get(types[agent_type])
-
-    if agent_class:
-        return agent_class
-
-    raise ValueError(f"Unknown agent type: {agent_type}")
+    try:
+        return _AGENT_TYPE_MAP[agent_type]
+    except KeyError:
+        raise ValueError(f"Unknown agent type: {agent_type}") from None
+
+def _env_spec_from_params(env_params):
+    """Builds the EnvSpec gym.make(**env_params) would produce without constructing the env."""
+    env_params = dict(env_params)
+    spec = gym.spec(env_params.pop("id"))
+    spec_fields = {f.name for f in dataclasses.fields(spec)}
+    # top level spec fields (e.g. max_episode_steps) override; the rest are env kwargs
+    overrides = {k: env_params.pop(k) for k in list(env_params) if k in spec_fields and k != "kwargs"}
+    kwargs = {**spec.kwargs, **env_params}
+    return dataclasses.replace(spec, kwargs=kwargs, **overrides)
+
+def _is_primary_rank(comm=None):
+    """True on rank 0 of comm, or on local rank 0 when no comm is given."""
+    if comm is not None:
+        return comm.Get_rank() == 0
+    return os.environ.get('LOCAL_RANK', '0') == '0'
+
+def _wait_for_wandb_config(key="model_type", timeout=10.0):
+    """Polls wandb.config for key with exponential backoff; returns True once present."""
+    deadline = time.monotonic() + timeout
+    delay = 0.005
+    while key not in wandb.config and time.monotonic() < deadline:
+        time.sleep(delay)
+        delay = min(delay * 2, 0.1)
+    return key in wandb.config
 
 def init_sweep(sweep_config, train_config, comm=None):
     rank = MPI.COMM_WORLD.Get_rank()
@@ -5064,15 +5667,12 @@ def init_sweep(sweep_config, train_config, comm=None):
         # logger.debug(f"{comm.Get_name()}; Rank {rank} WANDB_DISABLE_SERVICE set to true")
 
         # Set seeds
-        random.seed(train_config['seed'])
-        np.random.seed(train_config['seed'])
-        T.manual_seed(train_config['seed'])
-        T.cuda.manual_seed(train_config['seed'])
+        helper.seed_everything(train_config['seed'])
         # logger.debug(f'{comm.Get_name()}; Rank {rank} random seeds set')
 
         # Only primary process (rank 0) calls wandb.init() to build agent and log data
         if comm is not None:
-            if rank == 0:
+            if _is_primary_rank(comm):
                 # logger.debug('MPI rank 0 process fired')
                 # try:
                 run_number = wandb_support.get_next_run_number(sweep_config["project"])
@@ -5092,16 +5692,8 @@ def init_sweep(sweep_config, train_config, comm=None):
                 model_type = list(wandb_config.keys())[0]
                 
                 # Wait for configuration to be populated
-                max_retries = 10
-                retry_interval = 1  # in seconds
-
-                for _ in range(max_retries):
-                    if "model_type" in wandb.config:
-                        break
-                    logger.debug(f"{comm.Get_name()}; Rank {rank} Waiting for wandb.config to be populated...")
-                    time.sleep(retry_interval)
-
-                if "model_type" in wandb.config:
+                logger.debug(f"{comm.Get_name()}; Rank {rank} Waiting for wandb.config to be populated...")
+                if _wait_for_wandb_config():
                     logger.debug(f'{comm.Get_name()}; Rank {rank} wandb.config: {wandb.config}')
                     run.tags = run.tags + (model_type,)
                 else:
@@ -5109,10 +5701,10 @@ def init_sweep(sweep_config, train_config, comm=None):
                 
                 run.tags = run.tags + (model_type,)
                 logger.debug(f"{comm.Get_name()}; Rank {rank} run.tag set")
-                env = gym.make(**{param: value["value"] for param, value in sweep_config["parameters"]["env"]["parameters"].items()})
+                spec = _env_spec_from_params({param: value["value"] for param, value in sweep_config["parameters"]["env"]["parameters"].items()})
                 # save env spec to string
-                env_spec = env.spec.to_json()
-                logger.debug(f"{comm.Get_name()}; Rank {rank} env built: {env.spec}")
+                env_spec = spec.to_json()
+                logger.debug(f"{comm.Get_name()}; Rank {rank} env spec built: {spec}")
                 callbacks = []
                 callbacks.append(rl_callbacks.WandbCallback(project_name=sweep_config["project"], run_name=f"train-{run_number}", _sweep=True))
                 logger.debug(f"{comm.Get_name()}; Rank {rank} callbacks created")
@@ -5123,15 +5715,10 @@ def init_sweep(sweep_config, train_config, comm=None):
                 run_number = None
                 wandb_config = None
             
-            # Use MPI Barrier to sync processes
-            logger.debug(f"{comm.Get_name()}; Rank {rank} init_sweep calling MPI Barrier")
-            comm.Barrier()
-            logger.debug(f"{comm.Get_name()}; Rank {rank} init_sweep MPI Barrier passed")
-
-            env_spec = comm.bcast(env_spec, root=0)
-            callbacks = comm.bcast(callbacks, root=0)
-            run_number = comm.bcast(run_number, root=0)
-            wandb_config = comm.bcast(wandb_config, root=0)
+            # single broadcast of the sweep bootstrap payload; bcast blocks
+            # non-root ranks until rank 0 is ready, so no separate Barrier
+            payload = (env_spec, callbacks, run_number, wandb_config) if rank == 0 else None
+            env_spec, callbacks, run_number, wandb_config = comm.bcast(payload, root=0)
             model_type = list(wandb_config.keys())[0]
             logger.debug(f"{comm.Get_name()}; Rank {rank} broadcasts complete")
 
@@ -5141,6 +5728,10 @@ def init_sweep(sweep_config, train_config, comm=None):
         
         else:
             print('else fired')
+            # only the primary local process talks to wandb
+            if not _is_primary_rank():
+                logger.debug(f"LOCAL_RANK {os.environ.get('LOCAL_RANK')} skipping wandb sweep init")
+                return
             run_number = wandb_support.get_next_run_number(sweep_config["project"])
             logger.debug(f"run number set: {run_number}")
             print(f'run number:{run_number}')
@@ -5160,16 +5751,8 @@ def init_sweep(sweep_config, train_config, comm=None):
             model_type = list(wandb_config.keys())[0]
             
             # Wait for configuration to be populated
-            max_retries = 10
-            retry_interval = 1  # in seconds
-
-            for _ in range(max_retries):
-                if "model_type" in wandb.config:
-                    break
-                logger.debug(f"Waiting for wandb.config to be populated...")
-                time.sleep(retry_interval)
-
-            if "model_type" in wandb.config:
+            logger.debug(f"Waiting for wandb.config to be populated...")
+            if _wait_for_wandb_config():
                 logger.debug(f'wandb.config: {wandb.config}')
                 run.tags = run.tags + (model_type,)
             else:
@@ -5177,10 +5760,10 @@ def init_sweep(sweep_config, train_config, comm=None):
             
             run.tags = run.tags + (model_type,)
             logger.debug(f"run.tag set")
-            env = gym.make(**{param: value["value"] for param, value in sweep_config["parameters"]["env"]["parameters"].items()})
+            spec = _env_spec_from_params({param: value["value"] for param, value in sweep_config["parameters"]["env"]["parameters"].items()})
             # save env spec to string
-            env_spec = env.spec.to_json()
-            logger.debug(f"env built: {env.spec}")
+            env_spec = spec.to_json()
+            logger.debug(f"env spec built: {spec}")
             callbacks = []
             callbacks.append(rl_callbacks.WandbCallback(project_name=sweep_config["project"], run_name=f"train-{run_number}", _sweep=True))
             logger.debug(f"callbacks created")
@@ -8,6 +8,18 @@ import wandb
 import wandb_support
 
 
+def _scalarize(logs):
+    """Converts 0-dim tensors/arrays in logs to python scalars.
+
+    Agents store detached metric tensors to avoid a device sync per step; the
+    sync happens here, only when the values are actually logged.
+    """
+    if not logs:
+        return logs
+    return {k: v.item() if getattr(v, 'ndim', None) == 0 and hasattr(v, 'item') else v
+            for k, v in logs.items()}
+
+
 class Callback():
     """Base class for all callbacks."""
     
@@ -91,7 +103,7 @@ class WandbCallback(Callback):
 
     def on_train_epoch_end(self, epoch, logs=None):
         """Finishes W&B run for epoch."""
-        wandb.log(logs, step=epoch)
+        wandb.log(_scalarize(logs), step=epoch)
         if (logs["best"]) & (logs["episode"] % self.chkpt_freq == 0):
             wandb_support.save_model_artifact(self.save_dir, self.project_name, model_is_best=True)
 
@@ -100,7 +112,7 @@ class WandbCallback(Callback):
 
     def on_train_step_end(self, step, logs=None):
         """Finishes W&B run for training batch."""
-        wandb.log(logs, step=step)
+        wandb.log(_scalarize(logs), step=step)
 
     def on_test_begin(self, logs=None, run_number=None):
         run_number = wandb_support.get_run_number_from_name(self.run_name)
@@ -191,16 +203,13 @@ class DashCallback(Callback):
             # write logs to json file to be loaded into Dash app for updating status
             os.makedirs("assets", exist_ok=True)
             with open("assets/training_data.json", 'w') as f:
-                json.dump(logs, f)
+                json.dump(_scalarize(logs), f)
         except Exception as e:
             print(f"Failed to send update to Dash app: {e}")
 
     def on_train_step_begin(self, step, logs=None):
         pass
 
-    def on_train_step_end(self, step, logs=None):
-        pass
-
     def on_test_begin(self, logs=None):
         self._episode_num = 0
 
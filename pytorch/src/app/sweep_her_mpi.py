@@ -4,13 +4,11 @@ import json
 import logging
 import argparse
 
-import random
-import numpy as np
-import torch as T
 import wandb
 from mpi4py import MPI
 
 from rl_agents import load_agent_from_config
+from helper import seed_everything
 
 parser = argparse.ArgumentParser(description='Sweep MPI')
 parser.add_argument('--agent_config', type=str, required=True, help='Path to agent_config.json to load agent')
@@ -43,10 +41,7 @@ def train(agent_config, train_config):
 
         # Set seeds
         try:
-            random.seed(train_config['seed'])
-            np.random.seed(train_config['seed'])
-            T.manual_seed(train_config['seed'])
-            T.cuda.manual_seed(train_config['seed'])
+            seed_everything(train_config['seed'])
             logger.debug('mpi sweep seeds set')
         except Exception as e:
             logger.error(f"Error setting seeds: {e}")
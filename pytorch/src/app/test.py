@@ -4,11 +4,9 @@ import logging
 import argparse
 import subprocess
 
-import random
-import numpy as np
-import torch as T
 
-from rl_agents import load_agent_from_config
+from rl_agents import load_agent_from_config, load_json
+from helper import seed_everything
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -34,10 +32,7 @@ def test_agent(agent_config, test_config):
         num_runs = test_config['num_runs']
 
         # set seed
-        random.seed(seed)
-        np.random.seed(seed)
-        T.manual_seed(seed)
-        T.cuda.manual_seed(seed)
+        seed_everything(seed)
 
         print(f'seed: {seed}')
 
@@ -64,11 +59,9 @@ def test_agent(agent_config, test_config):
 
 if __name__ == '__main__':
     try:
-        with open(agent_config_path, 'r', encoding="utf-8") as f:
-            agent_config = json.load(f)
+        agent_config = load_json(agent_config_path)
 
-        with open(test_config_path, 'r', encoding="utf-8") as f:
-            test_config = json.load(f)
+        test_config = load_json(test_config_path)
 
         test_agent(agent_config, test_config)
 
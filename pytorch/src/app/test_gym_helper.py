@@ -0,0 +1,50 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+import gym_helper
+
+
+def _fetch_env():
+    # sparse fetch reward: 0 within 0.05 of the goal, else -1
+    def compute_reward(achieved_goal, desired_goal, info):
+        distance = np.linalg.norm(achieved_goal - desired_goal, axis=-1)
+        return -(distance > 0.05).astype(np.float32)
+    return SimpleNamespace(get_wrapper_attr=lambda name: compute_reward)
+
+
+def _goals(goal_dim, n=16):
+    achieved = np.linspace(-1.0, 1.0, n * goal_dim, dtype=np.float32).reshape(n, goal_dim)
+    # alternate goals just inside and well outside the tolerance
+    offset = np.where(np.arange(n) % 2 == 0, 0.01, 1.0).astype(np.float32)
+    return achieved, achieved + offset[:, None]
+
+
+@pytest.mark.parametrize("reward_fn, env, goal_dim", [
+    (gym_helper.reacher_reward, None, 3),
+    (gym_helper.car_racing_reward, None, 1),
+    (gym_helper.fetch_reach_reward, _fetch_env(), 3),
+    (gym_helper.fetch_pick_place_reward, _fetch_env(), 3),
+    (gym_helper.fetch_push_reward, _fetch_env(), 3),
+    (gym_helper.fetch_slide_reward, _fetch_env(), 3),
+])
+def test_batched_reward_matches_per_row(reward_fn, env, goal_dim):
+    achieved, desired = _goals(goal_dim)
+    actions = np.zeros((len(achieved), 2), dtype=np.float32)
+    rewards, within = reward_fn(env, actions, achieved, achieved, desired, 0.05)
+
+    assert rewards.shape == within.shape == (len(achieved),)
+    assert within.dtype == np.int64
+    assert np.array_equal(within, np.arange(len(within)) % 2 == 0)
+    for i in range(len(achieved)):
+        reward, hit = reward_fn(env, actions[i], achieved[i], achieved[i], desired[i], 0.05)
+        assert np.isclose(rewards[i], reward)
+        assert within[i] == hit
+
+
+def test_sparse_reward_is_zero_within_tolerance():
+    rewards, within = gym_helper._sparse_reward(np.array([True, False]))
+    assert rewards.dtype == np.float32
+    assert np.array_equal(rewards, [0.0, -1.0])
+    assert np.array_equal(within, [1, 0])
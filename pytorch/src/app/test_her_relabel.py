@@ -0,0 +1,57 @@
+from types import SimpleNamespace
+
+import numpy as np
+
+from rl_agents import HER
+
+
+class _RecordingBuffer:
+    def __init__(self):
+        self.batches = []
+
+    def add_batch(self, *args):
+        self.batches.append(args)
+
+
+def _reward_fn(env, action, state_achieved_goal, next_state_achieved_goal, desired_goal, tolerance):
+    within = np.zeros(len(desired_goal), dtype=np.int64)
+    return within.astype(np.float32) - 1.0, within
+
+
+def _relabel(num_steps, num_goals):
+    """Runs 'future' relabeling on a trajectory whose step index is encoded in every field."""
+    index = np.arange(num_steps, dtype=np.float32)[:, None]
+    trajectory = (index, index, index + 1, np.zeros(num_steps, dtype=np.int8), index, index, np.zeros_like(index))
+    buffer = _RecordingBuffer()
+    her = SimpleNamespace(strategy='future', num_goals=num_goals, tolerance=0.05, reward_fn=_reward_fn,
+                          agent=SimpleNamespace(env=None, callbacks=[]), replay_buffer=buffer, rank=0)
+    HER.store_hindsight_trajectory(her, trajectory)
+    states, _, _, _, _, _, _, new_desired_goals = buffer.batches[0]
+    return states[:, 0].astype(np.int64), new_desired_goals[:, 0].astype(np.int64)
+
+
+def test_future_goals_per_step_and_range():
+    num_steps, num_goals = 10, 4
+    rows, goals = _relabel(num_steps, num_goals)
+
+    counts = np.bincount(rows, minlength=num_steps)
+    expected = np.minimum(num_goals, num_steps - 1 - np.arange(num_steps))
+    assert np.array_equal(counts, expected)
+    # each goal was achieved at a strictly later step of the same trajectory
+    assert np.all(goals >= rows + 1)
+    assert np.all(goals <= num_steps - 1)
+
+
+def test_future_goals_match_randint_distribution():
+    # the old loop drew np.random.randint(idx + 1, T): uniform over the later steps
+    np.random.seed(0)
+    num_steps, num_goals, trials = 6, 3, 4000
+    freq = np.zeros((num_steps, num_steps))
+    for _ in range(trials):
+        rows, goals = _relabel(num_steps, num_goals)
+        np.add.at(freq, (rows, goals), 1)
+
+    for idx in range(num_steps - 1):
+        later = freq[idx, idx + 1:] / freq[idx].sum()
+        assert np.allclose(later, 1.0 / len(later), atol=0.03)
+        assert freq[idx, :idx + 1].sum() == 0
@@ -0,0 +1,24 @@
+import torch as T
+
+from helper import Normalizer
+
+
+def test_normalizer_state_round_trip_keeps_shape(tmp_path):
+    size = (4, 5, 3)
+    normalizer = Normalizer(size=size)
+    normalizer.update_local_stats(T.rand(8, *size))
+    normalizer._fold_stats(*normalizer._take_local_stats())
+    normalizer.update_local_stats(T.rand(2, *size))
+
+    save_dir = tmp_path / "state_normalizer"
+    normalizer.save_state(str(save_dir))
+    loaded = Normalizer.load_state(str(save_dir))
+
+    for key in Normalizer._STATE_KEYS:
+        original, restored = getattr(normalizer, key), getattr(loaded, key)
+        assert restored.shape == original.shape
+        assert restored.dtype == original.dtype
+        assert T.equal(restored, original)
+
+    batch = T.rand(6, *size)
+    assert T.equal(loaded.normalize(batch), normalizer.normalize(batch))
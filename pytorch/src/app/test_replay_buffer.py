@@ -0,0 +1,47 @@
+from types import SimpleNamespace
+
+import gymnasium as gym
+import numpy as np
+import torch as T
+
+from helper import ReplayBuffer
+
+
+def _buffer(buffer_size):
+    env = SimpleNamespace(observation_space=gym.spaces.Box(-1, 1, (2,)), action_space=gym.spaces.Box(-1, 1, (1,)))
+    return ReplayBuffer(env, buffer_size=buffer_size, goal_shape=(1,), device='cpu')
+
+
+def _batch(start, n):
+    values = np.arange(start, start + n, dtype=np.float32)
+    goals = values[:, None]
+    return (np.stack([values, values], axis=1), goals, values, np.stack([values, values], axis=1) + 1,
+            (values % 2).astype(np.int8), goals, goals + 1, goals + 2)
+
+
+def test_add_batch_wraps_around_the_end():
+    buffer = _buffer(5)
+    buffer.add_batch(*_batch(0, 3))
+    buffer.add_batch(*_batch(3, 4))  # rows 3, 4 then wraps to 0, 1
+
+    assert buffer.counter == 7
+    expected = T.tensor([5., 6., 2., 3., 4.])
+    assert T.equal(buffer.rewards, expected)
+    assert T.equal(buffer.states[:, 0], expected)
+    assert T.equal(buffer.next_states[:, 1], expected + 1)
+    assert T.equal(buffer.actions[:, 0], expected)
+    assert T.equal(buffer.dones, (expected % 2).to(T.int8))
+    assert T.equal(buffer.desired_goals[:, 0], expected + 2)
+    assert T.equal(buffer.next_state_achieved_goals[:, 0], expected + 1)
+
+
+def test_add_batch_matches_add():
+    batched, single = _buffer(4), _buffer(4)
+    batched.add_batch(*_batch(0, 6))
+    for row in zip(*_batch(0, 6)):
+        single.add(*row)
+
+    assert batched.counter == single.counter
+    for key in ('states', 'actions', 'rewards', 'next_states', 'dones',
+                'state_achieved_goals', 'next_state_achieved_goals', 'desired_goals'):
+        assert T.equal(getattr(batched, key), getattr(single, key))
@@ -1,16 +1,14 @@
+import os
 import sys
 import json
 import time
 from logging_config import logger
 import argparse
-import subprocess
 
-import random
-import numpy as np
-import torch as T
 import wandb
 
-from rl_agents import load_agent_from_config
+from rl_agents import load_agent_from_config, load_json
+from helper import seed_everything
 
 # Configure logging
 # logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -24,6 +22,20 @@ args = parser.parse_args()
 agent_config_path = args.agent_config
 train_config_path = args.train_config
 
+def exec_mpi(script, num_workers):
+    """Replaces this launcher process with mpirun running script on num_workers ranks."""
+    argv = ["mpirun", "-np", str(num_workers), sys.executable, script,
+            "--agent_config", agent_config_path, "--train_config", train_config_path]
+    # exec discards unflushed output of this process
+    sys.stdout.flush()
+    sys.stderr.flush()
+    try:
+        os.execvp(argv[0], argv)
+    except FileNotFoundError as e:
+        # reported separately so it isn't mistaken for a missing config file
+        logger.error(f"MPI launcher '{argv[0]}' not found on PATH")
+        raise RuntimeError(f"MPI launcher '{argv[0]}' not found on PATH") from e
+
 def train_agent(agent_config, train_config):
 
     # wandb_initialized = False  # Track if wandb is initialized
@@ -45,10 +57,7 @@ def train_agent(agent_config, train_config):
         use_mpi = train_config.get('use_mpi', False)
 
         # set seed
-        random.seed(seed)
-        np.random.seed(seed)
-        T.manual_seed(seed)
-        T.cuda.manual_seed(seed)
+        seed_everything(seed)
 
         print(f'seed: {seed}')
 
@@ -68,57 +77,33 @@ def train_agent(agent_config, train_config):
         #     )
         #     wandb_initialized = True
 
+        # MPI runs are trained by the per-agent MPI scripts; hand off before building an agent here
+        mpi_scripts = {'HER': 'train_her_mpi.py', 'DDPG': 'train_ddpg_mpi.py', 'TD3': 'train_td3_mpi.py'}
+        if use_mpi and agent_type in mpi_scripts:
+            exec_mpi(mpi_scripts[agent_type], train_config['num_workers'])
+
         if agent_type:
             agent = load_agent_from_config(agent_config, load_weights)
             print('agent config loaded')
             print(f'env:{agent.env.spec}')
 
             if agent_type == 'HER':
-
-                if use_mpi:
-                    num_workers = train_config['num_workers']
-                    # Execute the MPI command for HER agent
-                    mpi_command = f"mpirun -np {num_workers} python train_her_mpi.py --agent_config {agent_config_path} --train_config {train_config_path}"
-                    # for i in range(num_runs):
-                    subprocess.Popen(mpi_command, shell=True)
-                    # print(f'training run {i+1} initiated')
-                    # time.sleep(5)
-                
-                else:
-                    num_epochs = train_config['num_epochs']
-                    num_cycles = train_config['num_cycles']
-                    num_updates = train_config['num_updates']
-                    # for i in range(num_runs):
-                    agent.train(num_epochs, num_cycles, num_episodes, num_updates, render, render_freq, save_dir, run_number)
-                    # print(f'training run {i+1} initiated')
+                num_epochs = train_config['num_epochs']
+                num_cycles = train_config['num_cycles']
+                num_updates = train_config['num_updates']
+                # for i in range(num_runs):
+                agent.train(num_epochs, num_cycles, num_episodes, num_updates, render, render_freq, save_dir, run_number)
+                # print(f'training run {i+1} initiated')
             
             elif agent_type == 'DDPG':
-
-                if use_mpi:
-                    num_workers = train_config['num_workers']
-                    mpi_command = f"mpirun -np {num_workers} python train_ddpg_mpi.py --agent_config {agent_config_path} --train_config {train_config_path}"
-                    # for i in range(num_runs):
-                    subprocess.Popen(mpi_command, shell=True)
-                    # print(f'training run {i+1} initiated')
-                
-                else:
-                    # for i in range(num_runs):
-                    agent.train(num_episodes, render, render_freq)
-                    # print(f'training run {i+1} initiated')
+                # for i in range(num_runs):
+                agent.train(num_episodes, render, render_freq)
+                # print(f'training run {i+1} initiated')
 
             elif agent_type == 'TD3':
-
-                if use_mpi:
-                    num_workers = train_config['num_workers']
-                    mpi_command = f"mpirun -np {num_workers} python train_td3_mpi.py --agent_config {agent_config_path} --train_config {train_config_path}"
-                    # for i in range(num_runs):
-                    subprocess.Popen(mpi_command, shell=True)
-                    # print(f'training run {i+1} initiated')
-                
-                else:
-                    # for i in range(num_runs):
-                    agent.train(num_episodes, render, render_freq, run_number=run_number)
-                    # print(f'training run {i+1} initiated')
+                # for i in range(num_runs):
+                agent.train(num_episodes, render, render_freq, run_number=run_number)
+                # print(f'training run {i+1} initiated')
 
     except KeyError as e:
         logger.error(f"Missing configuration parameter: {str(e)}")
@@ -139,11 +124,9 @@ def train_agent(agent_config, train_config):
 
 if __name__ == '__main__':
     try:
-        with open(agent_config_path, 'r', encoding="utf-8") as f:
-            agent_config = json.load(f)
+        agent_config = load_json(agent_config_path)
 
-        with open(train_config_path, 'r', encoding="utf-8") as f:
-            train_config = json.load(f)
+        train_config = load_json(train_config_path)
 
         train_agent(agent_config, train_config)
 
@@ -3,7 +3,7 @@ import json
 import logging
 import argparse
 
-from rl_agents import HER
+from rl_agents import HER, load_json
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -18,8 +18,7 @@ agent_config_path = args.agent_config
 train_config_path = args.train_config
 
 def load_config(path):
-    with open(path, 'r', encoding="utf-8") as f:
-        return json.load(f)
+    return load_json(path)
 
 def train_agent(agent_config, train_config):
     print('mpi train agent fired')
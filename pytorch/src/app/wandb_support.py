@@ -11,7 +11,6 @@ from logging_config import logger
 import time
 
 import numpy as np
-import random
 # import tensorflow as tf
 # from tensorflow.keras.callbacks import Callback
 import torch as T
@@ -373,10 +372,7 @@ def _run_sweep(sweep_config, train_config):
             run.tags = run.tags + (wandb.config.model_type,)
             env = gym.make(**{param: value["value"] for param, value in sweep_config["parameters"]["env"]["parameters"].items()})
             save_dir = train_config.get('save_dir', sweep_config[wandb.config.model_type][f'{wandb.config.model_type}_save_dir'])
-            random.seed(train_config['seed'])
-            np.random.seed(train_config['seed'])
-            T.manual_seed(train_config['seed'])
-            T.cuda.manual_seed(train_config['seed'])
+            helper.seed_everything(train_config['seed'])
 
             callbacks = []
             if wandb.run:
@@ -407,10 +403,7 @@ def _run_sweep(sweep_config, train_config):
             run.tags = run.tags + (wandb.config.model_type,)
             env = gym.make(**{param: value["value"] for param, value in sweep_config["parameters"]["env"]["parameters"].items()})
             save_dir = train_config.get('save_dir', sweep_config[wandb.config.model_type][f'{wandb.config.model_type}_save_dir'])
-            random.seed(train_config['seed'])
-            np.random.seed(train_config['seed'])
-            T.manual_seed(train_config['seed'])
-            T.cuda.manual_seed(train_config['seed'])
+            helper.seed_everything(train_config['seed'])
 
             callbacks = []
             if wandb.run:
@@ -475,10 +468,7 @@ def _run_sweep(sweep_config, train_config):
                 print(f'env spec: {env.spec}')
                 save_dir = train_config.get('save_dir', wandb.config[wandb.config.model_type][f'{wandb.config.model_type}_save_dir'])
                 print(f'save dir set:{save_dir}')
-                random.seed(train_config['seed'])
-                np.random.seed(train_config['seed'])
-                T.manual_seed(train_config['seed'])
-                T.cuda.manual_seed(train_config['seed'])
+                helper.seed_everything(train_config['seed'])
 
                 callbacks = []
                 print(f'if wandb run fired')